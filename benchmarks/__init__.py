@@ -0,0 +1,7 @@
+"""
+Stand-alone performance benchmarks.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project
+root. Benchmarks run against a throwaway copy of the configured database, so
+they never touch ``db.sqlite3``.
+"""
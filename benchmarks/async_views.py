@@ -0,0 +1,119 @@
+"""
+Latency of the sync (WSGI) and async (ASGI) read paths under concurrency.
+
+Both stacks run in-process. The sync list and detail pages are driven
+through Django's WSGI handler from a thread pool, and their /async/ mirrors
+through the ASGI handler from one event loop, with the same number of
+requests in flight.
+
+    python -m benchmarks.async_views --concurrency 64 --requests 2000
+    python -m benchmarks.async_views --no-cache    # measure the uncached page
+
+SQLite serializes ORM calls onto one thread under ASGI, so the async
+numbers are most meaningful with DB_ENGINE=postgres.
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import setup_django, scratch_database, percentiles
+
+
+def seed(cars):
+    from cars.models import Car, CarType
+    from cars.references import locations, makes
+    from user.models import CustomUser
+
+    owner = CustomUser.objects.create_user("500000000", "bench-pass", email="owner@bench.local")
+    car_types = CarType.objects.bulk_create(CarType(name=name) for name in ("Sedan", "SUV", "Van"))
+    toyota, tbilisi = makes().by_slug["toyota"], locations().by_slug["tbilisi"]
+    Car.objects.bulk_create(
+        Car(car_type=car_types[i % 3], car_make=toyota, location=tbilisi, car_model=f"Model {i}",
+            registration_number=f"BENCH-{i}", price_per_day=40, added_by=owner)
+        for i in range(cars)
+    )
+    return list(Car.objects.values_list("pk", flat=True)[:50])
+
+
+def paths(prefix, car_ids, total):
+    """The request mix: list pages with and without filters, and detail pages."""
+    detail = "car/{}/"
+    mix = ["", "?page=2", "?transmission=manual", "?car_capacity=5&page=3"]
+    for i in range(total):
+        if i % 3 == 2:
+            yield f"/{prefix}{detail.format(car_ids[i % len(car_ids)])}"
+        else:
+            yield f"/{prefix}{mix[i % len(mix)]}"
+
+
+def run_sync(car_ids, concurrency, total):
+    from django.test import Client
+
+    def fetch(path):
+        began = time.perf_counter()
+        response = Client().get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        return time.perf_counter() - began
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(fetch, paths("", car_ids, total)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_async(car_ids, concurrency, total):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def fetch(path):
+        async with limit:
+            began = time.perf_counter()
+            response = await client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+            return time.perf_counter() - began
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(fetch(path) for path in paths("async/", car_ids, total)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the car list page cache.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    if args.no_cache:
+        settings.CATALOG_PAGE_CACHE_TIMEOUT = 0
+
+    with scratch_database():
+        car_ids = seed(args.cars)
+        sync_latencies, sync_elapsed = run_sync(car_ids, args.concurrency, args.requests)
+        async_latencies, async_elapsed = asyncio.run(run_async(car_ids, args.concurrency, args.requests))
+
+    result = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "wsgi": {"req_per_s": round(args.requests / sync_elapsed, 1), **percentiles(sync_latencies)},
+        "asgi": {"req_per_s": round(args.requests / async_elapsed, 1), **percentiles(async_latencies)},
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for stack in ("wsgi", "asgi"):
+        stats = result[stack]
+        print(f"{stack}: {stats['req_per_s']:>8} req/s  p50 {stats['p50_ms']} ms  "
+              f"p90 {stats['p90_ms']} ms  p99 {stats['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
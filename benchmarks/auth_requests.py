@@ -0,0 +1,103 @@
+"""
+Cost of an authenticated page view under each session strategy.
+
+A signed-in renter loads their rentals and the owner their cars, with the
+session kept in the database, in the cache backed by the database
+(cached_db) or in a signed cookie, and with the user cache on and off.
+Each combination reports queries per request and latency percentiles.
+
+    python -m benchmarks.auth_requests --requests 500
+    AUTH_CACHE=file python -m benchmarks.auth_requests
+
+Only the first request of each combination loads the user and session from
+the database when both caches are on; the numbers cover the warm requests.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django, scratch_database, percentiles
+
+PAGES = ("/my-rentals/", "/car/my_cars")
+
+
+def seed(cars):
+    from cars.models import Car, CarRental, CarType
+    from cars.references import locations, makes
+    from user.models import CustomUser
+
+    owner = CustomUser.objects.create_user("500000001", "bench-pass", email="owner@bench.local")
+    renter = CustomUser.objects.create_user("500000002", "bench-pass", email="renter@bench.local")
+    car_type = CarType.objects.create(name="Sedan")
+    toyota, tbilisi = makes().by_slug["toyota"], locations().by_slug["tbilisi"]
+    Car.objects.bulk_create(
+        Car(car_type=car_type, car_make=toyota, location=tbilisi, car_model=f"Model {i}",
+            registration_number=f"AUTH-{i}", price_per_day=40, added_by=owner)
+        for i in range(cars)
+    )
+    CarRental.objects.bulk_create(
+        CarRental(car_id=car_id, location=tbilisi, user=renter, start_date="2025-06-01", end_date="2025-06-05", total_price=160)
+        for car_id in Car.objects.values_list("pk", flat=True)[:20]
+    )
+    return owner, renter
+
+
+def run(users, strategy, user_cache_timeout, total):
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+
+    caches[settings.USER_CACHE_ALIAS].clear()
+    with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[strategy], USER_CACHE_TIMEOUT=user_cache_timeout):
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            for path in PAGES:
+                client.get(path)
+            clients.append(client)
+
+        latencies, queries = [], []
+        for i in range(total):
+            client, path = clients[i % len(clients)], PAGES[i // len(clients) % len(PAGES)]
+            with CaptureQueriesContext(connection) as captured:
+                began = time.perf_counter()
+                response = client.get(path)
+                latencies.append(time.perf_counter() - began)
+            assert response.status_code == 200, (path, response.status_code)
+            queries.append(len(captured))
+    return {"queries_per_request": round(sum(queries) / total, 2), **percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--user-cache-timeout", type=int, default=30,
+                        help="USER_CACHE_TIMEOUT for the cached runs.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    result = {}
+    with scratch_database():
+        users = seed(args.cars)
+        for strategy in settings.SESSION_ENGINES:
+            for timeout in (0, args.user_cache_timeout):
+                label = f"{strategy}, user cache {'on' if timeout else 'off'}"
+                result[label] = run(users, strategy, timeout, args.requests)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for label, stats in result.items():
+        print(f"{label:<32} {stats['queries_per_request']:>5} queries  p50 {stats['p50_ms']} ms  "
+              f"p90 {stats['p90_ms']} ms  p99 {stats['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
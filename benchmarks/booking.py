@@ -0,0 +1,98 @@
+"""
+Concurrent booking stress test.
+
+Many threads try to book the same car at once. Exactly one booking per
+date range may win; every other attempt must be rejected, never
+double-booked.
+
+    python -m benchmarks.booking --threads 32 --rounds 5
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from benchmarks.common import setup_django, scratch_database, percentiles
+
+
+def run(threads, rounds):
+    from django.db import connections
+    from cars.models import Car, CarType, CarRental
+    from cars.references import locations, makes
+    from cars.services import book_car, BookingError
+    from user.models import CustomUser
+
+    owner = CustomUser.objects.create_user("500000000", "bench-pass", email="owner@bench.local")
+    renters = [
+        CustomUser.objects.create_user(f"5990000{i:02d}", "bench-pass", email=f"renter{i}@bench.local")
+        for i in range(threads)
+    ]
+    car_type = CarType.objects.create(name="Bench")
+    car = Car.objects.create(
+        car_type=car_type, car_make=makes().by_slug["toyota"], location=locations().by_slug["tbilisi"],
+        car_model="Prius",
+        registration_number="BENCH-001", price_per_day=50, added_by=owner,
+    )
+
+    latencies = []
+    outcomes = {"booked": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def attempt(renter, barrier, start_date):
+        barrier.wait()
+        began = time.perf_counter()
+        try:
+            book_car(car.pk, renter, start_date, start_date + timedelta(days=4))
+            outcome = "booked"
+        except BookingError:
+            outcome = "rejected"
+        except Exception:
+            outcome = "errors"
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.append(time.perf_counter() - began)
+            outcomes[outcome] += 1
+
+    started = time.perf_counter()
+    for round_no in range(rounds):
+        # Every round races for a fresh date range
+        start_date = date(2030, 1, 1) + timedelta(days=7 * round_no)
+        barrier = threading.Barrier(threads)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for renter in renters:
+                pool.submit(attempt, renter, barrier, start_date)
+    elapsed = time.perf_counter() - started
+
+    double_booked = CarRental.objects.count() - rounds
+    return {
+        "threads": threads,
+        "rounds": rounds,
+        "attempts": threads * rounds,
+        "elapsed_s": round(elapsed, 3),
+        "attempts_per_s": round(threads * rounds / elapsed, 1),
+        "outcomes": outcomes,
+        "double_booked": double_booked,
+        "latency": percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with scratch_database():
+        result = run(args.threads, args.rounds)
+
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+    if result["double_booked"] or result["outcomes"]["errors"]:
+        raise SystemExit("FAIL: bookings were lost or duplicated")
+
+
+if __name__ == "__main__":
+    main()
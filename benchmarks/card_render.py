@@ -0,0 +1,78 @@
+"""
+Render time of the car results grid with cold and warm car card caches.
+
+Renders ``car_results.html`` for pages of 6 and 60 cars:
+
+* cold:    no card cached, every card rendered (the cost before card caching),
+* warm:    every card cached, as after a catalog write drops the page cache,
+* one new: one car edited since its card was cached.
+
+    python -m benchmarks.card_render --iterations 200
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django, scratch_database, percentiles
+
+
+def seed(cars):
+    from cars.models import Car, CarType
+    from cars.references import locations, makes
+    from user.models import CustomUser
+
+    owner = CustomUser.objects.create_user("500000003", "bench-pass", email="cards@bench.local")
+    car_types = CarType.objects.bulk_create(CarType(name=name) for name in ("Sedan", "SUV", "Van"))
+    toyota, tbilisi = makes().by_slug["toyota"], locations().by_slug["tbilisi"]
+    Car.objects.bulk_create(
+        Car(car_type=car_types[i % 3], car_make=toyota, location=tbilisi, car_model=f"Model {i}",
+            registration_number=f"CARD-{i}", price_per_day=40, added_by=owner)
+        for i in range(cars)
+    )
+
+
+def run(page_size, mode, iterations):
+    from django.template.loader import render_to_string
+    from django.utils import timezone
+
+    from cars.cache import catalog_cache
+    from cars.models import Car
+
+    cars = list(Car.objects.with_listing_related()[:page_size])
+    render_to_string("car_results.html", {"cars": cars})
+    samples = []
+    for _ in range(iterations):
+        if mode == "cold":
+            catalog_cache().clear()
+        elif mode == "one new":
+            cars[0].updated_at = timezone.now()
+        began = time.perf_counter()
+        render_to_string("car_results.html", {"cars": cars})
+        samples.append(time.perf_counter() - began)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    setup_django()
+
+    result = {}
+    with scratch_database():
+        seed(60)
+        for page_size in (6, 60):
+            for mode in ("cold", "warm", "one new"):
+                result[f"{page_size} cards, {mode}"] = run(page_size, mode, args.iterations)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for label, stats in result.items():
+        print(f"{label:<20} p50 {stats['p50_ms']} ms  p90 {stats['p90_ms']} ms  p99 {stats['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
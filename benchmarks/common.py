@@ -0,0 +1,60 @@
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Configure settings and the app registry for a benchmark script."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "car_rental.settings")
+    import django
+    django.setup()
+
+
+@contextmanager
+def scratch_database():
+    """
+    Create a migrated throwaway database and drop it afterwards.
+
+    The test environment is set up too, so the test client can be used.
+
+    SQLite test databases default to a shared in-memory database, which
+    reports lock errors instead of waiting on them. Benchmarks that use
+    threads need real file locking, so the SQLite copy lives in a temp file.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment(debug=False)
+    tmp_dir = None
+    if connection.vendor == "sqlite":
+        tmp_dir = tempfile.TemporaryDirectory()
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmp_dir.name, "bench.sqlite3")
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+        teardown_test_environment()
+
+
+def percentiles(samples):
+    """Summarize latency samples (seconds) as milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p90_ms": round(pick(0.90), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
@@ -0,0 +1,114 @@
+"""
+Write throughput of the database profiles.
+
+Each profile runs in its own process, because database settings are read
+once at startup. Worker threads book different cars concurrently through
+cars.services.book_car, which is the write path of CarRentView.
+
+    python -m benchmarks.db_writes --profiles sqlite-rollback sqlite-wal
+    python -m benchmarks.db_writes --profiles postgres   # needs POSTGRES_* env
+
+Profiles:
+    sqlite-rollback  SQLite with the default rollback journal, synchronous=FULL
+    sqlite-wal       SQLite with WAL, synchronous=NORMAL, mmap (the default profile)
+    postgres         PostgreSQL with persistent connections
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+PROFILES = {
+    "sqlite-rollback": {"DB_ENGINE": "sqlite", "DB_SQLITE_JOURNAL_MODE": "DELETE", "DB_SQLITE_SYNCHRONOUS": "FULL"},
+    "sqlite-wal": {"DB_ENGINE": "sqlite", "DB_SQLITE_JOURNAL_MODE": "WAL", "DB_SQLITE_SYNCHRONOUS": "NORMAL"},
+    "postgres": {"DB_ENGINE": "postgres"},
+}
+
+
+def run(threads, bookings):
+    from django.db import connection, connections
+    from cars.models import Car, CarType
+    from cars.references import locations, makes
+    from cars.services import book_car
+    from user.models import CustomUser
+    from benchmarks.common import percentiles
+
+    owner = CustomUser.objects.create_user("500000000", "bench-pass", email="owner@bench.local")
+    renter = CustomUser.objects.create_user("500000001", "bench-pass", email="renter@bench.local")
+    car_type = CarType.objects.create(name="Bench")
+    toyota, tbilisi = makes().by_slug["toyota"], locations().by_slug["tbilisi"]
+    cars = Car.objects.bulk_create(
+        Car(car_type=car_type, car_make=toyota, location=tbilisi, car_model="Prius",
+            registration_number=f"BENCH-{i}", price_per_day=50, added_by=owner)
+        for i in range(threads)
+    )
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(car):
+        # Every booking is a separate short transaction on this thread's car
+        try:
+            for i in range(bookings):
+                start_date = date(2030, 1, 1) + timedelta(days=2 * i)
+                began = time.perf_counter()
+                book_car(car.pk, renter, start_date, start_date + timedelta(days=1))
+                with lock:
+                    latencies.append(time.perf_counter() - began)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, cars))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "vendor": connection.vendor,
+        "threads": threads,
+        "bookings": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "bookings_per_s": round(len(latencies) / elapsed, 1),
+        "latency": percentiles(latencies),
+    }
+
+
+def run_profile(profile, threads, bookings):
+    """Run one profile in a child process and return its JSON result."""
+    env = {**os.environ, **PROFILES[profile]}
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.db_writes", "--child", "--threads", str(threads),
+         "--bookings", str(bookings)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=["sqlite-rollback", "sqlite-wal"])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=50, help="Bookings per thread.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        from benchmarks.common import setup_django, scratch_database
+        setup_django()
+        with scratch_database():
+            print(json.dumps(run(args.threads, args.bookings)))
+        return
+
+    for profile in args.profiles:
+        result = run_profile(profile, args.threads, args.bookings)
+        print(f"{profile:>16}: {result['bookings_per_s']:>8} bookings/s  "
+              f"p50 {result['latency']['p50_ms']} ms  p99 {result['latency']['p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Booking-funnel load test.
+
+Every virtual user walks the whole funnel against a seeded catalog:
+
+    signup -> login -> filtered list -> detail -> rent -> my rentals -> return
+
+once through Django's test client (no network, single thread), and once
+over HTTP against an in-process threaded WSGI server with ``--concurrency``
+users at a time. Each step reports its latency percentiles and errors;
+each transport reports funnels and requests per second. The result is
+written as JSON, and ``--baseline`` compares it with an earlier run so a
+regression fails the command.
+
+    python -m benchmarks.funnel --output funnel.json
+    python -m benchmarks.funnel --baseline funnel.json --tolerance 0.25
+"""
+import argparse
+import http.client
+import itertools
+import json
+import platform
+import re
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from benchmarks.common import setup_django, scratch_database, percentiles
+from benchmarks.seed import PASSWORD, seed
+
+STEPS = ("signup", "login", "list", "detail", "rent", "my_rentals", "return")
+
+
+class FunnelError(Exception):
+    pass
+
+
+class Funnel:
+    """
+    One virtual user's pass through the funnel, over any transport.
+
+    ``request(method, path, data)`` must return ``(status, location, body)``.
+    """
+
+    def __init__(self, request, phone, car_id, start_date, filters):
+        self.request = request
+        self.phone = phone
+        self.car_id = car_id
+        self.start_date = start_date
+        self.filters = filters
+
+    def expect(self, step, response, status, location=None):
+        got_status, got_location, _ = response
+        if got_status != status or (location and not (got_location or "").startswith(location)):
+            raise FunnelError(f"{step}: got {got_status} {got_location or ''}")
+        return response
+
+    def run(self, timings):
+        dates = {"start_date": self.start_date.isoformat(), "end_date": (self.start_date + timedelta(days=3)).isoformat()}
+        steps = (
+            ("signup", lambda: self.expect("signup", self.request("POST", "/user/signup/", {
+                "phone_number": self.phone, "email": f"{self.phone}@funnel.local",
+                "password1": PASSWORD, "password2": PASSWORD,
+            }), 302)),
+            ("login", lambda: self.expect("login", self.request("POST", "/user/login/", {
+                "username": self.phone, "password": PASSWORD,
+            }), 302)),
+            ("list", lambda: self.expect("list", self.request("GET", "/?" + urlencode(self.filters)), 200)),
+            ("detail", lambda: self.expect("detail", self.request("GET", f"/car/{self.car_id}/"), 200)),
+            ("rent", lambda: self.expect("rent", self.request("POST", f"/car/{self.car_id}/rent/", dates),
+                                         302, "/my-rentals/")),
+            ("my_rentals", lambda: self.expect("my_rentals", self.request("GET", "/my-rentals/"), 200)),
+        )
+        for step, call in steps:
+            started = time.perf_counter()
+            response = call()
+            timings[step].append(time.perf_counter() - started)
+
+        rental_id = re.search(rb'action="/rental/(\d+)/return/"', response[2])
+        if rental_id is None:
+            raise FunnelError("my_rentals: no rental to return")
+        started = time.perf_counter()
+        self.expect("return", self.request("POST", f"/rental/{int(rental_id.group(1))}/return/"), 302)
+        timings["return"].append(time.perf_counter() - started)
+
+
+class TestClientTransport:
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client()
+
+    def __call__(self, method, path, data=None):
+        if method == "GET":
+            response = self.client.get(path)
+        else:
+            response = self.client.post(path, data or {})
+        return response.status_code, response.get("Location"), response.content
+
+
+class HttpTransport:
+    """Tiny cookie- and CSRF-aware HTTP client, one per virtual user."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = SimpleCookie()
+
+    def __call__(self, method, path, data=None):
+        if method == "POST" and "csrftoken" not in self.cookies:
+            # Any page with a form sets the CSRF cookie
+            self("GET", "/user/login/")
+        headers = {"Host": "testserver"}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{key}={morsel.value}" for key, morsel in self.cookies.items())
+        body = None
+        if method == "POST":
+            body = urlencode({**(data or {}), "csrfmiddlewaretoken": self.cookies["csrftoken"].value})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            for header in response.headers.get_all("Set-Cookie") or []:
+                self.cookies.load(header)
+            return response.status, response.getheader("Location"), content
+        finally:
+            connection.close()
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def drive(transport_factory, funnels, concurrency, car_ids, filters, first_phone):
+    """Run ``funnels`` virtual users, ``concurrency`` at a time. Returns the step report."""
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    # Each car is rented by one user at a time; dates move on every lap of the pool
+    car_pool = itertools.count()
+    phones = itertools.count(first_phone)
+
+    def one_user(_):
+        with lock:
+            turn = next(car_pool)
+            phone = str(next(phones))
+        car_id = car_ids[turn % len(car_ids)]
+        start_date = date.today() + timedelta(days=500 + 7 * (turn // len(car_ids)))
+        user_timings = defaultdict(list)
+        try:
+            Funnel(transport_factory(), phone, car_id, start_date, filters).run(user_timings)
+        except FunnelError as exc:
+            with lock:
+                errors[str(exc).split(":")[0]] += 1
+        except Exception as exc:
+            with lock:
+                errors[type(exc).__name__] += 1
+        finally:
+            with lock:
+                for step, samples in user_timings.items():
+                    timings[step].extend(samples)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        for i in range(funnels):
+            one_user(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one_user, range(funnels)))
+    elapsed = time.perf_counter() - started
+
+    completed = len(timings["return"])
+    requests = sum(len(samples) for samples in timings.values())
+    return {
+        "funnels": funnels,
+        "completed": completed,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "funnels_per_s": round(completed / elapsed, 2),
+        "requests_per_s": round(requests / elapsed, 1),
+        "errors": dict(errors),
+        "steps": {step: percentiles(timings[step]) for step in STEPS},
+    }
+
+
+def run(args):
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+    from cars.models import Car
+
+    seeded = seed(args.users, args.cars, args.rentals, args.seed)
+    available = list(Car.objects.filter(pk__in=seeded["cars"], is_available=True).values_list("pk", flat=True))
+    filters = {"car_make": "toyota", "available_after": "2031-01-01", "available_before": "2031-01-04"}
+
+    report = {"client": drive(TestClientTransport, args.funnels, 1, available, filters, 700_000_000)}
+
+    server = make_server("127.0.0.1", 0, get_wsgi_application(), server_class=ThreadingWSGIServer,
+                         handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        report["wsgi"] = drive(lambda: HttpTransport("127.0.0.1", port), args.funnels, args.concurrency,
+                               available, filters, 800_000_000)
+    finally:
+        server.shutdown()
+        server.server_close()
+        connections.close_all()
+    return report
+
+
+def environment(args):
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+    }
+
+
+def regressions(report, baseline, tolerance):
+    """Steps whose p50 or p90 got slower than the baseline by more than ``tolerance``."""
+    found = []
+    for transport in ("client", "wsgi"):
+        for step in STEPS:
+            now = report[transport]["steps"].get(step) or {}
+            before = baseline.get(transport, {}).get("steps", {}).get(step) or {}
+            for stat in ("p50_ms", "p90_ms"):
+                if before.get(stat) and now.get(stat, 0) > before[stat] * (1 + tolerance):
+                    found.append(f"{transport} {step} {stat}: {before[stat]} -> {now[stat]}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100, help="Seeded users.")
+    parser.add_argument("--cars", type=int, default=1000, help="Seeded cars.")
+    parser.add_argument("--rentals", type=int, default=5000, help="Seeded rentals.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--funnels", type=int, default=50, help="Virtual users per transport.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Simultaneous users over HTTP.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline.")
+    args = parser.parse_args()
+
+    setup_django()
+    with scratch_database():
+        report = {"environment": environment(args), **run(args)}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output + "\n")
+    print(output)
+
+    failed = []
+    for transport in ("client", "wsgi"):
+        if report[transport]["errors"]:
+            failed.append(f"{transport} errors: {report[transport]['errors']}")
+    if args.baseline:
+        with open(args.baseline) as stream:
+            failed += regressions(report, json.load(stream), args.tolerance)
+    if failed:
+        raise SystemExit("FAIL:\n  " + "\n  ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Radius search over many pickup points, with and without the grid index.
+
+Seeds --points pickup points scattered over Georgia and times, for radii
+of 10, 30 and 100 km around random origins:
+
+* grid: Location.objects.within(), the cell prefilter plus haversine,
+* scan: haversine over every point, what the search costs without the grid.
+
+    python -m benchmarks.geo_search --points 5000 --iterations 200
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import setup_django, scratch_database, percentiles
+
+# Roughly Georgia's bounding box
+SOUTH, NORTH, WEST, EAST = 41.05, 43.55, 40.0, 46.7
+
+
+def seed(points):
+    from cars.models import Location
+
+    rng = random.Random(1)
+    for i in range(points):
+        # save() fills in the grid cell, as the admin does
+        Location.objects.create(
+            slug=f"bench-{i}", name=f"Point {i}",
+            latitude=rng.uniform(SOUTH, NORTH), longitude=rng.uniform(WEST, EAST),
+        )
+
+
+def run(mode, radius, iterations):
+    from cars.geo import distance_km
+    from cars.models import Location
+
+    rng = random.Random(2)
+    samples, found = [], 0
+    for _ in range(iterations):
+        latitude, longitude = rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+        began = time.perf_counter()
+        if mode == "grid":
+            matches = Location.objects.within(latitude, longitude, radius)
+        else:
+            matches = [
+                pk for pk, lat, lon in Location.objects.exclude(latitude=None).values_list("pk", "latitude", "longitude")
+                if distance_km(latitude, longitude, lat, lon) <= radius
+            ]
+        samples.append(time.perf_counter() - began)
+        found += len(matches)
+    return {**percentiles(samples), "avg_points": round(found / iterations, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    setup_django()
+
+    result = {}
+    with scratch_database():
+        seed(args.points)
+        for radius in (10, 30, 100):
+            for mode in ("grid", "scan"):
+                result[f"{radius} km, {mode}"] = run(mode, radius, args.iterations)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for label, stats in result.items():
+        print(
+            f"{label:<14} p50 {stats['p50_ms']} ms  p90 {stats['p90_ms']} ms  p99 {stats['p99_ms']} ms"
+            f"  ({stats['avg_points']} points)"
+        )
+
+
+if __name__ == "__main__":
+    main()
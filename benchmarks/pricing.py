@@ -0,0 +1,97 @@
+"""
+Price-quote benchmark.
+
+Quotes every car in a catalog for one date range three ways: the old
+per-car loop (one quote, and so one rules lookup, per car), a batch
+quote over cars already in memory, and the SQL annotation the list page
+uses. All three must agree.
+
+    python -m benchmarks.pricing --cars 10000 --days 14
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import setup_django, scratch_database
+
+
+def seed(cars):
+    from cars.models import Car, CarType, PricingRule
+    from cars.references import locations, makes
+    from user.models import CustomUser
+
+    owner = CustomUser.objects.create_user("500000001", "bench-pass", email="pricing@bench.local")
+    car_types = CarType.objects.bulk_create(CarType(name=name) for name in ("Sedan", "SUV", "Van", "Coupe"))
+    rng = random.Random(1)
+    toyota, tbilisi = makes().by_slug["toyota"], locations().by_slug["tbilisi"]
+    Car.objects.bulk_create(
+        (
+            Car(car_type=rng.choice(car_types), car_make=toyota, location=tbilisi, car_model=f"Model {i}",
+                registration_number=f"PRICE-{i}", price_per_day=rng.randint(20, 200), added_by=owner)
+            for i in range(cars)
+        ),
+        batch_size=2000,
+    )
+    PricingRule.objects.bulk_create([
+        PricingRule(name="Saturday", kind="weekday", weekday=5, multiplier="1.20"),
+        PricingRule(name="Sunday", kind="weekday", weekday=6, multiplier="1.20"),
+        PricingRule(name="Summer", kind="season", starts_on=date(2030, 6, 1), ends_on=date(2030, 8, 31),
+                    multiplier="1.15"),
+        PricingRule(name="Week", kind="duration", min_days=7, multiplier="0.90"),
+        PricingRule(name="SUV fortnight", kind="duration", min_days=14, multiplier="0.80", car_type=car_types[1]),
+        PricingRule(name="Van weekdays", kind="weekday", weekday=0, multiplier="0.95", car_type=car_types[2]),
+    ])
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def run(days):
+    from cars.models import Car
+    from cars.pricing import annotate_quotes, quote_cars, quote_price
+
+    start_date = date(2030, 5, 25)
+    end_date = start_date + timedelta(days=days)
+    cars = list(Car.objects.only("pk", "car_type_id", "price_per_day"))
+
+    per_car, per_car_ms = timed(lambda: {car.pk: quote_price(car, start_date, end_date) for car in cars})
+    batch, batch_ms = timed(lambda: quote_cars(cars, start_date, end_date))
+    annotated, sql_ms = timed(lambda: dict(
+        annotate_quotes(Car.objects.all(), start_date, end_date).values_list("pk", "quoted_total")
+    ))
+    page, page_ms = timed(lambda: list(annotate_quotes(Car.objects.all(), start_date, end_date)[:6]))
+
+    return {
+        "cars": len(cars),
+        "days": days,
+        "per_car_loop_ms": per_car_ms,
+        "batch_in_memory_ms": batch_ms,
+        "sql_annotation_ms": sql_ms,
+        "sql_first_page_ms": page_ms,
+        "mismatches": sum(per_car[pk] != batch[pk] or per_car[pk] != annotated[pk] for pk in per_car),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=14)
+    args = parser.parse_args()
+
+    setup_django()
+    with scratch_database():
+        seed(args.cars)
+        result = run(args.days)
+
+    for key, value in result.items():
+        print(f"{key:>20}: {value}")
+    if result["mismatches"]:
+        raise SystemExit("FAIL: batch quotes disagree with single quotes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Deterministic data generator for benchmarks and demos.
+
+Seeds N users, cars spread over every location and make, and M rentals
+laid out back to back per car so none overlap. Rentals that ended in the
+past are returned; the rest hold their car. The derived tables (booked
+ranges, stats, search index) are rebuilt at the end, as after a real
+import. The same ``--seed`` always produces the same data.
+
+    python -m benchmarks.seed --users 200 --cars 2000 --rentals 10000
+
+From the command line it writes into the configured database, and refuses
+to touch one that already has cars unless given ``--append``.
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import setup_django
+
+PASSWORD = "Bench-pass-2030!"
+
+
+def seed(users=100, cars=1000, rentals=5000, seed=0, today=None, batch_size=2000):
+    """Create the data set; returns ``{"users": [...ids], "cars": [...ids]}``."""
+    from django.contrib.auth.hashers import make_password
+    from cars.models import Car, CarType, CarRental, BookedRange
+    from cars.references import locations, makes
+    from cars.search import rebuild_search_index
+    from cars.stats import rebuild_stats
+    from user.models import CustomUser
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    # Hashing is deliberately slow, so every seeded user shares one hash
+    password = make_password(PASSWORD)
+
+    first_phone = 510_000_000 + seed * 1_000_000
+    CustomUser.objects.bulk_create(
+        (
+            CustomUser(phone_number=str(first_phone + i), email=f"user{i}.{seed}@bench.local", password=password)
+            for i in range(users)
+        ),
+        batch_size=batch_size,
+    )
+    user_ids = list(CustomUser.objects.filter(email__endswith=f".{seed}@bench.local").values_list("pk", flat=True))
+
+    car_types = [CarType.objects.get_or_create(name=name)[0] for name in ("Sedan", "SUV", "Hatchback", "Van", "Coupe")]
+    make_rows, location_rows = makes().rows, locations().rows
+    transmissions = [transmission for transmission, _ in Car.TRANSMISSION_CHOICES]
+    capacities = [capacity for capacity, _ in Car.CAPACITY_CHOICES]
+    years = [year for year, _ in Car.YEAR_CHOICES]
+    Car.objects.bulk_create(
+        (
+            Car(
+                car_type=rng.choice(car_types),
+                car_make=make_rows[i % len(make_rows)],
+                car_model=f"Model {rng.randint(1, 60)}",
+                model_year=rng.choice(years),
+                location=location_rows[i % len(location_rows)],
+                transmission=rng.choice(transmissions),
+                car_capacity=rng.choice(capacities),
+                registration_number=f"BN-{seed}-{i:07d}",
+                price_per_day=rng.randint(20, 250),
+                description=f"Seeded car {i}",
+                added_by_id=rng.choice(user_ids),
+            )
+            for i in range(cars)
+        ),
+        batch_size=batch_size,
+    )
+    car_rows = list(
+        Car.objects.filter(registration_number__startswith=f"BN-{seed}-").values_list("pk", "price_per_day", "location")
+    )
+
+    # Back-to-back rentals per car, the latest ones running into the future
+    next_start = {car_id: today - timedelta(days=rng.randint(30, 400)) for car_id, _, _ in car_rows}
+    new_rentals = []
+    for _ in range(rentals):
+        car_id, price, location_id = rng.choice(car_rows)
+        start_date = next_start[car_id]
+        days = rng.randint(1, 10)
+        end_date = start_date + timedelta(days=days)
+        next_start[car_id] = end_date + timedelta(days=rng.randint(0, 5))
+        new_rentals.append(CarRental(
+            car_id=car_id, location_id=location_id, user_id=rng.choice(user_ids), start_date=start_date, end_date=end_date,
+            total_price=days * price, returned=end_date <= today,
+        ))
+    CarRental.objects.bulk_create(new_rentals, batch_size=batch_size)
+
+    open_rentals = CarRental.objects.filter(returned=False, car__registration_number__startswith=f"BN-{seed}-")
+    BookedRange.objects.bulk_create(
+        (
+            BookedRange(car_id=car_id, rental_id=rental_id, start_date=start_date, end_date=end_date)
+            for rental_id, car_id, start_date, end_date
+            in open_rentals.values_list("pk", "car_id", "start_date", "end_date").iterator()
+        ),
+        batch_size=batch_size,
+    )
+    Car.objects.filter(pk__in=open_rentals.on_the_road().values("car_id")).update(is_available=False)
+
+    rebuild_stats()
+    rebuild_search_index()
+    return {"users": user_ids, "cars": [car_id for car_id, _, _ in car_rows]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--rentals", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--append", action="store_true", help="Seed even if the database already has cars.")
+    args = parser.parse_args()
+
+    setup_django()
+    from cars.models import Car
+
+    if Car.objects.exists() and not args.append:
+        raise SystemExit("The database already has cars; pass --append to add the seeded data anyway.")
+    created = seed(args.users, args.cars, args.rentals, args.seed)
+    print(f"Seeded {len(created['users'])} users, {len(created['cars'])} cars and {args.rentals} rentals.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Responses for files on disk, shared by the static and media servers.
+
+file_response() sends one file with validators and caching headers and
+answers:
+
+* ``If-None-Match`` with 304 Not Modified,
+* HEAD with the headers alone,
+* a single-range ``Range: bytes=…`` with 206 Partial Content (multiple
+  ranges get the whole file, which HTTP allows), honouring ``If-Range``,
+* anything else with a FileResponse, which WSGI servers that implement
+  ``wsgi.file_wrapper`` (gunicorn, uWSGI) send with sendfile().
+"""
+import re
+
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def byte_range(header, size):
+    """
+    Return the inclusive ``(start, end)`` of a Range header for a file of
+    ``size`` bytes, or None to send the whole file.
+
+    Raises RangeNotSatisfiable when the range starts past the end.
+    """
+    match = _BYTE_RANGE.match(header.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(path, start, length, block_size=FileResponse.block_size):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, stat, content_type, cache_control, encoding=None, vary=None):
+    """Serve ``path`` (whose ``os.stat()`` is ``stat``) for ``request``; see the module docstring."""
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    headers = {"Cache-Control": cache_control, "ETag": etag, "Last-Modified": http_date(stat.st_mtime)}
+    if vary:
+        headers["Vary"] = vary
+
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    span = None
+    if request.method == "GET" and "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+        try:
+            span = byte_range(request.headers["Range"], stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = stat.st_size
+    elif span is not None:
+        start, end = span
+        response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206,
+                                         content_type=content_type)
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        del response["Content-Disposition"]
+
+    if encoding is not None:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,49 @@
+"""
+Serving uploaded media from MEDIA_ROOT.
+
+Photos (cars.storage) and their WebP renditions (cars.images) are named
+after a hash of their content, so their bytes never change and they are
+sent with a year-long ``immutable`` Cache-Control. Any other file gets
+MEDIA_MAX_AGE and revalidates with its ETag. Responses support Range and
+conditional requests through car_rental.files.file_response().
+
+A front-end server in front of MEDIA_ROOT is still faster, but this keeps
+photos working, and cacheable, when the app serves everything itself.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponseNotAllowed
+from django.utils._os import safe_join
+
+from car_rental.files import file_response
+from car_rental.staticfiles import IMMUTABLE_CACHE_CONTROL
+
+# sha256 photo names and the 20-hex-digit prefix of rendition names
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{20,64}[-.]")
+
+
+def media_view(request, path):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    if _CONTENT_ADDRESSED.match(posixpath.basename(path)):
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = f"public, max-age={settings.MEDIA_MAX_AGE}"
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    return file_response(request, full_path, stat, content_type, cache_control)
@@ -0,0 +1,275 @@
+"""
+Production request metrics.
+
+MonitoringMiddleware tags every request with its URL name (``cars:car_list``)
+and records:
+
+* wall time,
+* number and total time of database queries, through an execute wrapper
+  installed once per connection,
+* template render time, through the InstrumentedDjangoTemplates backend.
+
+Samples go into process-local histograms served in the Prometheus text
+format at ``/metrics``. Every server process keeps its own histograms, so
+scrape each worker and let Prometheus sum them.
+
+``QUERY_BUDGETS`` caps the queries a view may run per request. An overrun is
+logged, or raised as QueryBudgetExceeded when ``QUERY_BUDGET_ACTION`` is
+``"raise"``, which fails any test that hits it.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more queries than its QUERY_BUDGETS entry allows."""
+
+
+def _format_labels(labels):
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label_values, value):
+        series = self.series.setdefault(label_values, {"buckets": [0] * len(self.buckets), "sum": 0, "count": 0})
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["buckets"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def samples(self):
+        for label_values, series in self.series.items():
+            labels = list(zip(self.label_names, label_values))
+            for bound, count in zip(self.buckets, series["buckets"]):
+                yield f"{self.name}_bucket{_format_labels(labels + [('le', bound)])} {count}"
+            yield f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {series['count']}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series['sum']}"
+            yield f"{self.name}_count{_format_labels(labels)} {series['count']}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, label_values, amount=1):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in self.series.items():
+            yield f"{self.name}{_format_labels(zip(self.label_names, label_values))} {value}"
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_seconds = Histogram(
+            "car_rental_request_duration_seconds", "Wall time of a request.", ("view",), TIME_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            "car_rental_db_queries", "Database queries run by a request.", ("view",), QUERY_BUCKETS,
+        )
+        self.db_seconds = Histogram(
+            "car_rental_db_duration_seconds", "Time a request spent in database queries.", ("view",), TIME_BUCKETS,
+        )
+        self.template_seconds = Histogram(
+            "car_rental_template_render_seconds", "Time a request spent rendering templates.", ("view",),
+            TIME_BUCKETS,
+        )
+        self.responses = Counter("car_rental_responses_total", "Responses by view and status.", ("view", "status"))
+        self.budget_overruns = Counter(
+            "car_rental_query_budget_exceeded_total", "Requests that ran over their query budget.", ("view",),
+        )
+        self.metrics = (
+            self.request_seconds, self.db_queries, self.db_seconds, self.template_seconds,
+            self.responses, self.budget_overruns,
+        )
+
+    def record(self, view, status, wall_time, request_metrics):
+        with self.lock:
+            self.request_seconds.observe((view,), wall_time)
+            self.db_queries.observe((view,), request_metrics.queries)
+            self.db_seconds.observe((view,), request_metrics.query_time)
+            self.template_seconds.observe((view,), request_metrics.template_time)
+            self.responses.inc((view, str(status)))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """What one request spent, filled in by the query counter and the template backend."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Execute wrapper that adds each query to the request running it.
+
+    One instance sits on every connection for good and finds its request
+    through the context variable. Concurrent async requests share the sync
+    thread's connection, and each of them only sees its own queries.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_time += time.perf_counter() - started
+
+
+def install_query_counter():
+    """Put count_query on this thread's connections, once."""
+    for connection in connections.all():
+        if count_query not in connection.execute_wrappers:
+            # At the front, where the pop() that ends connection.execute_wrapper() never reaches it
+            connection.execute_wrappers.insert(0, count_query)
+
+
+class TimedTemplate:
+    """Template wrapper that adds its render time to the current request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            # Outside a request, or nested in a render that is already timed
+            return self.template.render(context, request)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+            metrics.rendering = False
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render times reported to MonitoringMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class MonitoringMiddleware:
+    """
+    Record wall, query and template time per request, by URL name.
+
+    Under ASGI the query counter is installed on the connections of the
+    request's sync thread, where async views run their ORM calls.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        metrics = RequestMetrics()
+        install_query_counter()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        metrics = RequestMetrics()
+        await sync_to_async(install_query_counter)()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    def finish(self, request, response, wall_time, metrics):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        registry.record(view, response.status_code, wall_time, metrics)
+
+        budget = settings.QUERY_BUDGETS.get(view)
+        if budget is not None and metrics.queries > budget:
+            with registry.lock:
+                registry.budget_overruns.inc((view,))
+            message = f"{view} ran {metrics.queries} queries, over its budget of {budget}"
+            if settings.QUERY_BUDGET_ACTION == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, limited to METRICS_ALLOWED_IPS when that is set."""
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed and request.META.get("REMOTE_ADDR") not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -24,9 +24,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-tb=j2u+xmm8koq(*vyq5@e)_u4*3l838u2b-id#a=1&##79m8o'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     # local
     'user',
     'cars',
+    'tasks',
 #     3rd party
     'debug_toolbar',
     'crispy_forms',
@@ -51,7 +52,11 @@ CRISPY_TEMPLATE_PACK = 'bootstrap5'
 CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware
+    'car_rental.monitoring.MonitoringMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Answers /static/ before sessions and auth run; off under DEBUG
+    'car_rental.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -65,8 +70,10 @@ ROOT_URLCONF = 'car_rental.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'car_rental.monitoring.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
+        # Without an explicit 'loaders' option Django wraps these in the cached
+        # loader, DEBUG included (it reloads edited templates there)
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -80,17 +87,159 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'car_rental.wsgi.application'
 
+# Request metrics (car_rental.monitoring), scraped from /metrics
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip]
+
+# Most queries a request to each view may run, session and user lookups
+# included. "log" warns on an overrun, "raise" fails the request (and the test).
+# The listings get one more for the pricing rules when quoting for dates.
+QUERY_BUDGETS = {
+    "cars:car_list": 6,
+    "cars:car_detail": 3,
+    "cars:my_cars": 6,
+    "cars:my_rentals": 4,
+    "cars:my_rentals_archive": 4,
+    "cars:car_rent": 30,
+    "cars:return_car": 16,
+    "cars:car_list_async": 6,
+    "cars:car_detail_async": 3,
+    "cars:my_rentals_async": 4,
+    "cars:api_car_list": 5,
+    "cars:api_car_detail": 3,
+}
+QUERY_BUDGET_ACTION = os.environ.get("QUERY_BUDGET_ACTION", "log")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# DB_ENGINE=sqlite (default) or postgres. Every knob below can be set from
+# the environment, so the same settings file serves development and
+# production.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'car_rental'),
+            'USER': os.environ.get('POSTGRES_USER', 'car_rental'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Keep connections open between requests and check them before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+    # Native pooling needs psycopg 3 and replaces persistent connections
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+else:
+    # WAL lets readers run alongside the single writer, and synchronous=NORMAL
+    # is durable in WAL mode while skipping an fsync per commit.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('DB_SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(os.environ.get('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('DB_SQLITE_CACHE_SIZE', -20000)),
+    }
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+                'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            },
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# The "catalog" cache holds rendered car list pages and the catalog version
+# counter that invalidates them. Local memory is per process; set
+# CATALOG_CACHE=file to share it between workers on one host.
+
+CATALOG_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', BASE_DIR / '.cache' / 'catalog'),
+    },
+}
+
+# The "throttle" cache counts failed logins (user.throttle). Per-process
+# counters let each worker allow the full limit, so set THROTTLE_CACHE=file
+# when running several.
+THROTTLE_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', BASE_DIR / '.cache' / 'throttle'),
+    },
+}
 
-DATABASES = {
+# The "auth" cache holds signed-in users (user.cache) and, with
+# SESSION_STRATEGY=cached_db, the sessions. A per-process cache lets a
+# logged-out cached_db session live on in the other workers' caches, so
+# run cached_db with AUTH_CACHE=file when there is more than one.
+AUTH_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('AUTH_CACHE_LOCATION', BASE_DIR / '.cache' / 'auth'),
+    },
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': CATALOG_CACHE_BACKENDS[os.environ.get('CATALOG_CACHE', 'locmem')],
+    'throttle': THROTTLE_CACHE_BACKENDS[os.environ.get('THROTTLE_CACHE', 'locmem')],
+    'auth': AUTH_CACHE_BACKENDS[os.environ.get('AUTH_CACHE', 'locmem')],
 }
 
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_PAGE_CACHE_TIMEOUT = 300
+# Rendered car cards (cars.templatetags.car_cards) are keyed by the car's
+# updated_at, so they outlive the page cache and need no invalidation
+CAR_CARD_CACHE_TIMEOUT = 24 * 3600
+
+# Radius search (?near=...&radius=..., cars.geo): the radius used when none
+# is given and the largest one accepted, in km
+GEO_DEFAULT_RADIUS_KM = float(os.environ.get('GEO_DEFAULT_RADIUS_KM', 30))
+GEO_MAX_RADIUS_KM = float(os.environ.get('GEO_MAX_RADIUS_KM', 500))
+
+# Car listing pagination: "offset" (numbered pages) or "cursor" (keyset on
+# date_added, id). In cursor mode CAR_LIST_COUNT_MODE = "approximate" skips
+# the exact COUNT(*) and counts filtered results only up to CAR_LIST_COUNT_CAP.
+CAR_LIST_PAGINATION = os.environ.get('CAR_LIST_PAGINATION', 'offset')
+CAR_LIST_COUNT_MODE = os.environ.get('CAR_LIST_COUNT_MODE', 'exact')
+CAR_LIST_COUNT_CAP = 1000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -112,7 +261,46 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'user.CustomUser'
 
-# AUTHENTICATION_BACKENDS = ["user.backends.PhoneNumberBackend"]
+AUTHENTICATION_BACKENDS = ["user.backends.PhoneNumberBackend"]
+
+# Where sessions live:
+#   "db"             one query per request (Django's default)
+#   "cached_db"      the auth cache, written through to the database
+#   "signed_cookies" in the cookie itself, no server-side read at all; logout
+#                    clears the browser's cookie but can't revoke a copy of it
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_STRATEGY = os.environ.get('SESSION_STRATEGY', 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STRATEGY]
+SESSION_CACHE_ALIAS = 'auth'
+
+# Seconds a signed-in user is served from the auth cache (user.cache); 0 turns it off
+USER_CACHE_ALIAS = 'auth'
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 30))
+
+# Numbers typed without a country code are in this one (see user.phone)
+PHONE_DEFAULT_COUNTRY_CODE = '995'
+
+# Failed logins allowed per sliding window of LOGIN_THROTTLE_WINDOW seconds,
+# from one client IP and against one phone number
+LOGIN_THROTTLE_CACHE_ALIAS = 'throttle'
+LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 30))
+LOGIN_THROTTLE_PHONE_LIMIT = int(os.environ.get('LOGIN_THROTTLE_PHONE_LIMIT', 5))
+
+# PBKDF2 cost of new password hashes. Existing hashes are rewritten with the
+# new cost at their owner's next login.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 1_000_000))
+PASSWORD_HASHERS = [
+    'user.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
 
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/user/login/"
@@ -143,8 +331,46 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed names plus .gz/.br copies, served by
+# car_rental.staticfiles.StaticFilesMiddleware; development serves the sources
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'car_rental.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+# Cache lifetime (seconds) of static files without a content hash in their name
+STATIC_MAX_AGE = 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Served by car_rental.media; photos are content-addressed (cars.storage) and
+# cached for good, anything else for MEDIA_MAX_AGE seconds
+MEDIA_MAX_AGE = 3600
+
+# WebP renditions of car photos, built by a background task after upload
+CAR_IMAGE_WIDTHS = (320, 640, 1024)
+CAR_IMAGE_QUALITY = 80
+
+# Returned rentals that ended this many months ago move to the archive table
+# (cars.archive, `manage.py archive_rentals` from cron)
+RENTAL_ARCHIVE_AFTER_MONTHS = int(os.environ.get('RENTAL_ARCHIVE_AFTER_MONTHS', 12))
+
+# Background tasks (tasks app), run by `manage.py run_workers`. Workers are
+# separate processes, so use CATALOG_CACHE=file (or a shared cache) for
+# their catalog invalidations to reach the web processes.
+# TASKS_EAGER runs tasks inline instead of queueing them.
+TASKS_EAGER = os.environ.get("TASKS_EAGER", "0") == "1"
+TASKS_WORKER_PROCESSES = int(os.environ.get("TASKS_WORKER_PROCESSES", 2))
+TASKS_POLL_INTERVAL = 1.0
+TASKS_VISIBILITY_TIMEOUT = 300
+TASKS_RETRY_BACKOFF = 5
+TASKS_RETRY_BACKOFF_MAX = 600
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
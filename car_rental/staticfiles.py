@@ -0,0 +1,149 @@
+"""
+Static files in production: content-hashed names, pre-compressed copies,
+served from the app process.
+
+CompressedManifestStaticFilesStorage is Django's ManifestStaticFilesStorage
+(``style.css`` is collected as ``style.3f2a….css`` and ``{% static %}``
+links to that) which also writes a ``.gz`` copy of every compressible file,
+and a ``.br`` copy when the brotli package is installed, at collectstatic
+time. A copy is kept only when it saves at least 5%.
+
+StaticFilesMiddleware answers requests under STATIC_URL from STATIC_ROOT
+before the rest of the stack runs. It indexes STATIC_ROOT once at startup,
+so restart after collectstatic. Hashed names never change content, so they
+are sent with a year-long ``immutable`` Cache-Control and a browser never
+asks for them again; other names get STATIC_MAX_AGE and revalidate with
+their ETag. The smallest encoding the client accepts is sent, through
+car_rental.files.file_response().
+
+Development (DEBUG) keeps the plain storage, and runserver serves the
+source files.
+"""
+import gzip
+import mimetypes
+import os
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import HttpResponseNotAllowed
+
+from car_rental.files import file_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Already compressed; gzip would only cost CPU
+INCOMPRESSIBLE = {
+    ".gz", ".br", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2", ".mp4", ".webm",
+}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        collected = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                collected.update(filter(None, (name, hashed_name)))
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(collected):
+                self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() in INCOMPRESSIBLE:
+            return
+        with self.open(name) as original:
+            content = original.read()
+        encoders = [(".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append((".br", brotli.compress))
+        for suffix, encode in encoders:
+            compressed = encode(content)
+            if len(compressed) < len(content) * 0.95:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+
+class StaticFile:
+    """One file under STATIC_ROOT and its compressed copies, best first."""
+
+    def __init__(self, path, cache_control):
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cache_control = cache_control
+        self.variants = [
+            (encoding, path + suffix, os.stat(path + suffix))
+            for encoding, suffix in (("br", ".br"), ("gzip", ".gz"))
+            if os.path.exists(path + suffix)
+        ]
+        self.variants.append((None, path, os.stat(path)))
+
+    def pick(self, accept_encoding):
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        for encoding, path, stat in self.variants:
+            if encoding is None or encoding in accepted:
+                return encoding, path, stat
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files; see the module docstring."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.files = self.index(settings.STATIC_ROOT)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def index(root):
+        hashed = set(ManifestStaticFilesStorage(location=root).hashed_files.values())
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                if name.endswith((".gz", ".br")) and os.path.exists(path[:-3]):
+                    continue
+                cache_control = (
+                    IMMUTABLE_CACHE_CONTROL if name in hashed else f"public, max-age={settings.STATIC_MAX_AGE}"
+                )
+                files[name] = StaticFile(path, cache_control)
+        return files
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        return response if response is not None else await self.get_response(request)
+
+    def serve(self, request):
+        if not request.path_info.startswith(self.prefix):
+            return None
+        static_file = self.files.get(request.path_info[len(self.prefix):])
+        if static_file is None:
+            return None
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+
+        encoding, path, stat = static_file.pick(request.headers.get("Accept-Encoding", ""))
+        return file_response(
+            request, path, stat, static_file.content_type, static_file.cache_control, encoding=encoding,
+            vary="Accept-Encoding" if len(static_file.variants) > 1 else None,
+        )
@@ -19,15 +19,16 @@ from django.contrib import admin
 from django.urls import path, include
 from debug_toolbar.toolbar import debug_toolbar_urls
 from django.conf import settings
-from django.conf.urls.static import static
+
+from car_rental.media import media_view
+from car_rental.monitoring import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('cars.urls', namespace='cars')),
     path('user/', include('user.urls', namespace='user')),
+    path('metrics', metrics_view, name='metrics'),
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', media_view, name='media'),
 
 
 ] + debug_toolbar_urls()
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
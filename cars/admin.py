@@ -1,25 +1,106 @@
 from django.contrib import admin
 
-from cars.models import Car, CarType, CarRental
+from cars.cache import bump_catalog_version
+from cars.models import (
+    Car, CarType, CarRental, CarRentalArchive, PricingRule, OwnerStats, LocationStats, DailyStats, SweepRun, Make,
+    Location,
+)
 
 # admin.site.register([Car, CarType])
 
 
 @admin.register(Car)
 class CarAdmin(admin.ModelAdmin):
-    list_display = ('car_make', 'car_type', 'model_year', 'registration_number', 'is_available')
+    list_display = ('car_make', 'car_type', 'model_year', 'location', 'registration_number', 'is_available')
+    list_filter = ('car_make', 'location')
     actions = ('make_product_available', 'make_product_unavailable')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_listing_related()
+
     @admin.action(description="<Make product available>")
     def make_product_available(self, request, queryset):
         queryset.update(is_available=True)
+        bump_catalog_version()
 
     @admin.action(description="<Make product unavailable>")
     def make_product_unavailable(self, request, queryset):
         queryset.update(is_available=False)
+        bump_catalog_version()
 
 
 
 @admin.register(CarType)
 class CarTypeAdmin(admin.ModelAdmin):
     list_display = ('id', 'name')
+
+
+@admin.register(Make)
+class ReferenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
+
+
+@admin.register(Location)
+class LocationAdmin(ReferenceAdmin):
+    list_display = ('name', 'slug', 'latitude', 'longitude')
+
+
+@admin.register(CarRental)
+class CarRentalAdmin(admin.ModelAdmin):
+    list_display = ('car', 'user', 'start_date', 'end_date', 'total_price', 'returned')
+    list_filter = ('returned',)
+    raw_id_fields = ('car', 'user')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_listing_related()
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'kind', 'multiplier', 'car_type', 'weekday', 'starts_on', 'ends_on', 'min_days', 'is_active')
+    list_filter = ('kind', 'is_active', 'car_type')
+
+
+class StatsAdmin(admin.ModelAdmin):
+    """Read-only: these rows are written by the app (cars.stats, the sweeper, the archiver), never by hand."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OwnerStats)
+class OwnerStatsAdmin(StatsAdmin):
+    list_display = ('owner', 'car_count', 'active_rentals', 'utilization', 'total_rentals', 'rented_days', 'revenue')
+    list_select_related = ('owner',)
+
+
+@admin.register(LocationStats)
+class LocationStatsAdmin(StatsAdmin):
+    list_display = ('location', 'car_count', 'active_rentals', 'utilization', 'total_rentals', 'rented_days', 'revenue')
+    list_select_related = ('location',)
+
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(StatsAdmin):
+    list_display = ('day', 'total_rentals', 'rented_days', 'revenue')
+    date_hierarchy = 'day'
+
+
+@admin.register(SweepRun)
+class SweepRunAdmin(StatsAdmin):
+    list_display = ('started_at', 'cutoff', 'batches', 'rentals_returned', 'cars_freed', 'duration')
+
+
+@admin.register(CarRentalArchive)
+class CarRentalArchiveAdmin(StatsAdmin):
+    list_display = ('car', 'user', 'start_date', 'end_date', 'total_price', 'archived_on')
+    raw_id_fields = ('car', 'user')
+    date_hierarchy = 'rented_on'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_listing_related()
@@ -0,0 +1,169 @@
+"""
+Read-only JSON API for the catalog.
+
+Rows are serialized straight from ``values()`` so no model instances are
+built. Every response carries a strong ETag and Last-Modified derived from
+the catalog version, so a revalidation is answered with a 304 from the cache
+alone, without touching the database.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator, InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
+
+from .cache import catalog_cache, get_catalog_modified, get_catalog_version, listing_cache_key, normalize_querystring
+from .filters import CarFilter
+from .models import Car, BookedRange
+from .pricing import CENT
+from .references import locations, makes
+
+LIST_FIELDS = (
+    "id", "car_make", "car_model", "model_year", "car_capacity", "transmission", "location",
+    "price_per_day", "is_available", "image", "image_renditions", "date_added", "car_type__name",
+)
+DETAIL_FIELDS = LIST_FIELDS + (
+    "registration_number", "description", "image2", "image3", "added_by__phone_number",
+)
+IMAGE_FIELDS = ("image", "image2", "image3")
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+
+def catalog_etag(request, *args, **kwargs):
+    key = f"{request.path}?{normalize_querystring(request.GET)}"
+    digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()[:16]
+    return f"{get_catalog_version()}-{digest}"
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return get_catalog_modified()
+
+
+catalog_conditional = method_decorator(
+    condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified), name="dispatch"
+)
+
+
+def serialize_car(row):
+    """Turn a ``values()`` row into its JSON form, with photo paths as URLs and makes and cities by slug."""
+    car = {key.replace("__", "_"): value for key, value in row.items()}
+    for field, table in (("car_make", makes), ("location", locations)):
+        if field in car:
+            # From the reference cache rather than a join per list query
+            reference = table().by_id[car[field]]
+            car[field], car[f"{field}_name"] = reference.slug, reference.name
+    for field in IMAGE_FIELDS:
+        if field in car:
+            car[field] = default_storage.url(car[field]) if car[field] else None
+    if car.get("quoted_total") is not None:
+        # Computed totals come back unscaled from SQLite
+        car["quoted_total"] = car["quoted_total"].quantize(CENT)
+    renditions = car.pop("image_renditions", None) or {}
+    car["image_srcset"] = {
+        field: {width: default_storage.url(name) for width, name in rendition["widths"].items()}
+        for field, rendition in renditions.items()
+        if rendition["source"] == row.get(field)
+    }
+    return car
+
+
+def cached_json(cache_key, build):
+    """JSON response whose body is cached under the current catalog version."""
+    body = catalog_cache().get(cache_key)
+    if body is None:
+        payload, status = build()
+        body = json.dumps(payload, cls=DjangoJSONEncoder)
+        if status != 200:
+            return HttpResponse(body, status=status, content_type="application/json")
+        catalog_cache().set(cache_key, body, settings.CATALOG_PAGE_CACHE_TIMEOUT)
+    return HttpResponse(body, content_type="application/json")
+
+
+@catalog_conditional
+class CarListApiView(View):
+    """``GET /api/cars/?<CarFilter params>&page=&page_size=``"""
+
+    def get(self, request):
+        params = CarFilter.query_params() | {"page", "page_size"}
+        return cached_json(listing_cache_key("api_car_list", request.GET, params), lambda: self.build(request))
+
+    def build(self, request):
+        filterset = CarFilter(request.GET, queryset=Car.objects.all())
+        if not filterset.is_valid():
+            return {"errors": filterset.errors}, 400
+
+        try:
+            page_size = min(int(request.GET.get("page_size", API_PAGE_SIZE)), API_MAX_PAGE_SIZE)
+        except ValueError:
+            page_size = API_PAGE_SIZE
+        queryset = filterset.qs
+        fields = LIST_FIELDS
+        if "quoted_total" in queryset.query.annotations:
+            # ?available_after=&available_before= quotes each car for the dates
+            fields += ("quoted_total",)
+        paginator = Paginator(queryset.values(*fields), max(page_size, 1))
+        try:
+            page = paginator.page(request.GET.get("page", 1))
+        except InvalidPage as exc:
+            return {"errors": {"page": [str(exc)]}}, 404
+
+        return {
+            "count": paginator.count,
+            "page": page.number,
+            "num_pages": paginator.num_pages,
+            "results": [serialize_car(row) for row in page.object_list],
+        }, 200
+
+
+@catalog_conditional
+class CarDetailApiView(View):
+    """``GET /api/cars/<pk>/``"""
+
+    def get(self, request, pk):
+        row = Car.objects.filter(pk=pk).values(*DETAIL_FIELDS).first()
+        if row is None:
+            raise Http404("No car matches the given query.")
+        return JsonResponse(serialize_car(row))
+
+
+@catalog_conditional
+class CarAvailabilityApiView(View):
+    """
+    ``GET /api/cars/<pk>/availability/?start=YYYY-MM-DD&end=YYYY-MM-DD``
+
+    Lists the car's booked ranges and, when dates are given, whether the car
+    is free for the half-open period [start, end). Like the list's date
+    filter and book_car, that goes by the booked ranges alone;
+    ``is_available`` only says whether the car is out today.
+    """
+
+    def get(self, request, pk):
+        row = Car.objects.filter(pk=pk).values("id", "is_available").first()
+        if row is None:
+            raise Http404("No car matches the given query.")
+
+        booked = BookedRange.objects.filter(car_id=pk).order_by("start_date").values("start_date", "end_date")
+        payload = {"car": row["id"], "is_available": row["is_available"], "booked": list(booked)}
+
+        start, end = request.GET.get("start"), request.GET.get("end")
+        if start and end:
+            try:
+                start_date = datetime.strptime(start, "%Y-%m-%d").date()
+                end_date = datetime.strptime(end, "%Y-%m-%d").date()
+            except ValueError:
+                return JsonResponse({"errors": {"dates": ["Use YYYY-MM-DD."]}}, status=400)
+            if end_date <= start_date:
+                return JsonResponse({"errors": {"dates": ["end must be after start."]}}, status=400)
+            payload["available_for_dates"] = not any(
+                period["start_date"] < end_date and period["end_date"] > start_date for period in payload["booked"]
+            )
+        return JsonResponse(payload)
@@ -0,0 +1,88 @@
+"""
+Async variants of the read-only pages, for deployments served through ASGI.
+
+They share filtering, caching and pagination with the sync views in
+``cars.views`` but fetch rows with the async ORM. Everything a template
+needs is loaded before rendering, so no sync query runs on the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.views import View
+from django.views.generic.base import TemplateResponseMixin
+from django.views.generic.list import MultipleObjectMixin
+from django_filters.views import FilterMixin
+
+from .models import Car, CarRental
+from .pagination import CursorPaginationMixin
+from .views import CarListingMixin, MyRentalsView
+
+
+async def aload_user(request):
+    """Resolve ``request.user`` with the async ORM before any template reads it."""
+    request.user = await request.auser()
+    return request.user
+
+
+class AsyncCarListView(CarListingMixin, CursorPaginationMixin, FilterMixin, MultipleObjectMixin,
+                       TemplateResponseMixin, View):
+
+    async def get(self, request, *args, **kwargs):
+        await aload_user(request)
+        self.filterset = self.get_filterset(self.get_filterset_class())
+
+        results_html = self.get_cached_results()
+        if results_html is None:
+            # Validation may look up a submitted car type and a search queries its
+            # index, both sync, so the filtering runs in a thread
+            object_list = await sync_to_async(self.filter_queryset)()
+            paginator, page, cars, is_paginated = await self.apaginate_queryset(object_list, self.paginate_by)
+            results_html = self.render_results({
+                "view": self,
+                "paginator": paginator,
+                "page_obj": page,
+                "is_paginated": is_paginated,
+                "object_list": cars,
+                self.context_object_name: cars,
+            })
+
+        return self.render_to_response({"view": self, "filter": self.filterset, "results_html": results_html})
+
+    def filter_queryset(self):
+        if not self.filterset.is_bound or self.filterset.is_valid() or not self.get_strict():
+            return self.filterset.qs
+        return self.filterset.queryset.none()
+
+
+class AsyncCarDetailView(View):
+
+    async def get(self, request, pk):
+        await aload_user(request)
+        try:
+            car = await Car.objects.with_detail_related().aget(pk=pk)
+        except Car.DoesNotExist:
+            raise Http404("No car matches the given query.")
+        return TemplateResponse(request, "car_detail.html", {"car": car, "object": car, "view": self})
+
+
+class AsyncMyRentalsView(View):
+    """Show the logged-in user's current and recent rentals, paginated like MyRentalsView."""
+
+    async def get(self, request):
+        user = await aload_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        queryset = CarRental.objects.for_user(user).with_listing_related()
+        paginator = Paginator(queryset, MyRentalsView.paginate_by)
+        paginator.count = await queryset.acount()
+        try:
+            page = paginator.page(request.GET.get("page") or 1)
+        except InvalidPage as exc:
+            raise Http404(f"Invalid page: {exc}")
+        rentals = page.object_list = [rental async for rental in page.object_list]
+        return TemplateResponse(request, "my_rentals.html", {
+            "rentals": rentals, "object_list": rentals, "view": self, "archived": False,
+            "paginator": paginator, "page_obj": page, "is_paginated": page.has_other_pages(),
+        })
@@ -0,0 +1,249 @@
+"""
+Streaming CSV/JSONL import and export of cars.
+
+Rows are read, validated and written in batches, so memory use stays flat
+however large the file is. Imports upsert on ``registration_number``, but
+only over cars the importing user owns.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .cache import bump_catalog_version
+from .models import Car, CarType
+from .references import locations, makes
+from .search import reindex_cars
+from .stats import refresh_car_counts
+
+FIELDS = (
+    "registration_number", "car_make", "car_model", "model_year", "car_type", "car_capacity",
+    "transmission", "location", "price_per_day", "is_available", "description",
+)
+UPDATE_FIELDS = [field for field in FIELDS if field not in ("registration_number", "car_type")] + ["car_type", "updated_at"]
+# Exported by slug, so a file round-trips between databases whose ids differ
+REFERENCE_FIELDS = ("car_make", "location")
+
+
+class RowError(ValueError):
+    pass
+
+
+def _choice_lookup(choices):
+    """Accept a choice by its stored value or its label, case-insensitively."""
+    lookup = {}
+    for value, label in choices:
+        lookup[str(label).lower()] = value
+    for value, label in choices:
+        lookup[str(value).lower()] = value
+    return lookup
+
+
+class CarRowValidator:
+    """Validates raw rows against the Car choice lists and reference tables and builds unsaved Car instances."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.makes = makes()
+        self.locations = locations()
+        self.capacities = _choice_lookup(Car.CAPACITY_CHOICES)
+        self.transmissions = _choice_lookup(Car.TRANSMISSION_CHOICES)
+        self.years = {year for year, _ in Car.YEAR_CHOICES}
+        self.car_types = dict(CarType.objects.values_list("name", "pk"))
+
+    def build(self, row):
+        if not isinstance(row, dict):
+            raise RowError(f"expected an object, got {type(row).__name__}")
+        registration_number = _text(row.get("registration_number"))
+        car_model = _text(row.get("car_model"))
+        if not registration_number:
+            raise RowError("registration_number is required")
+        if not car_model:
+            raise RowError("car_model is required")
+        for field, value in (("registration_number", registration_number), ("car_model", car_model)):
+            if len(value) > Car._meta.get_field(field).max_length:
+                raise RowError(f"{field} is longer than {Car._meta.get_field(field).max_length} characters")
+
+        try:
+            model_year = int(row.get("model_year") or Car.CURRENT_YEAR)
+        except (TypeError, ValueError):
+            raise RowError(f"model_year {row.get('model_year')!r} is not a number")
+        if model_year not in self.years:
+            raise RowError(f"model_year {model_year} is out of range")
+
+        price_per_day = self._price(row.get("price_per_day"))
+
+        return Car(
+            registration_number=registration_number,
+            car_make=self._reference(row, "car_make", self.makes),
+            car_model=car_model,
+            model_year=model_year,
+            car_type_id=self._car_type(row.get("car_type")),
+            car_capacity=self._choice(row, "car_capacity", self.capacities, default="5"),
+            transmission=self._choice(row, "transmission", self.transmissions, default="automatic"),
+            location=self._reference(row, "location", self.locations, default="tbilisi"),
+            price_per_day=price_per_day,
+            is_available=_parse_bool(row.get("is_available", True)),
+            description=_text(row.get("description")),
+            added_by=self.owner,
+        )
+
+    def _price(self, raw):
+        try:
+            price = Decimal(str(raw))
+        except (InvalidOperation, ValueError):
+            raise RowError(f"price_per_day {raw!r} is not a number")
+        field = Car._meta.get_field("price_per_day")
+        # NaN and Infinity parse, but have no digits to check and no place in a DecimalField
+        if not price.is_finite():
+            raise RowError(f"price_per_day {raw!r} is not a number")
+        if price < 0 or price.normalize().as_tuple().exponent < -field.decimal_places:
+            raise RowError(f"price_per_day {price} must be positive with at most {field.decimal_places} decimals")
+        if price.adjusted() >= field.max_digits - field.decimal_places:
+            raise RowError(f"price_per_day {price} is too large")
+        return price
+
+    def _choice(self, row, field, lookup, default=None):
+        raw = row.get(field)
+        if raw in (None, "") and default is not None:
+            return default
+        try:
+            return lookup[str(raw).strip().lower()]
+        except KeyError:
+            raise RowError(f"{field} {raw!r} is not one of the allowed choices")
+
+    def _reference(self, row, field, table, default=None):
+        raw = row.get(field)
+        if raw in (None, "") and default is not None:
+            raw = default
+        reference = table.lookup(raw) if raw is not None else None
+        if reference is None:
+            raise RowError(f"{field} {raw!r} is not one of the allowed choices")
+        return reference
+
+    def _car_type(self, name):
+        name = _text(name)
+        if not name:
+            return None
+        if name not in self.car_types:
+            self.car_types[name] = CarType.objects.get_or_create(name=name)[0].pk
+        return self.car_types[name]
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "")
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, dict)`` from a CSV or JSONL text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield line_number, exc
+
+
+def import_cars(rows, owner, batch_size=1000, on_error=None):
+    """
+    Upsert cars from ``read_rows`` output in batches. Returns ``(imported, skipped)``.
+
+    Invalid rows, and rows whose registration number belongs to another
+    user's car, are passed to ``on_error(line_number, message)`` and skipped.
+    Batches commit one at a time, so the valid rows of a file with errors
+    are still imported.
+    """
+    validator = CarRowValidator(owner)
+    imported = skipped = 0
+    batch = {}
+
+    def reject(line_number, message):
+        nonlocal skipped
+        skipped += 1
+        if on_error:
+            on_error(line_number, message)
+
+    for line_number, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise RowError(str(row))
+            car = validator.build(row)
+        except RowError as exc:
+            reject(line_number, str(exc))
+            continue
+        # A batch may only touch each registration number once, the last row wins
+        batch[car.registration_number] = (line_number, car)
+        if len(batch) >= batch_size:
+            imported += _write_batch(batch, owner, reject)
+    if batch:
+        imported += _write_batch(batch, owner, reject)
+
+    # bulk_create skips the signals that keep the fleet counts
+    refresh_car_counts()
+    bump_catalog_version()
+    return imported, skipped
+
+
+def _write_batch(batch, owner, reject):
+    rows = dict(batch)
+    batch.clear()
+    with transaction.atomic():
+        # The upsert keeps added_by, so it must not rewrite someone else's car
+        taken = Car.objects.filter(registration_number__in=rows).exclude(added_by=owner)
+        for registration_number in taken.values_list("registration_number", flat=True):
+            line_number, _ = rows.pop(registration_number)
+            reject(line_number, f"registration_number {registration_number!r} belongs to another user's car")
+        cars = [car for _, car in rows.values()]
+        if not cars:
+            return 0
+        Car.objects.bulk_create(
+            cars,
+            update_conflicts=True,
+            unique_fields=["registration_number"],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create sends no post_save, so index the batch here
+        car_ids = Car.objects.filter(registration_number__in=rows).values_list("pk", flat=True)
+        reindex_cars(car_ids)
+    return len(cars)
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Yield one dict per car, streaming from the database ``chunk_size`` rows at a time."""
+    plain = [field for field in FIELDS if field != "car_type" and field not in REFERENCE_FIELDS]
+    values = queryset.order_by("pk").values(*plain, "car_type__name", "car_make", "location")
+    make_table, location_table = makes(), locations()
+    for row in values.iterator(chunk_size=chunk_size):
+        row["car_type"] = row.pop("car_type__name") or ""
+        row["car_make"] = make_table.by_id[row["car_make"]].slug
+        row["location"] = location_table.by_id[row["location"]].slug
+        yield {field: row[field] for field in FIELDS}
+
+
+def write_rows(rows, stream, fmt):
+    """Write export rows as CSV or JSONL. Returns the number of rows written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+            count += 1
+    return count
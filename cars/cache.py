@@ -0,0 +1,93 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+CATALOG_VERSION_KEY = "catalog:version"
+CATALOG_MODIFIED_KEY = "catalog:modified"
+
+
+def catalog_cache():
+    """The cache backend that holds catalog pages and the catalog version."""
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_catalog_version():
+    # Seeding from the clock means a counter that was evicted can never
+    # come back with a value an old, still-cached page was stored under.
+    return catalog_cache().get_or_set(CATALOG_VERSION_KEY, _fresh_version, timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog page. Called on Car/CarRental writes."""
+    cache = catalog_cache()
+    cache.set(CATALOG_MODIFIED_KEY, time.time(), timeout=None)
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+        return version
+
+
+def get_catalog_modified():
+    """
+    When the catalog last changed, as an aware UTC datetime.
+
+    Writes record the time in the cache; on a cold cache it is derived from
+    the newest car and the newest rental.
+    """
+    timestamp = catalog_cache().get(CATALOG_MODIFIED_KEY)
+    if timestamp is None:
+        timestamp = _modified_from_database()
+        catalog_cache().add(CATALOG_MODIFIED_KEY, timestamp, timeout=None)
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def normalize_querystring(query_dict, params=None):
+    """
+    Canonical form of a listing querystring.
+
+    Empty values and ``page=1`` are dropped and keys and values are sorted,
+    so ``?car_make=&page=1&transmission=manual`` and ``?transmission=manual``
+    share a cache entry. With ``params``, keys outside it are dropped too.
+    """
+    items = []
+    for key in sorted(query_dict.keys()):
+        if params is not None and key not in params:
+            continue
+        for value in sorted(query_dict.getlist(key)):
+            if value == "" or (key == "page" and value == "1"):
+                continue
+            items.append(f"{key}={value}")
+    return "&".join(items)
+
+
+def listing_cache_key(prefix, query_dict, params=None):
+    """
+    Cache key of a listing under the current catalog version.
+
+    Pass the querystring keys the listing reads as ``params``, so made-up
+    ones can't mint an endless supply of entries for the same page.
+    """
+    querystring = normalize_querystring(query_dict, params)
+    digest = hashlib.md5(querystring.encode(), usedforsecurity=False).hexdigest()
+    return f"{prefix}:v{get_catalog_version()}:{digest}"
+
+
+def _fresh_version():
+    return int(time.time() * 1000)
+
+
+def _modified_from_database():
+    from django.db.models import Max
+    from .models import Car, CarRental
+
+    newest = [
+        Car.objects.aggregate(newest=Max("date_added"))["newest"],
+        CarRental.objects.aggregate(newest=Max("rented_on"))["newest"],
+    ]
+    newest = [value for value in newest if value is not None]
+    return max(newest).timestamp() if newest else time.time()
@@ -1,13 +1,42 @@
+from datetime import timedelta
+
 import django_filters
-from .models import Car
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .geo import parse_point
+from .models import Car, BookedRange
+from .pricing import annotate_quotes
+from .references import location_choices, locations, make_choices, makes
+from .search import search
 
 
 class CarFilter(django_filters.FilterSet):
+    # ?q=prius batumi, every term is prefix-matched, results come best match first
+    q = django_filters.CharFilter(method="filter_search", label="Search")
+
+    # ?car_make=toyota&location=batumi, by slug; the choices come from the process-level reference cache
     car_make = django_filters.ChoiceFilter(
-        choices=Car.CAR_MAKE_CHOICES,
+        choices=make_choices,
+        method="filter_make",
         label="Make"
     )
 
+    location = django_filters.ChoiceFilter(
+        choices=location_choices,
+        method="filter_location",
+        label="Location"
+    )
+
+    # ?near=41.72,44.78&radius=30 or ?near=kutaisi, cars picked up within radius km, nearest first
+    near = django_filters.CharFilter(method="filter_near", label="Near")
+    radius = django_filters.NumberFilter(
+        method="filter_radius",
+        label="Radius (km)",
+        min_value=0,
+        max_value=settings.GEO_MAX_RADIUS_KM,
+    )
+
     transmission = django_filters.ChoiceFilter(
         choices=Car.TRANSMISSION_CHOICES,
         label="Transmission"
@@ -21,6 +50,75 @@ class CarFilter(django_filters.FilterSet):
 
     model_year = django_filters.RangeFilter(label='Model Year(Range)')
 
+    # ?available_after=2025-06-03&available_before=2025-06-07
+    available = django_filters.DateFromToRangeFilter(
+        method="filter_available",
+        label="Available dates",
+    )
+
     class Meta:
         model = Car
-        fields = ["car_make", "car_type", "transmission", "car_capacity", "model_year", "is_available"]
+        fields = ["car_make", "location", "car_type", "transmission", "car_capacity", "model_year", "is_available"]
+
+    @classmethod
+    def query_params(cls):
+        """Every querystring key the filter form reads, such as ``model_year_min`` for the year range."""
+        if "_query_params" not in cls.__dict__:
+            params = set()
+            for name, filter_ in cls.base_filters.items():
+                suffixes = getattr(filter_.field.widget, "suffixes", None)
+                params.update(f"{name}_{suffix}" if suffix else name for suffix in suffixes or [""])
+            cls._query_params = frozenset(params)
+        return cls._query_params
+
+    def filter_make(self, queryset, name, value):
+        # Filtering on the cached id skips the join to cars_make
+        return queryset.filter(car_make_id=makes().by_slug[value].pk)
+
+    def filter_location(self, queryset, name, value):
+        return queryset.filter(location_id=locations().by_slug[value].pk)
+
+    def filter_near(self, queryset, name, value):
+        point = parse_point(value)
+        if point is None:
+            location = locations().lookup(value)
+            if location is None or location.latitude is None:
+                return queryset.none()
+            point = location.latitude, location.longitude
+        radius = self.form.cleaned_data.get("radius")
+        radius = settings.GEO_DEFAULT_RADIUS_KM if radius is None else float(radius)
+        return queryset.near(*point, radius)
+
+    def filter_radius(self, queryset, name, value):
+        # Read by filter_near; a radius on its own filters nothing
+        return queryset
+
+    def filter_available(self, queryset, name, value):
+        """Exclude cars with a booking that overlaps the requested dates and quote the rest."""
+        # DateFromToRangeFilter hands over datetimes; bookings and pricing work on dates
+        start_date, end_date = (bound.date() if bound is not None else None for bound in (value.start, value.stop))
+        if start_date is None and end_date is None:
+            return queryset
+        if start_date is None:
+            start_date = end_date
+        # Bookings are half-open [pick-up, return); a return on or before the pick-up day means one day
+        if end_date is None or end_date <= start_date:
+            end_date = start_date + timedelta(days=1)
+        booked = BookedRange.overlapping(start_date, end_date).filter(car=OuterRef("pk"))
+        return annotate_quotes(queryset.filter(~Exists(booked)), start_date, end_date)
+
+    def filter_search(self, queryset, name, value):
+        # Applied in filter_queryset, after the other filters
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        query = self.form.cleaned_data.get("q")
+        if not query:
+            return queryset
+        # The search caps its matches, so it must only see cars that passed the other filters
+        searched = search(queryset, query)
+        if "distance_km" in queryset.query.annotations:
+            # Cars near a point stay nearest first
+            searched = searched.order_by(*queryset.query.order_by)
+        return searched
@@ -1,9 +1,37 @@
 from django import forms
 from cars.models import Car
+from cars import references
+
+
+class ReferenceChoiceField(forms.ChoiceField):
+    """Make/Location picker served from the reference cache instead of a query per render."""
+
+    def __init__(self, table, **kwargs):
+        self.table = table
+        super().__init__(choices=lambda: [("", "---------")] + [(row.pk, row.name) for row in table().rows], **kwargs)
+
+    def prepare_value(self, value):
+        return getattr(value, "pk", value)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.table().by_id[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(self.error_messages["invalid_choice"], code="invalid_choice",
+                                        params={"value": value})
+
+    def validate(self, value):
+        if value is None and self.required:
+            raise forms.ValidationError(self.error_messages["required"], code="required")
+
 
 class CarForm(forms.ModelForm):
+    car_make = ReferenceChoiceField(references.makes, label="Car make")
+    location = ReferenceChoiceField(references.locations, label="Location")
+
     class Meta:
         model = Car
         fields = '__all__'
         exclude = ['added_by', 'is_available']
-
@@ -0,0 +1,71 @@
+"""
+Distance search over pickup points without a spatial database.
+
+Every Location carries its latitude and longitude and, computed on save,
+the cell of a GRID_DEGREES grid it falls in (``grid_row``, ``grid_col``,
+indexed together). A radius search turns the circle's bounding box into a
+range of cells, so the database hands back only the points in the cells
+around the origin, through the index, and the exact great-circle distance
+is computed in Python for those alone. That runs the same on SQLite and
+PostgreSQL and stays cheap with thousands of points.
+
+See LocationQuerySet.within() and CarQuerySet.near().
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+# About 11 km of latitude. Changing it means recomputing every Location's cell.
+GRID_DEGREES = 0.1
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle (haversine) distance between two points."""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def grid_cell(latitude, longitude):
+    return math.floor(latitude / GRID_DEGREES), math.floor(longitude / GRID_DEGREES)
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """
+    The grid rows and columns that cover a circle, as ``(row_range, column_ranges)``.
+
+    There are two column ranges when the circle crosses the antimeridian.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = latitude - d_lat, latitude + d_lat
+    if south <= -90 or north >= 90:
+        # Around a pole the circle spans every longitude
+        west, east = -180.0, 180.0
+    else:
+        ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))
+        d_lon = math.degrees(math.asin(min(1.0, ratio)))
+        west, east = longitude - d_lon, longitude + d_lon
+    rows = (grid_cell(max(south, -90.0), 0)[0], grid_cell(min(north, 90.0), 0)[0])
+    if east - west >= 360:
+        spans = [(-180.0, 180.0)]
+    elif west < -180:
+        spans = [(west + 360, 180.0), (-180.0, east)]
+    elif east > 180:
+        spans = [(west, 180.0), (-180.0, east - 360)]
+    else:
+        spans = [(west, east)]
+    columns = [(grid_cell(0, west)[1], grid_cell(0, east)[1]) for west, east in spans]
+    return rows, columns
+
+
+def parse_point(value):
+    """``"41.72,44.78"`` as ``(41.72, 44.78)``; None when it isn't a valid coordinate pair."""
+    try:
+        latitude, longitude = (float(part) for part in str(value).split(","))
+    except ValueError:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
@@ -0,0 +1,89 @@
+"""
+Responsive derivatives of the car photos.
+
+Every uploaded photo is resized to a few widths and re-encoded as WebP.
+Rendition names are derived from the source file's content hash, so the
+same photo uploaded twice shares its renditions and a changed photo never
+reuses stale ones. Generation is a background task queued with the upload,
+so it never adds to request latency.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from tasks.queue import task
+
+from .cache import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = ("image", "image2", "image3")
+RENDITION_DIR = "car_images/renditions"
+
+
+def build_renditions(field_file):
+    """
+    Write the WebP renditions of one image and return ``{width: name}``.
+
+    Widths larger than the original are skipped, but the smallest width is
+    always produced so every photo has at least one rendition.
+    """
+    # Not the photo's own storage, which would rename them after their bytes
+    storage = default_storage
+    with field_file.open("rb") as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:20]
+
+    with Image.open(BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGB")
+
+        renditions = {}
+        for width in sorted(settings.CAR_IMAGE_WIDTHS):
+            if renditions and width > original.width:
+                break
+            name = f"{RENDITION_DIR}/{digest}-{width}w.webp"
+            if not storage.exists(name):
+                height = max(1, round(original.height * width / original.width))
+                resized = original.resize((width, height), Image.Resampling.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, "WEBP", quality=settings.CAR_IMAGE_QUALITY, method=4)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            renditions[str(width)] = name
+    return renditions
+
+
+@task(max_attempts=3)
+def generate_car_renditions(car_id):
+    """Build renditions for every photo of a car and store them on the row."""
+    from .models import Car
+
+    car = Car.objects.filter(pk=car_id).only(*IMAGE_FIELDS).first()
+    if car is None:
+        return None
+
+    renditions = {}
+    for field in IMAGE_FIELDS:
+        field_file = getattr(car, field)
+        if not field_file:
+            continue
+        try:
+            renditions[field] = {"source": field_file.name, "widths": build_renditions(field_file)}
+        except (OSError, Image.DecompressionBombError):
+            logger.exception("Could not build renditions for car %s %s", car_id, field)
+
+    Car.objects.filter(pk=car_id).update(image_renditions=renditions, updated_at=timezone.now())
+    bump_catalog_version()
+    return renditions
+
+
+def schedule_car_renditions(car):
+    """Queue generation of a car's renditions; workers see it once the upload commits."""
+    generate_car_renditions.delay(car.pk)
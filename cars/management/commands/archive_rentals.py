@@ -0,0 +1,19 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from cars.archive import archive_cutoff, archive_rentals
+
+
+class Command(BaseCommand):
+    help = "Move returned rentals that ended months ago to the archive table. Meant to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, help="Archive rentals that ended this many months ago (default RENTAL_ARCHIVE_AFTER_MONTHS).")
+        parser.add_argument("--cutoff", type=date.fromisoformat, help="Archive rentals that ended before this day instead.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = options["cutoff"] or archive_cutoff(options["months"])
+        moved = archive_rentals(cutoff, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} rentals that ended before {cutoff}."))
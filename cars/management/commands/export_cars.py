@@ -0,0 +1,33 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from cars.bulk import export_rows, write_rows
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = "Export all cars as CSV or JSONL in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file, or - for stdout (default).")
+        parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+
+        started = time.perf_counter()
+        stream = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+        try:
+            count = write_rows(export_rows(Car.objects.all(), options["chunk_size"]), stream, fmt)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        elapsed = time.perf_counter() - started
+
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {count} cars in {elapsed:.1f}s ({count / elapsed if elapsed else 0:,.0f} rows/sec)."
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from cars.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Delete car photos and renditions that no car references any more. Meant to run from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=int, default=3600,
+                            help="Keep files younger than this many seconds (uploads still being saved).")
+        parser.add_argument("--dry-run", action="store_true", help="List what would be deleted.")
+
+    def handle(self, *args, **options):
+        removed, size = collect_garbage(options["min_age"], options["dry_run"])
+        if options["dry_run"]:
+            for name in removed:
+                self.stdout.write(name)
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(removed)} files ({size / 1024:.0f} KiB)."))
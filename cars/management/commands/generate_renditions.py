@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from cars.images import IMAGE_FIELDS, generate_car_renditions
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = "Build the WebP renditions of car photos (all cars, or only those missing them)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--missing", action="store_true", help="Only cars without any renditions yet.")
+
+    def handle(self, *args, **options):
+        has_photo = Q()
+        for field in IMAGE_FIELDS:
+            has_photo |= ~Q(**{field: ""}) & Q(**{f"{field}__isnull": False})
+        cars = Car.objects.filter(has_photo)
+        if options["missing"]:
+            cars = cars.filter(image_renditions={})
+
+        count = 0
+        for car_id in cars.values_list("pk", flat=True).iterator():
+            generate_car_renditions(car_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Built renditions for {count} cars."))
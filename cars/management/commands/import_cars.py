@@ -0,0 +1,47 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.bulk import import_cars, read_rows
+from user.phone import normalize_phone_number
+
+
+class Command(BaseCommand):
+    help = "Import cars from a CSV or JSONL file, upserting on registration_number."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument("--owner", required=True, help="Phone number of the user the cars are added by.")
+        parser.add_argument("--format", choices=("csv", "jsonl"), help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+
+        User = get_user_model()
+        try:
+            owner = User.objects.get(phone_number=normalize_phone_number(options["owner"]))
+        except (ValueError, User.DoesNotExist):
+            raise CommandError(f"No user with phone number {options['owner']}")
+
+        def report(line_number, message):
+            self.stderr.write(f"line {line_number}: {message}")
+
+        started = time.perf_counter()
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            imported, skipped = import_cars(
+                read_rows(stream, fmt), owner, batch_size=options["batch_size"], on_error=report
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} cars, skipped {skipped} in {elapsed:.1f}s "
+            f"({imported / elapsed if elapsed else 0:,.0f} rows/sec)."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from cars.search import rebuild_search_index, search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the car full-text search index from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if search_backend() is None:
+            self.stdout.write("This database has no search index; search uses plain filters.")
+            return
+        count = rebuild_search_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} cars."))
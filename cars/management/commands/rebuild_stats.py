@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cars.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the owner, location and daily stats tables from the rentals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = rebuild_stats(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats from {count} rentals."))
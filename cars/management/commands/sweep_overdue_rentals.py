@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from cars.sweeper import sweep_overdue_rentals
+
+
+class Command(BaseCommand):
+    help = (
+        "Return every open rental whose end date has passed and free its car, and take the cars "
+        "of bookings that have started off the market. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cutoff", type=date.fromisoformat, help="Return rentals ending on or before this day (default today).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        run = sweep_overdue_rentals(options["cutoff"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Returned {run.rentals_returned} rentals and freed {run.cars_freed} cars "
+            f"in {run.batches} batches ({run.duration.total_seconds():.2f}s)."
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:01
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_booked_ranges(apps, schema_editor):
+    CarRental = apps.get_model('cars', 'CarRental')
+    BookedRange = apps.get_model('cars', 'BookedRange')
+    ranges = [
+        BookedRange(
+            car_id=rental.car_id,
+            rental_id=rental.pk,
+            start_date=rental.start_date,
+            end_date=max(rental.end_date, rental.start_date + timedelta(days=1)),
+        )
+        for rental in CarRental.objects.filter(returned=False).iterator()
+    ]
+    BookedRange.objects.bulk_create(ranges, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0012_car_image2_car_image3'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_ranges', to='cars.car')),
+                ('rental', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booked_range', to='cars.carrental')),
+            ],
+            options={
+                'verbose_name': 'Booked Range',
+                'verbose_name_plural': 'Booked Ranges',
+                'db_table': 'cars_booked_range',
+                'indexes': [models.Index(fields=['car', 'start_date', 'end_date'], name='booked_car_dates_idx'), models.Index(fields=['start_date', 'end_date'], name='booked_dates_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_booked_ranges, migrations.RunPython.noop),
+    ]
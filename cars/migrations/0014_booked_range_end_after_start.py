@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0013_booked_range'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='bookedrange',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='booked_range_end_after_start'),
+        ),
+    ]
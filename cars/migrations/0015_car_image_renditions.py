@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0014_booked_range_end_after_start'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
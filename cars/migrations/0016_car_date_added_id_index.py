@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0015_car_image_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='car',
+            options={'ordering': ['-date_added', '-id'], 'verbose_name_plural': 'Cars'},
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['date_added', 'id'], name='cars_date_added_id_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Search table for cars.search: FTS5 on SQLite, tsvector + GIN on Postgres.
+# Other backends get no table and search falls back to icontains filters.
+
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS cars_search USING fts5("
+            "body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS cars_search ("
+            "car_id bigint PRIMARY KEY REFERENCES cars (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS cars_search_document_idx ON cars_search USING GIN (document)"
+        )
+    else:
+        return
+
+    Car = apps.get_model('cars', 'Car')
+    make_labels = dict(Car._meta.get_field('car_make').choices)
+    transmission_labels = dict(Car._meta.get_field('transmission').choices)
+    rows = []
+    for car in Car.objects.select_related('car_type').iterator():
+        parts = [
+            car.car_make, make_labels.get(car.car_make, ''), car.car_model, str(car.model_year),
+            car.car_type.name if car.car_type else '', car.location,
+            transmission_labels.get(car.transmission, ''), car.description,
+        ]
+        rows.append((car.pk, ' '.join(part for part in parts if part)))
+
+    if vendor == 'sqlite':
+        sql = "INSERT INTO cars_search (rowid, body) VALUES (%s, %s)"
+    else:
+        sql = "INSERT INTO cars_search (car_id, document) VALUES (%s, to_tsvector('simple', %s))"
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS cars_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0016_car_date_added_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0017_cars_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('weekday', 'Day of week'), ('season', 'Season'), ('duration', 'Rental length')], max_length=10)),
+                ('multiplier', models.DecimalField(decimal_places=3, help_text='1.200 adds 20%, 0.900 takes 10% off', max_digits=5)),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], null=True)),
+                ('starts_on', models.DateField(blank=True, null=True)),
+                ('ends_on', models.DateField(blank=True, null=True)),
+                ('min_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('car_type', models.ForeignKey(blank=True, help_text='Leave empty to apply to every car', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='cars.cartype')),
+            ],
+            options={
+                'verbose_name': 'Pricing Rule',
+                'verbose_name_plural': 'Pricing Rules',
+                'db_table': 'cars_pricing_rule',
+                'ordering': ['kind', 'name'],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0018_pricing_rule'),
+        ('user', '0002_alter_customuser_options_customuser_date_joined_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('total_rentals', models.IntegerField(default=0)),
+                ('rented_days', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('day', models.DateField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'Daily Stats',
+                'verbose_name_plural': 'Daily Stats',
+                'db_table': 'cars_daily_stats',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LocationStats',
+            fields=[
+                ('total_rentals', models.IntegerField(default=0)),
+                ('rented_days', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('car_count', models.IntegerField(default=0)),
+                ('active_rentals', models.IntegerField(default=0)),
+                ('location', models.CharField(choices=[('Tbilisi', 'Tbilisi'), ('Kutaisi', 'Kutaisi'), ('Batumi', 'Batumi'), ('Rustavi', 'Rustavi'), ('Dmanisi', 'Dmanisi')], max_length=10, primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'Location Stats',
+                'verbose_name_plural': 'Location Stats',
+                'db_table': 'cars_location_stats',
+                'ordering': ['location'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OwnerStats',
+            fields=[
+                ('total_rentals', models.IntegerField(default=0)),
+                ('rented_days', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('car_count', models.IntegerField(default=0)),
+                ('active_rentals', models.IntegerField(default=0)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='car_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Owner Stats',
+                'verbose_name_plural': 'Owner Stats',
+                'db_table': 'cars_owner_stats',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0019_stats_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SweepRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('cutoff', models.DateField(help_text='Open rentals ending on or before this day were returned')),
+                ('batches', models.PositiveIntegerField(default=0)),
+                ('rentals_returned', models.PositiveIntegerField(default=0)),
+                ('cars_freed', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sweep Run',
+                'verbose_name_plural': 'Sweep Runs',
+                'db_table': 'cars_sweep_run',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='carrental',
+            index=models.Index(fields=['returned', 'end_date'], name='rental_returned_end_idx'),
+        ),
+    ]
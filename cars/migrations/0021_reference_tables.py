@@ -0,0 +1,141 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+MAKES = [
+    ("toyota", "Toyota"), ("honda", "Honda"), ("ford", "Ford"), ("chevrolet", "Chevrolet"),
+    ("nissan", "Nissan"), ("volkswagen", "Volkswagen"), ("bmw", "BMW"), ("mercedes", "Mercedes-Benz"),
+    ("audi", "Audi"), ("hyundai", "Hyundai"), ("kia", "Kia"), ("mazda", "Mazda"), ("subaru", "Subaru"),
+    ("tesla", "Tesla"), ("jeep", "Jeep"), ("land_rover", "Land Rover"), ("volvo", "Volvo"),
+    ("porsche", "Porsche"), ("lexus", "Lexus"), ("rolls-royce", "Rolls-Royce"),
+]
+LOCATIONS = [
+    ("tbilisi", "Tbilisi"), ("kutaisi", "Kutaisi"), ("batumi", "Batumi"), ("rustavi", "Rustavi"),
+    ("dmanisi", "Dmanisi"),
+]
+# The old choice values that were not lowercase slugs, restored on unapply
+LEGACY_MAKES = {"nissan": "Nissan", "audi": "Audi", "porsche": "Porsche", "lexus": "Lexus"}
+
+
+def _references(model, canonical, values):
+    """Map every stored value to a reference row, matching by slug or name in any case."""
+    rows = {}
+    for slug, name in canonical:
+        reference = model.objects.create(slug=slug, name=name)
+        rows[slug] = rows[slugify(name)] = reference
+    mapping = {}
+    for value in values:
+        key = slugify(value)[:50] or "unknown"
+        if key not in rows:
+            # A value from outside the old choice lists is kept as its own reference
+            rows[key] = model.objects.create(slug=key, name=value.strip()[:100] or "Unknown")
+        mapping[value] = rows[key]
+    return mapping
+
+
+def normalize_references(apps, schema_editor):
+    Car = apps.get_model("cars", "Car")
+    Make = apps.get_model("cars", "Make")
+    Location = apps.get_model("cars", "Location")
+    LocationStats = apps.get_model("cars", "LocationStats")
+
+    makes = _references(Make, MAKES, Car.objects.values_list("car_make", flat=True).distinct())
+    locations = _references(
+        Location, LOCATIONS,
+        set(Car.objects.values_list("location", flat=True).distinct())
+        | set(LocationStats.objects.values_list("location", flat=True)),
+    )
+    # One UPDATE per distinct value; the AlterFields below turn the id strings into foreign keys
+    for value, make in makes.items():
+        Car.objects.filter(car_make=value).update(car_make=str(make.pk))
+    for value, location in locations.items():
+        Car.objects.filter(location=value).update(location=str(location.pk))
+
+    # Values that meet on one city (say 'Batumi' and 'batumi') merge their totals
+    stats = {}
+    for row in LocationStats.objects.values():
+        key = str(locations[row.pop("location")].pk)
+        if key in stats:
+            for field, value in row.items():
+                stats[key][field] += value
+        else:
+            stats[key] = row
+    LocationStats.objects.all().delete()
+    LocationStats.objects.bulk_create([LocationStats(location=key, **row) for key, row in stats.items()])
+
+
+def restore_choices(apps, schema_editor):
+    Car = apps.get_model("cars", "Car")
+    Make = apps.get_model("cars", "Make")
+    Location = apps.get_model("cars", "Location")
+    LocationStats = apps.get_model("cars", "LocationStats")
+
+    for make in Make.objects.all():
+        Car.objects.filter(car_make=str(make.pk)).update(car_make=LEGACY_MAKES.get(make.slug, make.slug))
+    for location in Location.objects.all():
+        Car.objects.filter(location=str(location.pk)).update(location=location.name)
+        LocationStats.objects.filter(location=str(location.pk)).update(location=location.name)
+    Make.objects.all().delete()
+    Location.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0020_overdue_sweeper'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Location',
+                'verbose_name_plural': 'Locations',
+                'db_table': 'cars_location',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Make',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Make',
+                'verbose_name_plural': 'Makes',
+                'db_table': 'cars_make',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(normalize_references, restore_choices),
+        migrations.AlterModelOptions(
+            name='locationstats',
+            options={'ordering': ['location__name'], 'verbose_name': 'Location Stats', 'verbose_name_plural': 'Location Stats'},
+        ),
+        migrations.AlterField(
+            model_name='car',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='cars', to='cars.location'),
+        ),
+        migrations.AlterField(
+            model_name='locationstats',
+            name='location',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='cars.location'),
+        ),
+        migrations.AlterField(
+            model_name='car',
+            name='car_make',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='cars', to='cars.make'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:00
+
+import cars.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0021_reference_tables'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='car',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=cars.storage.get_car_image_storage, upload_to='car_images/'),
+        ),
+        migrations.AlterField(
+            model_name='car',
+            name='image2',
+            field=models.ImageField(blank=True, null=True, storage=cars.storage.get_car_image_storage, upload_to='car_images/'),
+        ),
+        migrations.AlterField(
+            model_name='car',
+            name='image3',
+            field=models.ImageField(blank=True, null=True, storage=cars.storage.get_car_image_storage, upload_to='car_images/'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0023_car_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarRentalArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rented_on', models.DateTimeField()),
+                ('archived_on', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Rental',
+                'verbose_name_plural': 'Archived Rentals',
+                'db_table': 'cars_rental_archive',
+                'ordering': ['-rented_on'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='carrental',
+            index=models.Index(fields=['user', '-rented_on'], name='rental_user_rented_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carrental',
+            index=models.Index(fields=['car', 'start_date'], name='rental_car_start_idx'),
+        ),
+        migrations.AddField(
+            model_name='carrentalarchive',
+            name='car',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_rentals', to='cars.car'),
+        ),
+        migrations.AddField(
+            model_name='carrentalarchive',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_rentals', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='carrentalarchive',
+            index=models.Index(fields=['user', '-rented_on'], name='rental_archive_user_idx'),
+        ),
+    ]
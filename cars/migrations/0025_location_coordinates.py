@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:13
+
+import math
+
+from django.db import migrations, models
+
+# City centres of the seeded locations
+COORDINATES = {
+    "tbilisi": (41.7151, 44.8271),
+    "kutaisi": (42.2679, 42.6946),
+    "batumi": (41.6168, 41.6367),
+    "rustavi": (41.5495, 44.9934),
+    "dmanisi": (41.3317, 44.2036),
+}
+# cars.geo.GRID_DEGREES when this migration was written
+GRID_DEGREES = 0.1
+
+
+def seed_coordinates(apps, schema_editor):
+    Location = apps.get_model("cars", "Location")
+    for location in Location.objects.filter(slug__in=COORDINATES):
+        location.latitude, location.longitude = COORDINATES[location.slug]
+        location.grid_row = math.floor(location.latitude / GRID_DEGREES)
+        location.grid_col = math.floor(location.longitude / GRID_DEGREES)
+        location.save(update_fields=["latitude", "longitude", "grid_row", "grid_col"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0024_rental_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='grid_col',
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='grid_row',
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['grid_row', 'grid_col'], name='location_grid_idx'),
+        ),
+        migrations.RunPython(seed_coordinates, migrations.RunPython.noop),
+    ]
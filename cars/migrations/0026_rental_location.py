@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_locations(apps, schema_editor):
+    # Where the car is now is the best guess for where older rentals started
+    Car = apps.get_model("cars", "Car")
+    car_location = Subquery(Car.objects.filter(pk=OuterRef("car_id")).values("location_id")[:1])
+    for name in ("CarRental", "CarRentalArchive"):
+        apps.get_model("cars", name).objects.filter(location=None).update(location_id=car_location)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0025_location_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrental',
+            name='location',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='rentals', to='cars.location'),
+        ),
+        migrations.AddField(
+            model_name='carrentalarchive',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archived_rentals', to='cars.location'),
+        ),
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='carrental',
+            name='location',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='rentals', to='cars.location'),
+        ),
+        migrations.AlterField(
+            model_name='carrentalarchive',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_rentals', to='cars.location'),
+        ),
+    ]
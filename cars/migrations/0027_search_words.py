@@ -0,0 +1,55 @@
+# Word list for cars.search's spelling correction: every indexed word under
+# itself and each of its one-letter deletions, filled from the search index.
+
+from django.db import migrations
+
+
+def variants(word):
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def create_words_table(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS cars_search_words ("
+            "variant text NOT NULL, word text NOT NULL, PRIMARY KEY (variant, word)) WITHOUT ROWID"
+        )
+        # The FTS5 index's own vocabulary, through a throwaway fts5vocab table
+        schema_editor.execute("CREATE VIRTUAL TABLE temp.cars_search_vocab USING fts5vocab(main, cars_search, row)")
+        sql = "SELECT term FROM temp.cars_search_vocab"
+    elif vendor == 'postgresql':
+        # COLLATE "C" so prefix ranges on variant follow the index byte by byte
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS cars_search_words ("
+            "variant text COLLATE \"C\" NOT NULL, word text COLLATE \"C\" NOT NULL, PRIMARY KEY (variant, word))"
+        )
+        sql = "SELECT word FROM ts_stat('SELECT document FROM cars_search')"
+    else:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql)
+        words = [word for word, in cursor.fetchall() if word.isalnum() and len(word) >= 3]
+        cursor.executemany(
+            "INSERT INTO cars_search_words (variant, word) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            [(variant, word) for word in words for variant in variants(word)],
+        )
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE temp.cars_search_vocab")
+
+
+def drop_words_table(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS cars_search_words")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0026_rental_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_words_table, drop_words_table),
+    ]
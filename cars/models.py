@@ -1,10 +1,15 @@
 
-from django.db import models
+from operator import itemgetter
+
+from django.db import models, transaction
 from django.conf import settings
-from django.core.exceptions import PermissionDenied
-from datetime import datetime
+from django.core.exceptions import PermissionDenied, ValidationError
+from datetime import datetime, timedelta
 from django.utils import timezone
 
+from . import geo
+from .storage import get_car_image_storage
+
 
 class CarType(models.Model):
     """Model representing the type or category of a car."""
@@ -20,6 +25,108 @@ class CarType(models.Model):
         return self.name
 
 
+class Reference(models.Model):
+    """
+    A small lookup table behind a Car field, read through cars.references.
+
+    ``slug`` is the stable value used in URLs, imports and the API; ``name``
+    is what people see.
+    """
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class Make(Reference):
+    """Car manufacturer."""
+
+    class Meta(Reference.Meta):
+        db_table = "cars_make"
+        verbose_name = "Make"
+        verbose_name_plural = "Makes"
+
+
+class LocationQuerySet(models.QuerySet):
+
+    def within(self, latitude, longitude, radius_km):
+        """``(location id, distance in km)`` of the points within ``radius_km``, nearest first."""
+        (row_min, row_max), column_ranges = geo.cell_ranges(latitude, longitude, radius_km)
+        columns = models.Q()
+        for column_range in column_ranges:
+            columns |= models.Q(grid_col__range=column_range)
+        points = self.filter(columns, grid_row__range=(row_min, row_max)).values_list("pk", "latitude", "longitude")
+        distances = ((pk, geo.distance_km(latitude, longitude, lat, lon)) for pk, lat, lon in points)
+        return sorted(((pk, km) for pk, km in distances if km <= radius_km), key=itemgetter(1))
+
+
+class Location(Reference):
+    """
+    Pickup point a car is rented out from: a city, or a place in one.
+
+    ``grid_row``/``grid_col`` are the point's cell in the cars.geo grid,
+    kept in step with the coordinates on save, for radius searches.
+    """
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    grid_row = models.IntegerField(null=True, editable=False)
+    grid_col = models.IntegerField(null=True, editable=False)
+
+    objects = LocationQuerySet.as_manager()
+
+    class Meta(Reference.Meta):
+        db_table = "cars_location"
+        verbose_name = "Location"
+        verbose_name_plural = "Locations"
+        indexes = [
+            models.Index(fields=["grid_row", "grid_col"], name="location_grid_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.latitude is None or self.longitude is None:
+            self.grid_row = self.grid_col = None
+        else:
+            self.grid_row, self.grid_col = geo.grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "grid_row", "grid_col"}
+        super().save(*args, **kwargs)
+
+
+class CarQuerySet(models.QuerySet):
+
+    def with_listing_related(self):
+        """Everything a car card needs in one query, without the long description."""
+        return self.select_related("car_type", "car_make", "location").defer("description")
+
+    def with_detail_related(self):
+        """Car with its type, make, city and owner, as shown on the detail page."""
+        return self.select_related("car_type", "car_make", "location", "added_by")
+
+    def owned_by(self, user):
+        return self.filter(added_by=user)
+
+    def near(self, latitude, longitude, radius_km):
+        """Cars picked up within ``radius_km`` of the point, nearest first, with their ``distance_km``."""
+        distances = Location.objects.within(latitude, longitude, radius_km)
+        if not distances:
+            return self.none()
+        distance = models.Case(
+            *(models.When(location_id=pk, then=models.Value(km)) for pk, km in distances),
+            output_field=models.FloatField(),
+        )
+        return (
+            self.filter(location_id__in=[pk for pk, _ in distances])
+            .annotate(distance_km=distance)
+            .order_by("distance_km", "-date_added", "-pk")
+        )
+
+
 class Car(models.Model):
 
 
@@ -37,66 +144,44 @@ class Car(models.Model):
         ('8 and more', 8)
     ]
 
-    LOCATION_CHOICES = [
-        ('Tbilisi', 'Tbilisi'),
-        ('Kutaisi', 'Kutaisi'),
-        ('Batumi', 'Batumi'),
-        ('Rustavi', 'Rustavi'),
-        ('Dmanisi', 'Dmanisi'),
-
-    ]
-
-    CAR_MAKE_CHOICES = [
-        ('toyota', 'Toyota'),
-        ('honda', 'Honda'),
-        ('ford', 'Ford'),
-        ('chevrolet', 'Chevrolet'),
-        ('Nissan', 'nissan'),
-        ('volkswagen', 'Volkswagen'),
-        ('bmw', 'BMW'),
-        ('mercedes', 'Mercedes-Benz'),
-        ('Audi', 'Audi'),
-        ('hyundai', 'Hyundai'),
-        ('kia', 'Kia'),
-        ('mazda', 'Mazda'),
-        ('subaru', 'Subaru'),
-        ('tesla', 'Tesla'),
-        ('jeep', 'Jeep'),
-        ('land_rover', 'Land Rover'),
-        ('volvo', 'Volvo'),
-        ('Porsche', 'porsche'),
-        ('Lexus', 'lexus'),
-        ('rolls-royce', 'Rolls-Royce'),
-    ]
-
     CURRENT_YEAR = datetime.now().year
     YEAR_CHOICES = [(year, str(year)) for year in range(1990, CURRENT_YEAR + 1)]
 
     car_type = models.ForeignKey(CarType, on_delete=models.SET_NULL, null=True, related_name="cars")
-    car_make = models.CharField(choices=CAR_MAKE_CHOICES, max_length=20, )
+    car_make = models.ForeignKey(Make, on_delete=models.PROTECT, related_name="cars")
     car_model = models.CharField(max_length=100)
     model_year = models.PositiveIntegerField(choices=YEAR_CHOICES, default=CURRENT_YEAR)
     registration_number = models.CharField(max_length=50, unique=True)
     car_capacity = models.CharField(choices=CAPACITY_CHOICES, default='5', max_length=15)
     transmission = models.CharField(choices=TRANSMISSION_CHOICES, max_length=10, default='Automatic')
-    location = models.CharField(choices=LOCATION_CHOICES, max_length=10, default='Tbilisi')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="cars")
     price_per_day = models.DecimalField(max_digits=10, decimal_places=2)
     is_available = models.BooleanField(default=True)
-    image = models.ImageField(upload_to='car_images/', blank=True, null=True)
-    image2 = models.ImageField(upload_to='car_images/', blank=True, null=True)
-    image3 = models.ImageField(upload_to='car_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='car_images/', storage=get_car_image_storage, blank=True, null=True)
+    image2 = models.ImageField(upload_to='car_images/', storage=get_car_image_storage, blank=True, null=True)
+    image3 = models.ImageField(upload_to='car_images/', storage=get_car_image_storage, blank=True, null=True)
+    # {"image": {"source": <upload name>, "widths": {"320": <rendition name>, ...}}, ...}
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True)
     date_added = models.DateTimeField(auto_now_add=True)
+    # Part of the cached car card's key; bare .update() calls that change what a card shows set it too
+    updated_at = models.DateTimeField(auto_now=True)
     added_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="cars_added"
     )
 
+    objects = CarQuerySet.as_manager()
+
     class Meta:
         db_table = "cars"
-        ordering = ['-date_added']
+        ordering = ['-date_added', '-id']
         verbose_name_plural = "Cars"
+        indexes = [
+            # Keyset pagination walks this index newest-first
+            models.Index(fields=["date_added", "id"], name="cars_date_added_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.car_make} {self.car_model} ({self.model_year})"
@@ -109,6 +194,20 @@ class Car(models.Model):
         super().delete(*args, **kwargs)
 
 
+class CarRentalQuerySet(models.QuerySet):
+
+    def with_listing_related(self):
+        """Rental with its car, car type, make and renter, so __str__ and list pages don't query per row."""
+        return self.select_related("car", "car__car_type", "car__car_make", "user").defer("car__description")
+
+    def for_user(self, user):
+        return self.filter(user=user)
+
+    def on_the_road(self, day=None):
+        """Open rentals picked up on or before ``day`` (default today); only these make a car unavailable."""
+        return self.filter(returned=False, start_date__lte=day or timezone.localdate())
+
+
 class CarRental(models.Model):
     """Model representing a car rental transaction."""
     car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="rentals")
@@ -117,36 +216,320 @@ class CarRental(models.Model):
         on_delete=models.CASCADE,
         related_name="rental"
     )
+    # Where the car was picked up from; LocationStats counts the rental there even if the car moves later
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="rentals", editable=False)
     start_date = models.DateField()
     end_date = models.DateField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     rented_on = models.DateTimeField(auto_now_add=True)
     returned = models.BooleanField(default=False)
 
+    objects = CarRentalQuerySet.as_manager()
+
     class Meta:
         ordering = ['-rented_on']
         verbose_name = "Car Rental"
         verbose_name_plural = "Car Rentals"
+        indexes = [
+            # The overdue sweeper's scan: open rentals by end date
+            models.Index(fields=["returned", "end_date"], name="rental_returned_end_idx"),
+            # "My rentals", newest first
+            models.Index(fields=["user", "-rented_on"], name="rental_user_rented_idx"),
+            # A car's bookings by date
+            models.Index(fields=["car", "start_date"], name="rental_car_start_idx"),
+        ]
 
     def __str__(self):
         # show phone number for your custom user
         return f"{self.car} rented by {self.user.phone_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        rental = super().from_db(db, field_names, values)
+        # The dates the stored total_price was quoted for
+        rental._quoted_dates = (rental.__dict__.get("start_date"), rental.__dict__.get("end_date"))
+        return rental
+
     def save(self, *args, **kwargs):
-        """Automatically calculate total price and mark car as unavailable."""
-        if self.start_date and self.end_date:
-            days = (self.end_date - self.start_date).days or 1
-            self.total_price = days * self.car.price_per_day
-        super().save(*args, **kwargs)
+        """Quote the total price for new or re-dated rentals and mark the car as unavailable once picked up."""
+        from . import pricing, stats
+
+        adding = self._state.adding
+        dates = (self.start_date, self.end_date)
+        if adding and self.location_id is None:
+            self.location_id = self.car.location_id
+        # An existing rental keeps the price it was booked at, whatever the car costs now
+        if self.start_date and self.end_date and (adding or dates != getattr(self, "_quoted_dates", dates)):
+            self.total_price = pricing.quote_price(self.car, self.start_date, self.end_date)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._quoted_dates = dates
 
-        # Mark car as unavailable if currently rented
-        if not self.returned:
-            self.car.is_available = False
-            self.car.save()
+            # Keep the availability index and the dashboard totals in sync with the rental
+            BookedRange.sync_for_rental(self)
+            if adding:
+                stats.record_rental(self)
 
+            # Mark car as unavailable if currently rented; an advance booking only holds its dates
+            if not self.returned and self.start_date <= timezone.localdate() and self.car.is_available:
+                Car.objects.filter(pk=self.car_id).update(is_available=False)
+                self.car.is_available = False
+
+    @transaction.atomic
     def mark_returned(self):
-        """Mark car as returned and make it available again."""
+        """Mark car as returned and make it available again, unless it is already out on another rental."""
+        from . import stats
+
+        # Only the call that flips the flag counts the return, so a double submit can't count it twice
+        first_return = CarRental.objects.filter(pk=self.pk, returned=False).update(returned=True)
         self.returned = True
         self.save()
-        self.car.is_available = True
-        self.car.save()
+        self.car.is_available = not CarRental.objects.on_the_road().filter(car_id=self.car_id).exists()
+        Car.objects.filter(pk=self.car_id).update(is_available=self.car.is_available)
+        if first_return:
+            stats.record_return(self)
+
+
+class CarRentalArchive(models.Model):
+    """
+    A returned rental that cars.archive moved out of CarRental, under its original id.
+
+    Same fields and queryset as CarRental, so pages can show either table.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="archived_rentals")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_rentals")
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="archived_rentals")
+    start_date = models.DateField()
+    end_date = models.DateField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    rented_on = models.DateTimeField()
+    archived_on = models.DateTimeField(auto_now_add=True)
+
+    # Only returned rentals are archived
+    returned = True
+
+    objects = CarRentalQuerySet.as_manager()
+
+    class Meta:
+        db_table = "cars_rental_archive"
+        ordering = ['-rented_on']
+        verbose_name = "Archived Rental"
+        verbose_name_plural = "Archived Rentals"
+        indexes = [
+            models.Index(fields=["user", "-rented_on"], name="rental_archive_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.car} rented by {self.user.phone_number}"
+
+
+class BookedRange(models.Model):
+    """
+    Day range during which a car is booked.
+
+    One row per active rental, indexed on (car, start_date, end_date) so
+    availability searches can exclude booked cars with a single anti-join
+    instead of scanning every rental. Ranges are half-open: a car booked
+    from June 3 to June 7 is free again on June 7.
+    """
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="booked_ranges")
+    rental = models.OneToOneField(CarRental, on_delete=models.CASCADE, related_name="booked_range")
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        db_table = "cars_booked_range"
+        verbose_name = "Booked Range"
+        verbose_name_plural = "Booked Ranges"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__gt=models.F("start_date")),
+                name="booked_range_end_after_start",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["car", "start_date", "end_date"], name="booked_car_dates_idx"),
+            models.Index(fields=["start_date", "end_date"], name="booked_dates_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.car_id}: {self.start_date} - {self.end_date}"
+
+    @classmethod
+    def sync_for_rental(cls, rental):
+        """Create, move or drop the booked range that mirrors ``rental``."""
+        if rental.returned:
+            cls.objects.filter(rental=rental).delete()
+            return
+        # Same-day rentals are billed as one day, so they block one day too
+        end_date = max(rental.end_date, rental.start_date + timedelta(days=1))
+        cls.objects.update_or_create(
+            rental=rental,
+            defaults={
+                "car_id": rental.car_id,
+                "start_date": rental.start_date,
+                "end_date": end_date,
+            },
+        )
+
+    @classmethod
+    def overlapping(cls, start_date, end_date):
+        """Booked ranges that intersect the half-open period [start_date, end_date)."""
+        return cls.objects.filter(start_date__lt=end_date, end_date__gt=start_date)
+
+
+class PricingRule(models.Model):
+    """
+    Price multiplier applied when quoting a rental (see cars.pricing).
+
+    * weekday:  every rented day that falls on ``weekday`` (0 is Monday)
+    * season:   every rented day from ``starts_on`` to ``ends_on``, inclusive
+    * duration: the whole rental once it lasts ``min_days`` days or more;
+                only the longest matching duration rule applies
+
+    Weekday and season multipliers that match the same day stack. A rule
+    without a car type applies to every car.
+    """
+    WEEKDAY = "weekday"
+    SEASON = "season"
+    DURATION = "duration"
+    KIND_CHOICES = [
+        (WEEKDAY, "Day of week"),
+        (SEASON, "Season"),
+        (DURATION, "Rental length"),
+    ]
+    WEEKDAY_CHOICES = [
+        (0, "Monday"), (1, "Tuesday"), (2, "Wednesday"), (3, "Thursday"),
+        (4, "Friday"), (5, "Saturday"), (6, "Sunday"),
+    ]
+
+    name = models.CharField(max_length=100)
+    kind = models.CharField(choices=KIND_CHOICES, max_length=10)
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3, help_text="1.200 adds 20%, 0.900 takes 10% off")
+    car_type = models.ForeignKey(
+        CarType, on_delete=models.CASCADE, null=True, blank=True, related_name="pricing_rules",
+        help_text="Leave empty to apply to every car",
+    )
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES, null=True, blank=True)
+    starts_on = models.DateField(null=True, blank=True)
+    ends_on = models.DateField(null=True, blank=True)
+    min_days = models.PositiveIntegerField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = "cars_pricing_rule"
+        ordering = ['kind', 'name']
+        verbose_name = "Pricing Rule"
+        verbose_name_plural = "Pricing Rules"
+
+    def __str__(self):
+        return f"{self.name} (x{self.multiplier})"
+
+    def clean(self):
+        required = {
+            self.WEEKDAY: ["weekday"],
+            self.SEASON: ["starts_on", "ends_on"],
+            self.DURATION: ["min_days"],
+        }.get(self.kind, [])
+        errors = {field: "Required for this kind of rule." for field in required if getattr(self, field) is None}
+        if errors:
+            raise ValidationError(errors)
+        if self.kind == self.SEASON and self.ends_on < self.starts_on:
+            raise ValidationError({"ends_on": "The season must end after it starts."})
+
+
+class RentalTotals(models.Model):
+    """Running rental totals, maintained by cars.stats in the booking transactions."""
+    total_rentals = models.IntegerField(default=0)
+    rented_days = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class FleetTotals(RentalTotals):
+    car_count = models.IntegerField(default=0)
+    active_rentals = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def utilization(self):
+        """Percentage of the fleet that is out on a rental right now."""
+        if not self.car_count:
+            return 0
+        return round(100 * self.active_rentals / self.car_count)
+
+
+class OwnerStats(FleetTotals):
+    """Fleet and rental totals of one car owner."""
+    owner = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="car_stats",
+    )
+
+    class Meta:
+        db_table = "cars_owner_stats"
+        verbose_name = "Owner Stats"
+        verbose_name_plural = "Owner Stats"
+
+    def __str__(self):
+        return f"Stats for {self.owner_id}"
+
+
+class LocationStats(FleetTotals):
+    """Fleet and rental totals of one city; rentals count where the car was when booked."""
+    location = models.OneToOneField(Location, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+
+    class Meta:
+        db_table = "cars_location_stats"
+        ordering = ['location__name']
+        verbose_name = "Location Stats"
+        verbose_name_plural = "Location Stats"
+
+    def __str__(self):
+        return str(self.location)
+
+
+class DailyStats(RentalTotals):
+    """Rentals booked on one day."""
+    day = models.DateField(primary_key=True)
+
+    class Meta:
+        db_table = "cars_daily_stats"
+        ordering = ['-day']
+        verbose_name = "Daily Stats"
+        verbose_name_plural = "Daily Stats"
+
+    def __str__(self):
+        return str(self.day)
+
+
+class SweepRun(models.Model):
+    """Metrics of one run of the overdue-rental sweeper."""
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    cutoff = models.DateField(help_text="Open rentals ending on or before this day were returned")
+    batches = models.PositiveIntegerField(default=0)
+    rentals_returned = models.PositiveIntegerField(default=0)
+    cars_freed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "cars_sweep_run"
+        ordering = ['-started_at']
+        verbose_name = "Sweep Run"
+        verbose_name_plural = "Sweep Runs"
+
+    def __str__(self):
+        return f"Sweep {self.started_at:%Y-%m-%d %H:%M}: {self.rentals_returned} returned"
+
+    @property
+    def duration(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
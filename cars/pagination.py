@@ -0,0 +1,246 @@
+"""
+Keyset ("cursor") pagination for the car listings.
+
+Pages are addressed by the (date_added, id) of the last row shown instead of
+an OFFSET, so page 500 costs the same index range scan as page 1 and no
+COUNT(*) is needed to render the navigation.
+"""
+import base64
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Max, Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(obj, backwards=False):
+    raw = f"{'p' if backwards else 'n'}|{obj.date_added.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    """Return ``(backwards, date_added, pk)`` for a cursor from the querystring."""
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        direction, date_added, pk = raw.split("|")
+        if direction not in ("n", "p"):
+            raise ValueError(direction)
+        return direction == "p", datetime.fromisoformat(date_added), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(value) from exc
+
+
+def approximate_count(queryset, cap):
+    """
+    Cheap stand-in for ``queryset.count()``. Returns ``(count, is_exact)``.
+
+    The unfiltered catalog is estimated from planner statistics on Postgres
+    and from the highest primary key elsewhere, both without a table scan.
+    Filtered listings are counted, but never past ``cap`` rows.
+    """
+    if not queryset.query.where:
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0], False
+        return queryset.aggregate(top=Max("pk"))["top"] or 0, False
+
+    counted = queryset.order_by()[:cap + 1].count()
+    return min(counted, cap), counted <= cap
+
+
+class CursorPage:
+    """The parts of ``django.core.paginator.Page`` the listing templates use."""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = paginator.url_for(next_cursor) if next_cursor else None
+        self.previous_url = paginator.url_for(previous_cursor) if previous_cursor else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginates newest-first on the (date_added, id) index."""
+
+    is_cursor = True
+    cursor_query_param = "cursor"
+
+    def __init__(self, queryset, per_page, query_dict=None, count_mode="exact", count_cap=1000, link_params=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.query_dict = query_dict
+        # The querystring keys next/previous links keep; None keeps them all
+        self.link_params = link_params
+        self.count_mode = count_mode
+        self.count_cap = count_cap
+        self._count = None
+
+    @property
+    def count(self):
+        if self._count is None:
+            if self.count_mode == "approximate":
+                self._count = approximate_count(self.queryset, self.count_cap)
+            else:
+                self._count = (self.queryset.count(), True)
+        return self._count[0]
+
+    @property
+    def count_is_exact(self):
+        return self.count is not None and self._count[1]
+
+    def page(self, cursor=None):
+        queryset, backwards = self._window(cursor)
+        return self._build_page(list(queryset), cursor, backwards)
+
+    async def apage(self, cursor=None):
+        queryset, backwards = self._window(cursor)
+        return self._build_page([obj async for obj in queryset], cursor, backwards)
+
+    async def acount(self):
+        """Populate ``count`` with the async ORM, so templates never run the query."""
+        if self._count is None:
+            if self.count_mode == "approximate":
+                from asgiref.sync import sync_to_async
+                self._count = await sync_to_async(approximate_count)(self.queryset, self.count_cap)
+            else:
+                self._count = (await self.queryset.acount(), True)
+        return self._count[0]
+
+    def _window(self, cursor):
+        """The (unevaluated) rows of the page after or before ``cursor``, one extra to detect more."""
+        queryset = self.queryset
+        backwards = False
+        if cursor:
+            backwards, date_added, pk = decode_cursor(cursor)
+            if backwards:
+                queryset = queryset.filter(Q(date_added__gt=date_added) | Q(date_added=date_added, pk__gt=pk))
+            else:
+                queryset = queryset.filter(Q(date_added__lt=date_added) | Q(date_added=date_added, pk__lt=pk))
+
+        ordering = ("date_added", "pk") if backwards else ("-date_added", "-pk")
+        return queryset.order_by(*ordering)[:self.per_page + 1], backwards
+
+    def _build_page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        # Whichever way we moved, the page we came from is on the other side
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        next_cursor = encode_cursor(rows[-1]) if rows and has_next else None
+        previous_cursor = encode_cursor(rows[0], backwards=True) if rows and has_previous else None
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def url_for(self, cursor):
+        params = self.query_dict.copy() if self.query_dict is not None else {}
+        for key in list(params):
+            if key == "page" or (self.link_params is not None and key not in self.link_params):
+                del params[key]
+        params[self.cursor_query_param] = cursor
+        if hasattr(params, "urlencode"):
+            return "?" + params.urlencode()
+        return "?" + urlencode(params)
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for list views.
+
+    ``pagination_mode`` is ``"offset"`` (Django's Paginator) or ``"cursor"``
+    and defaults to ``settings.CAR_LIST_PAGINATION``. In cursor mode
+    ``count_mode = "approximate"`` skips the exact COUNT(*) for huge catalogs.
+    """
+    pagination_mode = None
+    count_mode = None
+
+    def get_pagination_mode(self):
+        return self.pagination_mode or settings.CAR_LIST_PAGINATION
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != "cursor":
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(paginator.cursor_query_param))
+        except InvalidCursor:
+            raise Http404("Invalid page.")
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+        Async counterpart of ``paginate_queryset`` for views with async handlers.
+
+        Rows and counts are fetched with the async ORM up front, so rendering
+        the page afterwards needs no database access.
+        """
+        if self.get_pagination_mode() == "cursor":
+            paginator = self.get_cursor_paginator(queryset, page_size)
+            try:
+                page = await paginator.apage(self.request.GET.get(paginator.cursor_query_param))
+            except InvalidCursor:
+                raise Http404("Invalid page.")
+            await paginator.acount()
+            return paginator, page, page.object_list, page.has_other_pages()
+
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        paginator.count = await queryset.acount()
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            page = paginator.page(paginator.num_pages if page_number == "last" else page_number)
+        except InvalidPage as exc:
+            raise Http404(f"Invalid page ({page_number}): {exc}")
+        page.object_list = [obj async for obj in page.object_list]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_cursor_link_params(self):
+        """The querystring keys the page links carry over; None for all of them."""
+        return None
+
+    def get_cursor_paginator(self, queryset, page_size):
+        return CursorPaginator(
+            queryset,
+            page_size,
+            query_dict=self.request.GET,
+            count_mode=self.count_mode or settings.CAR_LIST_COUNT_MODE,
+            count_cap=settings.CAR_LIST_COUNT_CAP,
+            link_params=self.get_cursor_link_params(),
+        )
@@ -0,0 +1,107 @@
+"""
+Rental price quotes.
+
+A quote is ``price_per_day`` times the rental's *day units*. Each rented
+day counts as the product of the weekday and season multipliers that
+match it, and the sum is scaled by the longest matching duration
+discount. With no rules, a quote is ``days * price_per_day``.
+
+Day units depend only on the dates and the car type. A batch quote
+therefore walks the date calendar once per car type, not once per car,
+and multiplies the prices in SQL (``annotate_quotes``) or in a single
+pass over cars already in memory (``quote_cars``).
+"""
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Round
+
+from .models import PricingRule
+
+ONE = Decimal(1)
+CENT = Decimal("0.01")
+
+
+def rental_days(start_date, end_date):
+    """Billed days: one per night, and at least one."""
+    return max((end_date - start_date).days, 1)
+
+
+class PriceCalendar:
+    """Pricing rules applied to one date range, with day units cached per car type."""
+
+    def __init__(self, start_date, end_date, rules=None):
+        self.start_date = start_date
+        self.days = rental_days(start_date, end_date)
+        last_day = start_date + timedelta(days=self.days - 1)
+        if rules is None:
+            rules = PricingRule.objects.filter(is_active=True).filter(
+                Q(kind=PricingRule.WEEKDAY)
+                | Q(kind=PricingRule.SEASON, starts_on__lte=last_day, ends_on__gte=start_date)
+                | Q(kind=PricingRule.DURATION, min_days__lte=self.days)
+            )
+        self.rules = list(rules)
+        # Car types with rules of their own; every other type prices like None
+        self.type_specific_ids = {rule.car_type_id for rule in self.rules if rule.car_type_id is not None}
+        self._units = {}
+
+    def units(self, car_type_id):
+        if car_type_id not in self.type_specific_ids:
+            car_type_id = None
+        if car_type_id not in self._units:
+            self._units[car_type_id] = self._compute_units(car_type_id)
+        return self._units[car_type_id]
+
+    def _compute_units(self, car_type_id):
+        factors = [ONE] * self.days
+        duration = ONE
+        longest = 0
+        for rule in self.rules:
+            if rule.car_type_id not in (None, car_type_id):
+                continue
+            if rule.kind == PricingRule.WEEKDAY:
+                # Every seventh day from the first one that falls on the weekday
+                for i in range((rule.weekday - self.start_date.weekday()) % 7, self.days, 7):
+                    factors[i] *= rule.multiplier
+            elif rule.kind == PricingRule.SEASON:
+                first = max((rule.starts_on - self.start_date).days, 0)
+                last = min((rule.ends_on - self.start_date).days, self.days - 1)
+                for i in range(first, last + 1):
+                    factors[i] *= rule.multiplier
+            elif rule.kind == PricingRule.DURATION and longest < rule.min_days <= self.days:
+                longest, duration = rule.min_days, rule.multiplier
+        return sum(factors) * duration
+
+    def total(self, car_type_id, price_per_day):
+        return (price_per_day * self.units(car_type_id)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def units_expression(self):
+        """SQL expression for the day units of each car row."""
+        output_field = DecimalField(max_digits=12, decimal_places=6)
+        return Case(
+            *[When(car_type_id=type_id, then=Value(self.units(type_id))) for type_id in self.type_specific_ids],
+            default=Value(self.units(None)),
+            output_field=output_field,
+        )
+
+
+def quote_price(car, start_date, end_date):
+    """Total price of renting ``car`` from ``start_date`` to ``end_date``."""
+    return PriceCalendar(start_date, end_date).total(car.car_type_id, car.price_per_day)
+
+
+def quote_cars(cars, start_date, end_date):
+    """``{car.pk: total}`` for every car in ``cars``, sharing one rules lookup."""
+    calendar = PriceCalendar(start_date, end_date)
+    return {car.pk: calendar.total(car.car_type_id, car.price_per_day) for car in cars}
+
+
+def annotate_quotes(queryset, start_date, end_date, name="quoted_total"):
+    """Annotate each car in ``queryset`` with its total price for the dates."""
+    calendar = PriceCalendar(start_date, end_date)
+    total = ExpressionWrapper(
+        Round(F("price_per_day") * calendar.units_expression(), 2),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    return queryset.annotate(**{name: total})
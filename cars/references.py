@@ -0,0 +1,73 @@
+"""
+Process-level cache of the reference tables (Make, Location).
+
+They are tiny and read on almost every request (filter form, car form,
+import, API), so each process loads a table once and keeps it in memory.
+A version number in the catalog cache tells the processes when to reload:
+saving or deleting a row bumps it (see cars.signals), and every process
+notices on its next lookup.
+"""
+import threading
+
+from .cache import catalog_cache, _fresh_version
+from .models import Make, Location
+
+REFERENCES_VERSION_KEY = "references:version"
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+class ReferenceTable:
+    """One loaded table: rows by id and by slug, in display order."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.by_id = {row.pk: row for row in self.rows}
+        self.by_slug = {row.slug: row for row in self.rows}
+        self.choices = [(row.slug, row.name) for row in self.rows]
+        self._by_key = {row.name.lower(): row for row in self.rows}
+        self._by_key.update(self.by_slug)
+
+    def lookup(self, value):
+        """Match a slug or a display name, case-insensitively. Returns None when nothing matches."""
+        return self._by_key.get(str(value).strip().lower())
+
+
+def get_references_version():
+    return catalog_cache().get_or_set(REFERENCES_VERSION_KEY, _fresh_version, timeout=None)
+
+
+def bump_references_version():
+    """Make every process reload the reference tables. Called on Make/Location writes."""
+    try:
+        catalog_cache().incr(REFERENCES_VERSION_KEY)
+    except ValueError:
+        catalog_cache().set(REFERENCES_VERSION_KEY, _fresh_version(), timeout=None)
+
+
+def _table(model):
+    version = get_references_version()
+    loaded = _loaded.get(model)
+    if loaded is None or loaded[0] != version:
+        with _lock:
+            loaded = _loaded.get(model)
+            if loaded is None or loaded[0] != version:
+                loaded = _loaded[model] = (version, ReferenceTable(model.objects.all()))
+    return loaded[1]
+
+
+def makes():
+    return _table(Make)
+
+
+def locations():
+    return _table(Location)
+
+
+def make_choices():
+    return makes().choices
+
+
+def location_choices():
+    return locations().choices
@@ -0,0 +1,265 @@
+"""
+Full-text search over the car catalog.
+
+Each car has one search document (make, model, year, type, location,
+transmission and description) kept in a side table that is maintained
+incrementally on save/delete:
+
+* SQLite:   ``cars_search``, an FTS5 virtual table keyed by the car id.
+* Postgres: ``cars_search`` with a ``tsvector`` column and a GIN index.
+* Others:   no index; ``search()`` falls back to ``icontains`` filters.
+
+Every query term is prefix-matched, so "pri 201 batu" finds a 2018 Prius in
+Batumi. A query that matches nothing is retried with its misspelt terms,
+the ones no indexed word starts with, replaced by an indexed word one
+edit away, so "pirus" finds the Prius too. ``cars_search_words`` lists
+every indexed word under itself and under each of its one-letter
+deletions; two words one edit apart share one of those variants, so the
+candidates come from a primary-key lookup on either backend instead of a
+scan of the vocabulary.
+
+Broad queries are capped to the newest ``SEARCH_MAX_RESULTS`` matches
+among the cars the rest of the query lets through, which are then
+ordered by relevance; that keeps a search on a million-car catalog to one
+index scan and one primary-key lookup. Filters must therefore be applied
+before ``search()``.
+"""
+import re
+from functools import reduce
+from itertools import islice
+from operator import and_
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import IntegerField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Car
+
+SEARCH_TABLE = "cars_search"
+WORDS_TABLE = "cars_search_words"
+SEARCH_MAX_RESULTS = 1000
+MAX_TERMS = 8
+# Shorter terms are too ambiguous to correct; they are only prefix-matched
+FUZZY_MIN_LENGTH = 4
+
+_TRANSMISSION_LABELS = dict(Car.TRANSMISSION_CHOICES)
+_DOCUMENT_FIELDS = (
+    "id", "car_make__slug", "car_make__name", "car_model", "model_year", "location__name", "transmission",
+    "description", "car_type__name",
+)
+
+
+def search_backend():
+    if connection.vendor in ("sqlite", "postgresql"):
+        return connection.vendor
+    return None
+
+
+def build_document(row):
+    """Search text for one ``values()`` row of a car."""
+    parts = [
+        row["car_make__slug"], row["car_make__name"],
+        row["car_model"], str(row["model_year"]), row["car_type__name"] or "",
+        row["location__name"], _TRANSMISSION_LABELS.get(row["transmission"], ""),
+        row["description"],
+    ]
+    return " ".join(part for part in parts if part)
+
+
+def word_variants(word):
+    """The variants ``word`` is listed under in the words table: itself and each one-letter deletion of it."""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _write_documents(cursor, rows):
+    if search_backend() == "sqlite":
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, body) VALUES (%s, %s)", rows)
+    else:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (car_id, document) VALUES (%s, to_tsvector('simple', %s)) "
+            "ON CONFLICT (car_id) DO UPDATE SET document = EXCLUDED.document",
+            rows,
+        )
+    # Words of removed or edited cars stay until the next rebuild; correcting to one finds nothing
+    words = {word for _, body in rows for word in re.findall(r"[^\W_]+", body.lower())
+             if len(word) >= FUZZY_MIN_LENGTH - 1}
+    cursor.executemany(
+        f"INSERT INTO {WORDS_TABLE} (variant, word) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+        [(variant, word) for word in words for variant in word_variants(word)],
+    )
+
+
+def reindex_cars(car_ids, batch_size=500):
+    """(Re)build the search documents of the given cars."""
+    if search_backend() is None:
+        return
+    car_ids = list(car_ids)
+    for start in range(0, len(car_ids), batch_size):
+        chunk = car_ids[start:start + batch_size]
+        rows = [(row["id"], build_document(row))
+                for row in Car.objects.filter(pk__in=chunk).values(*_DOCUMENT_FIELDS)]
+        with connection.cursor() as cursor:
+            if search_backend() == "sqlite":
+                # FTS5 has no upsert
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            _write_documents(cursor, rows)
+
+
+def remove_cars(car_ids):
+    if search_backend() != "sqlite":
+        # Postgres rows go with the car through ON DELETE CASCADE
+        return
+    car_ids = list(car_ids)
+    if car_ids:
+        with connection.cursor() as cursor:
+            placeholders = ", ".join(["%s"] * len(car_ids))
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", car_ids)
+
+
+@transaction.atomic
+def rebuild_search_index(batch_size=2000):
+    """Rebuild every document from scratch. Returns the number of cars indexed."""
+    if search_backend() is None:
+        return 0
+    count = 0
+    rows = Car.objects.order_by("pk").values(*_DOCUMENT_FIELDS).iterator(chunk_size=batch_size)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(f"DELETE FROM {WORDS_TABLE}")
+        while batch := [(row["id"], build_document(row)) for row in islice(rows, batch_size)]:
+            _write_documents(cursor, batch)
+            count += len(batch)
+    return count
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two words, counting a swap of neighbouring letters as one edit."""
+    previous, current = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+def _vocabulary(terms):
+    """
+    ``{term: [indexed words]}``, in one query for all the terms.
+
+    Each term gets one indexed word it starts with, if there is any, and
+    the words that share a variant with it, the only ones that can be one
+    edit away.
+    """
+    parts, params = [], []
+    for i, term in enumerate(terms):
+        variants = sorted(word_variants(term))
+        parts.append(
+            # A word is listed under itself, so the first query finds the words starting with the term
+            f"SELECT %s, word FROM (SELECT word FROM {WORDS_TABLE} "
+            f"WHERE variant >= %s AND variant < %s AND variant = word LIMIT 1) prefix_{i} "
+            f"UNION ALL SELECT %s, word FROM {WORDS_TABLE} WHERE variant IN ({', '.join(['%s'] * len(variants))})"
+        )
+        params += [term, term, term + "\U0010ffff", term, *variants]
+    words = {term: [] for term in terms}
+    with connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(parts), params)
+        for term, word in cursor.fetchall():
+            words[term].append(word)
+    return words
+
+
+def correct_terms(terms):
+    """
+    ``terms`` with every misspelt one replaced by the closest indexed word.
+
+    A term is misspelt when no indexed word starts with it; it is kept when
+    no word is one edit away, or it is shorter than ``FUZZY_MIN_LENGTH``.
+    """
+    checked = [term for term in terms if len(term) >= FUZZY_MIN_LENGTH]
+    if not checked:
+        return terms
+    vocabulary = _vocabulary(checked)
+    corrected = []
+    for term in terms:
+        words = vocabulary.get(term, ())
+        if words and not any(word.startswith(term) for word in words):
+            distance, word = min((edit_distance(term, word), word) for word in words)
+            if distance == 1:
+                term = word
+        corrected.append(term)
+    return corrected
+
+
+def _ranked_matches(terms, queryset):
+    """
+    ``(car_id, rank)`` of the newest ``SEARCH_MAX_RESULTS`` matches in ``queryset``, lower rank is better.
+
+    Each match is checked against ``queryset`` with a correlated EXISTS, a
+    primary-key lookup, so the cap only counts cars that pass its filters
+    and the cost follows the number of matches, not the catalog size.
+    """
+    key = "rowid" if search_backend() == "sqlite" else "car_id"
+    in_queryset = queryset.order_by().filter(pk=RawSQL(f"{SEARCH_TABLE}.{key}", ())).values("pk")
+    try:
+        exists_sql, exists_params = in_queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return []
+    if search_backend() == "sqlite":
+        sql = (
+            f"SELECT rowid, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND EXISTS ({exists_sql}) "
+            f"ORDER BY rowid DESC LIMIT {SEARCH_MAX_RESULTS}"
+        )
+        params = [" ".join(f'"{term}"*' for term in terms), *exists_params]
+    else:
+        sql = (
+            f"SELECT car_id, -ts_rank(document, query) FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query "
+            f"WHERE document @@ query AND EXISTS ({exists_sql}) ORDER BY car_id DESC LIMIT {SEARCH_MAX_RESULTS}"
+        )
+        params = [" & ".join(f"{term}:*" for term in terms), *exists_params]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(queryset, query):
+    """
+    Filter ``queryset`` to cars matching every term of ``query``, best match first.
+
+    Matches are annotated with ``search_rank``, their position by relevance.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    if search_backend() is None:
+        per_term = [
+            Q(car_make__name__icontains=term) | Q(car_model__icontains=term) | Q(description__icontains=term)
+            | Q(car_type__name__icontains=term) | Q(location__name__icontains=term) | Q(model_year__startswith=term)
+            for term in terms
+        ]
+        return queryset.filter(reduce(and_, per_term))
+
+    # Scoring a correlated subquery costs about a millisecond per row in FTS5,
+    # so the matches are scored in one pass and ordered by their position.
+    matches = _ranked_matches(terms, queryset)
+    if not matches:
+        # Only a query that finds nothing pays for the spelling correction
+        corrected = correct_terms(terms)
+        if corrected != terms:
+            matches = _ranked_matches(corrected, queryset)
+    matches.sort(key=lambda match: match[1])
+    if not matches:
+        return queryset.none()
+    car_ids = [car_id for car_id, _ in matches]
+    # One raw CASE; a thousand When() objects take longer to compile than the query takes to run
+    whens = " ".join(f"WHEN %s THEN {i}" for i in range(len(car_ids)))
+    position = RawSQL(f"CASE {Car._meta.db_table}.id {whens} END", car_ids, output_field=IntegerField())
+    return queryset.filter(pk__in=car_ids).annotate(search_rank=position).order_by("search_rank")
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models import F
+
+from .models import Car, CarRental, BookedRange
+
+
+class BookingError(Exception):
+    """Raised when a car cannot be booked for the requested dates."""
+
+
+def book_car(car_id, user, start_date, end_date):
+    """
+    Book a car for the half-open period [start_date, end_date).
+
+    The car row is locked for the whole transaction, so two customers racing
+    for the same car are serialized and the loser sees the winner's booked
+    range in the overlap check.
+    """
+    if end_date <= start_date:
+        raise BookingError("The return date must be after the pick-up date.")
+
+    with transaction.atomic():
+        car = _lock_car(car_id)
+
+        if car.added_by_id == user.pk:
+            raise BookingError("You can't Rent your own car")
+
+        overlap = BookedRange.overlapping(start_date, end_date).filter(car_id=car.pk)
+        # is_available only says whether the car is out today; advance bookings go by their dates
+        if overlap.exists():
+            raise BookingError("This car is already booked for those dates.")
+
+        rental = CarRental(car=car, user=user, start_date=start_date, end_date=end_date)
+        rental.save()
+    return rental
+
+
+def _lock_car(car_id):
+    """Fetch the car, holding a write lock on it until the transaction ends."""
+    if transaction.get_connection().features.has_select_for_update:
+        return Car.objects.select_for_update().get(pk=car_id)
+
+    # SQLite has no row locks. A no-op UPDATE takes the database write lock
+    # up front (what BEGIN IMMEDIATE would do), so concurrent bookings wait
+    # on busy_timeout instead of failing when they upgrade from a read lock.
+    if not Car.objects.filter(pk=car_id).update(is_available=F("is_available")):
+        raise Car.DoesNotExist("Car matching query does not exist.")
+    return Car.objects.get(pk=car_id)
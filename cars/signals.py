@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import Car, CarType, CarRental, CarRentalArchive, PricingRule, Make, Location
+from .references import bump_references_version
+from .search import reindex_cars, remove_cars
+from . import stats
+
+
+@receiver([post_save, post_delete], sender=Car)
+@receiver([post_save, post_delete], sender=CarType)
+@receiver([post_save, post_delete], sender=CarRental)
+@receiver([post_save, post_delete], sender=PricingRule)
+@receiver([post_save, post_delete], sender=Make)
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_catalog(sender, **kwargs):
+    # Bumping before commit would let a concurrent request cache the old
+    # rows under the new version.
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver([post_save, post_delete], sender=Make)
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_references(sender, **kwargs):
+    transaction.on_commit(bump_references_version)
+
+
+@receiver(post_save, sender=Car)
+def index_car(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reindex_cars([instance.pk])
+
+
+@receiver(post_delete, sender=Car)
+def unindex_car(sender, instance, **kwargs):
+    remove_cars([instance.pk])
+
+
+@receiver(post_save, sender=CarType)
+@receiver(post_save, sender=Make)
+@receiver(post_save, sender=Location)
+def reindex_renamed_cars(sender, instance, created=False, raw=False, **kwargs):
+    # Renaming a type, make or city changes the search documents of its cars
+    if not created and not raw:
+        reindex_cars(instance.cars.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=CarType)
+def remember_car_type_cars(sender, instance, **kwargs):
+    # The cars are SET_NULL with a bare UPDATE, so collect them before it runs
+    instance._search_car_ids = list(instance.cars.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=CarType)
+def reindex_deleted_car_type(sender, instance, **kwargs):
+    reindex_cars(getattr(instance, "_search_car_ids", []))
+
+
+@receiver(pre_save, sender=Car)
+def remember_car_location(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is not None:
+        instance._stats_old_location = Car.objects.filter(pk=instance.pk).values_list("location_id", flat=True).first()
+
+
+@receiver(post_save, sender=Car)
+def count_car(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.record_car(instance)
+    else:
+        stats.record_car_moved(instance, getattr(instance, "_stats_old_location", None))
+
+
+@receiver(post_delete, sender=Car)
+def uncount_car(sender, instance, **kwargs):
+    stats.record_car(instance, -1)
+
+
+@receiver(post_delete, sender=CarRental)
+@receiver(post_delete, sender=CarRentalArchive)
+def uncount_rental(sender, instance, **kwargs):
+    # Archived rentals only go when their car or renter does
+    stats.forget_rental(instance)
@@ -0,0 +1,160 @@
+"""
+Incrementally maintained dashboard totals.
+
+OwnerStats, LocationStats and DailyStats hold running counts, so the
+dashboards read a single row instead of aggregating every rental.
+Every change is applied as an ``F()`` increment in the transaction that
+books, returns or deletes the rental, so concurrent bookings never lose
+an update and the totals can't drift from the rentals on rollback.
+
+``rebuild_stats()`` recomputes everything from the rentals, for backfills
+and after bulk operations that bypass the model methods.
+"""
+from collections import Counter, defaultdict
+from itertools import chain
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Value, When
+from django.utils import timezone
+
+from .models import Car, CarRental, CarRentalArchive, OwnerStats, LocationStats, DailyStats
+from .pricing import rental_days
+
+
+def _bump(model, key, create=True, **deltas):
+    """
+    Add ``deltas`` to the stats row ``key``.
+
+    Increments create a missing row at zero. Decrements never do: a missing
+    row has nothing to take away, and its owner may be mid-delete.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if not model.objects.filter(**key).update(**changes) and create:
+        model.objects.get_or_create(**key)
+        model.objects.filter(**key).update(**changes)
+
+
+def _apply_rental(rental, sign):
+    deltas = {
+        "total_rentals": sign,
+        "rented_days": sign * rental_days(rental.start_date, rental.end_date),
+        "revenue": sign * rental.total_price,
+    }
+    active = 0 if rental.returned else sign
+    create = sign > 0
+    _bump(OwnerStats, {"owner_id": rental.car.added_by_id}, create, active_rentals=active, **deltas)
+    _bump(LocationStats, {"location_id": rental.location_id}, create, active_rentals=active, **deltas)
+    _bump(DailyStats, {"day": timezone.localdate(rental.rented_on)}, create, **deltas)
+
+
+def record_rental(rental):
+    """Count a newly booked rental."""
+    _apply_rental(rental, 1)
+
+
+def forget_rental(rental):
+    """Take a deleted rental back out of the totals."""
+    _apply_rental(rental, -1)
+
+
+def record_return(rental):
+    """The rental is over: one active rental fewer for the owner and the city it was picked up in."""
+    _bump(OwnerStats, {"owner_id": rental.car.added_by_id}, False, active_rentals=-1)
+    _bump(LocationStats, {"location_id": rental.location_id}, False, active_rentals=-1)
+
+
+def record_returns(rentals):
+    """
+    Set-based ``record_return`` for many rentals at once.
+
+    ``rentals`` yields ``(owner_id, rental location_id)`` pairs; each table gets one
+    UPDATE however many rentals there are.
+    """
+    owners, locations = Counter(), Counter()
+    for owner_id, location in rentals:
+        owners[owner_id] += 1
+        locations[location] += 1
+    _subtract_active(OwnerStats, "owner_id", owners)
+    _subtract_active(LocationStats, "location_id", locations)
+
+
+def _subtract_active(model, key_field, counts):
+    if not counts:
+        return
+    returned = Case(
+        *[When(**{key_field: key}, then=Value(count)) for key, count in counts.items()],
+        default=Value(0),
+    )
+    model.objects.filter(**{f"{key_field}__in": list(counts)}).update(active_rentals=F("active_rentals") - returned)
+
+
+def record_car(car, sign=1):
+    """Count a car added to (``sign=1``) or removed from (``sign=-1``) the fleet."""
+    _bump(OwnerStats, {"owner_id": car.added_by_id}, sign > 0, car_count=sign)
+    _bump(LocationStats, {"location_id": car.location_id}, sign > 0, car_count=sign)
+
+
+def record_car_moved(car, old_location):
+    if old_location is not None and old_location != car.location_id:
+        _bump(LocationStats, {"location_id": old_location}, False, car_count=-1)
+        _bump(LocationStats, {"location_id": car.location_id}, car_count=1)
+
+
+def refresh_car_counts():
+    """Recount the fleets from the cars table, after imports that skip the model signals."""
+    with transaction.atomic():
+        OwnerStats.objects.update(car_count=0)
+        LocationStats.objects.update(car_count=0)
+        for row in Car.objects.values("added_by").annotate(cars=Count("pk")).order_by():
+            _bump(OwnerStats, {"owner_id": row["added_by"]}, car_count=row["cars"])
+        for row in Car.objects.values("location").annotate(cars=Count("pk")).order_by():
+            _bump(LocationStats, {"location_id": row["location"]}, car_count=row["cars"])
+
+
+def _empty_totals():
+    return {"total_rentals": 0, "rented_days": 0, "revenue": Decimal(0), "active_rentals": 0}
+
+
+@transaction.atomic
+def rebuild_stats(chunk_size=2000):
+    """Recompute every stats table from the cars and rentals. Returns the number of rentals read."""
+    owners = defaultdict(_empty_totals)
+    locations = defaultdict(_empty_totals)
+    days = defaultdict(_empty_totals)
+
+    fields = ("start_date", "end_date", "total_price", "returned", "rented_on", "car__added_by", "location")
+    rentals = chain(
+        CarRental.objects.values_list(*fields).order_by().iterator(chunk_size),
+        # Archived rentals (cars.archive) still count
+        CarRentalArchive.objects.annotate(returned=Value(True)).values_list(*fields).order_by().iterator(chunk_size),
+    )
+    count = 0
+    for start_date, end_date, total_price, returned, rented_on, owner_id, location in rentals:
+        for totals in (owners[owner_id], locations[location], days[timezone.localdate(rented_on)]):
+            totals["total_rentals"] += 1
+            totals["rented_days"] += rental_days(start_date, end_date)
+            totals["revenue"] += total_price
+            totals["active_rentals"] += 0 if returned else 1
+        count += 1
+
+    for row in Car.objects.values("added_by").annotate(cars=Count("pk")).order_by():
+        owners[row["added_by"]]["car_count"] = row["cars"]
+    for row in Car.objects.values("location").annotate(cars=Count("pk")).order_by():
+        locations[row["location"]]["car_count"] = row["cars"]
+    for totals in days.values():
+        del totals["active_rentals"]
+
+    OwnerStats.objects.all().delete()
+    LocationStats.objects.all().delete()
+    DailyStats.objects.all().delete()
+    OwnerStats.objects.bulk_create(
+        [OwnerStats(owner_id=key, **totals) for key, totals in owners.items()], batch_size=chunk_size,
+    )
+    LocationStats.objects.bulk_create(
+        [LocationStats(location_id=key, **totals) for key, totals in locations.items()], batch_size=chunk_size,
+    )
+    DailyStats.objects.bulk_create(
+        [DailyStats(day=key, **totals) for key, totals in days.items()], batch_size=chunk_size,
+    )
+    return count
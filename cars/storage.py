@@ -0,0 +1,81 @@
+"""
+Content-addressed storage for car photos.
+
+An upload to ``car_images/`` is stored as
+``car_images/<first 2 hex>/<sha256><ext>``, so the same photo uploaded for
+several cars, or uploaded again, is stored once, and a name never points at
+different bytes. The media server (car_rental.media) sends such names with
+an ``immutable`` Cache-Control.
+
+Files are never deleted when a car lets go of them, since other cars may
+share them; ``manage.py gc_media`` removes the ones nothing references.
+"""
+import hashlib
+import os
+import posixpath
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def __init__(self, **kwargs):
+        # Two uploads of the same photo racing to the same name write the same bytes
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+
+car_image_storage = ContentAddressedStorage()
+
+
+def get_car_image_storage():
+    return car_image_storage
+
+
+def collect_garbage(min_age=3600, dry_run=False):
+    """
+    Delete files under ``car_images/`` that no car or rendition references.
+
+    Files younger than ``min_age`` seconds are kept: an upload is stored
+    before the car row that references it commits. Returns the names of the
+    files deleted (or, with ``dry_run``, that would be) and their total size.
+    """
+    from .images import IMAGE_FIELDS
+    from .models import Car
+
+    referenced = set()
+    for row in Car.objects.values(*IMAGE_FIELDS, "image_renditions").iterator():
+        referenced.update(row[field] for field in IMAGE_FIELDS if row[field])
+        for rendition in (row["image_renditions"] or {}).values():
+            referenced.update(rendition["widths"].values())
+
+    root = car_image_storage.path("car_images")
+    cutoff = time.time() - min_age
+    removed, size = [], 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, car_image_storage.location).replace(os.sep, "/")
+            stat = os.stat(path)
+            if name in referenced or stat.st_mtime > cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed.append(name)
+            size += stat.st_size
+    return removed, size
@@ -0,0 +1,75 @@
+"""
+Auto-return of overdue rentals.
+
+Cars only become available again when the renter returns them, so a
+rental whose ``end_date`` has passed keeps its car off the market. The
+sweeper returns every open rental that ended on or before the cutoff.
+It also marks the cars of advance bookings that start by the cutoff as
+unavailable, since booking them only reserved their dates.
+
+Rentals are processed in batches of ids read through the
+(returned, end_date) index, each batch in its own short transaction, and
+every change is a set-based UPDATE or DELETE over the batch. Memory use
+is one batch of ids however many rentals are overdue.
+"""
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from . import stats
+from .cache import bump_catalog_version
+from .models import Car, CarRental, BookedRange, SweepRun
+
+
+def sweep_overdue_rentals(cutoff=None, batch_size=1000):
+    """Return every open rental ending on or before ``cutoff`` (default today). Returns the SweepRun."""
+    run = SweepRun.objects.create(cutoff=cutoff or timezone.localdate())
+    while _sweep_batch(run, batch_size) == batch_size:
+        pass
+    picked_up = _mark_picked_up(run.cutoff)
+
+    run.refresh_from_db()
+    run.finished_at = timezone.now()
+    run.save(update_fields=["finished_at"])
+    if run.rentals_returned or picked_up:
+        bump_catalog_version()
+    return run
+
+
+def _mark_picked_up(cutoff):
+    """Mark the cars of open rentals that have started by ``cutoff`` as unavailable. Returns how many changed."""
+    on_the_road = CarRental.objects.on_the_road(cutoff).filter(car=OuterRef("pk"))
+    return Car.objects.filter(is_available=True).filter(Exists(on_the_road)).update(is_available=False)
+
+
+@transaction.atomic
+def _sweep_batch(run, batch_size):
+    # Writing the counter first takes SQLite's write lock, so no booking or
+    # return can slip in between reading the batch and updating it.
+    SweepRun.objects.filter(pk=run.pk).update(batches=F("batches") + 1)
+
+    overdue = CarRental.objects.filter(returned=False, end_date__lte=run.cutoff).order_by("end_date")
+    if transaction.get_connection().features.has_select_for_update_skip_locked:
+        # Rentals being returned by hand right now are left for the next run
+        overdue = overdue.select_for_update(skip_locked=True, of=("self",))
+    rows = list(overdue.values_list("pk", "car_id", "car__added_by", "location")[:batch_size])
+    if not rows:
+        return 0
+
+    rental_ids = [rental_id for rental_id, _, _, _ in rows]
+    car_ids = {car_id for _, car_id, _, _ in rows}
+    CarRental.objects.filter(pk__in=rental_ids).update(returned=True)
+    BookedRange.objects.filter(rental_id__in=rental_ids).delete()
+
+    # A booking that hasn't started yet doesn't keep its car off the market
+    still_rented = CarRental.objects.on_the_road(run.cutoff).filter(car=OuterRef("pk"))
+    cars_freed = Car.objects.filter(pk__in=car_ids, is_available=False).exclude(Exists(still_rented)).update(
+        is_available=True,
+    )
+    stats.record_returns((owner_id, location) for _, _, owner_id, location in rows)
+
+    SweepRun.objects.filter(pk=run.pk).update(
+        rentals_returned=F("rentals_returned") + len(rows),
+        cars_freed=F("cars_freed") + cars_freed,
+    )
+    return len(rows)
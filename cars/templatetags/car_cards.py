@@ -0,0 +1,58 @@
+"""
+The car card shared by the listing and "my cars" pages, cached per car.
+
+A card's HTML is cached in the catalog cache under the car's id and
+``updated_at``, plus the make and type names, quoted total and distance it shows,
+so an edited car, a renamed make or different rental dates simply miss the
+cache and nothing needs invalidating. After a catalog write drops the
+cached listing pages, they are rebuilt from these cards: only the cars that
+changed are rendered again.
+
+    {% load car_cards %}
+    {% car_cards page_of_cars %}
+    {% car_card car %}
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from cars.cache import catalog_cache
+
+register = template.Library()
+
+
+def card_cache_key(car):
+    shown = (
+        f"{car.car_make}|{car.car_type.name if car.car_type else ''}"
+        f"|{getattr(car, 'quoted_total', None) or ''}|{_distance(car)}"
+    )
+    digest = hashlib.md5(shown.encode(), usedforsecurity=False).hexdigest()[:12]
+    return f"car_card:{car.pk}:{car.updated_at.timestamp():.6f}:{digest}"
+
+
+def _distance(car):
+    distance = getattr(car, "distance_km", None)
+    return "" if distance is None else f"{distance:.1f}"
+
+
+@register.simple_tag
+def car_cards(cars):
+    """The cards of ``cars``, fetched from the cache in one round trip."""
+    cars = list(cars)
+    keys = [card_cache_key(car) for car in cars]
+    cached = catalog_cache().get_many(keys)
+    rendered = {}
+    for car, key in zip(cars, keys):
+        if key not in cached:
+            rendered[key] = render_to_string("car_card.html", {"car": car})
+    if rendered:
+        catalog_cache().set_many(rendered, settings.CAR_CARD_CACHE_TIMEOUT)
+    return mark_safe("".join(cached.get(key) or rendered[key] for key in keys))
+
+
+@register.simple_tag
+def car_card(car):
+    return car_cards([car])
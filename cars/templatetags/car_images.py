@@ -0,0 +1,34 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(car, field="image", sizes="100vw", **attrs):
+    """
+    ``<img>`` for one of a car's photos with a ``srcset`` of its WebP renditions.
+
+    Falls back to the original upload until the renditions exist, or when
+    they were built from a previous version of the photo.
+
+        {% responsive_image car "image" sizes="300px" class="card-img-top" alt=car.car_model %}
+    """
+    field_file = getattr(car, field)
+    if not field_file:
+        return ""
+
+    src = field_file.url
+    srcset = ""
+    rendition = (car.image_renditions or {}).get(field)
+    if rendition and rendition["source"] == field_file.name:
+        storage = field_file.storage
+        widths = sorted(rendition["widths"].items(), key=lambda item: int(item[0]))
+        srcset = ", ".join(f"{storage.url(name)} {width}w" for width, name in widths)
+        src = storage.url(widths[0][1])
+
+    attrs.setdefault("loading", "lazy")
+    extra = format_html_join(" ", '{}="{}"', sorted(attrs.items()))
+    if srcset:
+        return format_html('<img src="{}" srcset="{}" sizes="{}" {}>', src, srcset, sizes, extra)
+    return format_html('<img src="{}" {}>', src, extra)
@@ -1,3 +1,1487 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from operator import itemgetter
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from car_rental.monitoring import QueryBudgetExceeded
+from cars.archive import archive_cutoff, archive_rentals
+from cars.bulk import export_rows, import_cars, read_rows, write_rows
+from cars import references
+from cars.cache import bump_catalog_version, catalog_cache
+from cars.geo import cell_ranges, distance_km, grid_cell
+from cars.images import RENDITION_DIR, generate_car_renditions
+from cars.models import (
+    Car, CarType, CarRental, CarRentalArchive, PricingRule, OwnerStats, LocationStats, DailyStats, BookedRange, Make,
+    Location,
+)
+from cars.pricing import annotate_quotes, quote_cars, quote_price
+from cars.search import correct_terms, edit_distance
+from cars.services import BookingError, book_car
+from cars.storage import collect_garbage
+from cars.stats import rebuild_stats
+from cars.sweeper import sweep_overdue_rentals
+from user.cache import user_cache
+from user.models import CustomUser
+
+
+def clear_catalog_cache():
+    """Empty the catalog cache, then load the reference tables, which a warm process keeps across requests."""
+    catalog_cache().clear()
+    references.makes()
+    references.locations()
+
+
+def make(slug):
+    return Make.objects.get(slug=slug)
+
+
+def city(slug):
+    """A Location; cities the data migration didn't seed are created."""
+    return Location.objects.get_or_create(slug=slug, defaults={"name": slug.title()})[0]
+
+
+class QueryCountMixin:
+    """
+    Every page must run a fixed number of queries however many rows exist.
+
+    Subclasses set ``rows``; the same assertions run against 1, 100 and 10k
+    cars and rentals.
+    """
+    rows = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000001", "pass", email="owner@example.com")
+        cls.renter = CustomUser.objects.create_user("555000002", "pass", email="renter@example.com")
+        car_types = CarType.objects.bulk_create(CarType(name=f"Type {i}") for i in range(5))
+        toyota, tbilisi = make("toyota"), city("tbilisi")
+        Car.objects.bulk_create(
+            Car(
+                car_type=car_types[i % len(car_types)],
+                car_make=toyota,
+                location=tbilisi,
+                car_model=f"Model {i}",
+                registration_number=f"REG-{i}",
+                price_per_day=40,
+                description="x" * 500,
+                added_by=cls.owner,
+            )
+            for i in range(cls.rows)
+        )
+        cls.car = Car.objects.first()
+        CarRental.objects.bulk_create(
+            CarRental(
+                car_id=car_id,
+                location_id=location_id,
+                user=cls.renter,
+                start_date=date(2025, 6, 1),
+                end_date=date(2025, 6, 5),
+                total_price=160,
+            )
+            for car_id, location_id in Car.objects.values_list("pk", "location")
+        )
+
+    def setUp(self):
+        clear_catalog_cache()
+        # Counts below include loading the signed-in user, which later requests get from the cache
+        user_cache().clear()
+
+    def test_car_list(self):
+        # COUNT, page of cars with their types, makes and cities, car type choices for the filter form
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("cars:car_list"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_car_list_cached(self):
+        self.client.get(reverse("cars:car_list"))
+        # Only the filter form's car type choices
+        with self.assertNumQueries(1):
+            self.client.get(reverse("cars:car_list"))
+
+    def test_car_list_with_dates(self):
+        PricingRule.objects.create(name="June", kind="season", starts_on=date(2025, 6, 1),
+                                   ends_on=date(2025, 6, 30), multiplier="1.2")
+        self.client.force_login(self.renter)
+        # session, user, pricing rules, COUNT, page of available cars with their quotes, car type choices
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse("cars:car_list"), {
+                "available_after": "2025-06-10", "available_before": "2025-06-12",
+            })
+        self.assertEqual(response.status_code, 200)
+
+    def test_my_cars(self):
+        self.client.force_login(self.owner)
+        # session, user, COUNT, page of cars with their types, owner stats
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("cars:my_cars"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_car_detail(self):
+        # car joined to its type, make, city and owner
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("cars:car_detail", kwargs={"pk": self.car.pk}))
+        self.assertContains(response, self.owner.phone_number)
+
+    def test_my_rentals(self):
+        self.client.force_login(self.renter)
+        # session, user, COUNT, page of rentals joined to cars
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse("cars:my_rentals"))
+        self.assertEqual(len(response.context["rentals"]), min(self.rows, 20))
+
+    def test_rental_str(self):
+        rentals = list(CarRental.objects.with_listing_related()[:50])
+        with self.assertNumQueries(0):
+            [str(rental) for rental in rentals]
+
+
+class QueryCountOneRowTests(QueryCountMixin, TestCase):
+    rows = 1
+
+
+class QueryCountHundredRowsTests(QueryCountMixin, TestCase):
+    rows = 100
+
+
+class QueryCountTenThousandRowsTests(QueryCountMixin, TestCase):
+    rows = 10_000
+
+
+class ListingCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000023", "pass", email="listed@example.com")
+        cls.renter = CustomUser.objects.create_user("555000024", "pass", email="browser@example.com")
+        cls.car = Car.objects.create(car_make=make("jeep"), location=city("batumi"), car_model="Wrangler",
+                                     registration_number="LC-1", price_per_day=70, added_by=cls.owner)
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def test_unknown_params_share_the_entry(self):
+        cache = catalog_cache()
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.client.get(reverse("cars:car_list"), {"location": "batumi"})
+            for junk in ("1", "2", "3"):
+                response = self.client.get(reverse("cars:car_list"), {"location": "batumi", "utm_source": junk})
+                self.assertContains(response, "Wrangler")
+            # Filters still get entries of their own
+            self.client.get(reverse("cars:car_list"), {"location": "tbilisi"})
+            self.client.get(reverse("cars:car_list"), {"location": "batumi", "model_year_min": "2000"})
+        page_keys = [call.args[0] for call in cache_set.call_args_list if call.args[0].startswith("car_list:")]
+        self.assertEqual(len(page_keys), 3)
+
+    def test_car_save_drops_cached_page(self):
+        self.assertContains(self.client.get(reverse("cars:car_list")), "Wrangler")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.car_model = "Gladiator"
+            self.car.save()
+        self.assertContains(self.client.get(reverse("cars:car_list")), "Gladiator")
+
+    def test_booking_drops_cached_page(self):
+        dates = {"available_after": "2030-06-01", "available_before": "2030-06-04"}
+        self.assertContains(self.client.get(reverse("cars:car_list"), dates), "Wrangler")
+        with self.captureOnCommitCallbacks(execute=True):
+            book_car(self.car.pk, self.renter, date(2030, 6, 2), date(2030, 6, 3))
+        self.assertNotContains(self.client.get(reverse("cars:car_list"), dates), "Wrangler")
+
+
+@override_settings(CAR_LIST_PAGINATION="cursor", CAR_LIST_COUNT_MODE="approximate")
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = CustomUser.objects.create_user("555000003", "pass", email="cursor@example.com")
+        car_type = CarType.objects.create(name="Sedan")
+        honda, tbilisi = make("honda"), city("tbilisi")
+        Car.objects.bulk_create(
+            Car(car_type=car_type, car_make=honda, location=tbilisi, car_model=f"Model {i}",
+                registration_number=f"CUR-{i}", price_per_day=30, added_by=owner)
+            for i in range(20)
+        )
+        # Same timestamp everywhere, so ordering falls back to the id tie-breaker
+        Car.objects.update(date_added=Car.objects.first().date_added)
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            page = response.context["page_obj"]
+            seen.append([car.pk for car in page])
+            url = reverse("cars:car_list") + page.next_url if page.has_next() else None
+        return seen, response
+
+    def test_pages_cover_every_car_once(self):
+        pages, _ = self.walk(reverse("cars:car_list"))
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(ids, list(Car.objects.values_list("pk", flat=True)))
+        self.assertEqual([len(page) for page in pages], [6, 6, 6, 2])
+
+    def test_previous_page(self):
+        pages, last = self.walk(reverse("cars:car_list"))
+        response = self.client.get(reverse("cars:car_list") + last.context["page_obj"].previous_url)
+        self.assertEqual([car.pk for car in response.context["page_obj"]], pages[-2])
+
+    def test_keeps_filters(self):
+        response = self.client.get(reverse("cars:car_list"), {"car_make": "honda"})
+        self.assertIn("car_make=honda", response.context["page_obj"].next_url)
+
+    def test_links_drop_params_the_cache_ignores(self):
+        response = self.client.get(reverse("cars:car_list"), {"car_make": "honda", "utm_source": "mail"})
+        self.assertEqual(response.context["page_obj"].next_url.split("&")[0], "?car_make=honda")
+        self.assertNotIn("utm_source", response.context["page_obj"].next_url)
+        # Another visitor gets the cached fragment with the same links
+        response = self.client.get(reverse("cars:car_list"), {"car_make": "honda"})
+        self.assertNotIn("page_obj", response.context)
+        self.assertNotContains(response, "utm_source")
+
+    def test_no_count_query(self):
+        # MAX(id) estimate, page of cars, car type choices
+        with self.assertNumQueries(3):
+            self.client.get(reverse("cars:car_list"))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("cars:car_list"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = CustomUser.objects.create_user("555000004", "pass", email="search@example.com")
+        suv = CarType.objects.create(name="SUV")
+        sedan = CarType.objects.create(name="Sedan")
+        cls.prius = Car.objects.create(
+            car_type=sedan, car_make=make("toyota"), car_model="Prius", model_year=2018, location=city("batumi"),
+            registration_number="SR-1", price_per_day=30, added_by=owner, description="Hybrid, very economical",
+        )
+        cls.rav4 = Car.objects.create(
+            car_type=suv, car_make=make("toyota"), car_model="RAV4", model_year=2021, location=city("tbilisi"),
+            registration_number="SR-2", price_per_day=50, added_by=owner, description="Roomy hybrid crossover",
+        )
+        cls.golf = Car.objects.create(
+            car_type=sedan, car_make=make("volkswagen"), car_model="Golf", model_year=2016, location=city("batumi"),
+            registration_number="SR-3", price_per_day=25, added_by=owner, description="",
+        )
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def search(self, q, **params):
+        # Catalog version bumps wait for a commit that TestCase never makes
+        clear_catalog_cache()
+        response = self.client.get(reverse("cars:car_list"), {"q": q, **params})
+        return [car.pk for car in response.context["page_obj"]]
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search("toyota batumi"), [self.prius.pk])
+
+    def test_prefix_terms(self):
+        self.assertEqual(self.search("pri 201"), [self.prius.pk])
+
+    def test_misspelt_terms(self):
+        self.assertEqual(self.search("pirus"), [self.prius.pk])
+        self.assertEqual(self.search("toyta batumi"), [self.prius.pk])
+        self.assertEqual(self.search("volksvagen"), [self.golf.pk])
+        self.assertEqual(set(self.search("hybird")), {self.prius.pk, self.rav4.pk})
+        # Too far from any word, or too short to guess
+        self.assertEqual(self.search("pxxus"), [])
+        self.assertEqual(self.search("glf"), [])
+
+    def test_correct_terms(self):
+        self.assertEqual(correct_terms(["pri", "economicl", "tbilsi", "zzzz"]),
+                         ["pri", "economical", "tbilisi", "zzzz"])
+        self.assertEqual(edit_distance("pirus", "prius"), 1)
+        self.assertEqual(edit_distance("volksvagen", "volkswagen"), 1)
+        self.assertEqual(edit_distance("golf", "gulp"), 2)
+
+    def test_make_label_and_type(self):
+        self.assertEqual(set(self.search("hybrid")), {self.prius.pk, self.rav4.pk})
+        self.assertEqual(self.search("suv"), [self.rav4.pk])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self.search("batumi", car_make="volkswagen"), [self.golf.pk])
+
+    def test_index_follows_edits(self):
+        self.golf.location = city("kutaisi")
+        self.golf.save()
+        self.assertEqual(self.search("kutaisi"), [self.golf.pk])
+        CarType.objects.filter(name="SUV").get().delete()
+        self.assertEqual(self.search("suv"), [])
+        self.golf.delete()
+        self.assertEqual(self.search("golf"), [])
+
+    def test_result_cap_applies_after_filters(self):
+        # The newest match is the RAV4 in Tbilisi; the cap must not crowd out the Prius in Batumi
+        with mock.patch("cars.search.SEARCH_MAX_RESULTS", 1):
+            self.assertEqual(self.search("toyota", location="batumi"), [self.prius.pk])
+            self.assertEqual(self.search("toyota"), [self.rav4.pk])
+
+    def test_with_radius_keeps_distance_order(self):
+        self.assertEqual(self.search("toyota", near="rustavi", radius=300), [self.rav4.pk, self.prius.pk])
+
+    @override_settings(CAR_LIST_PAGINATION="cursor")
+    def test_search_pages_by_offset(self):
+        response = self.client.get(reverse("cars:car_list"), {"q": "toyota"})
+        self.assertFalse(getattr(response.context["paginator"], "is_cursor", False))
+
+
+class GeoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = CustomUser.objects.create_user("555000013", "pass", email="geo@example.com")
+        sedan = CarType.objects.create(name="Sedan")
+        cls.cars = {
+            slug: Car.objects.create(
+                car_type=sedan, car_make=make("toyota"), car_model="Corolla", model_year=2019, location=city(slug),
+                registration_number=f"GEO-{slug}", price_per_day=30, added_by=owner,
+            )
+            for slug in ("tbilisi", "rustavi", "kutaisi", "batumi")
+        }
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def near(self, near, **params):
+        clear_catalog_cache()
+        response = self.client.get(reverse("cars:car_list"), {"near": near, **params})
+        return [car.location.slug for car in response.context["page_obj"]]
+
+    def test_distance(self):
+        # Tbilisi to Batumi is about 265 km as the crow flies
+        self.assertAlmostEqual(distance_km(41.7151, 44.8271, 41.6168, 41.6367), 265, delta=15)
+        self.assertEqual(distance_km(41.7, 44.8, 41.7, 44.8), 0)
+
+    def test_seeded_cells(self):
+        tbilisi = city("tbilisi")
+        self.assertEqual((tbilisi.grid_row, tbilisi.grid_col), grid_cell(tbilisi.latitude, tbilisi.longitude))
+
+    def test_cells_follow_coordinates(self):
+        place = city("mtskheta")
+        self.assertIsNone(place.grid_row)
+        place.latitude, place.longitude = 41.8411, 44.7186
+        place.save(update_fields=["latitude", "longitude"])
+        place.refresh_from_db()
+        self.assertEqual((place.grid_row, place.grid_col), grid_cell(41.8411, 44.7186))
+
+    def test_within_radius_nearest_first(self):
+        tbilisi = city("tbilisi")
+        self.assertEqual(self.near("tbilisi"), ["tbilisi", "rustavi"])
+        self.assertEqual(self.near("41.55,44.99"), ["rustavi", "tbilisi"])
+        self.assertEqual(self.near("tbilisi", radius=200), ["tbilisi", "rustavi", "kutaisi"])
+        self.assertEqual(self.near(f"{tbilisi.latitude},{tbilisi.longitude}", radius=5), ["tbilisi"])
+
+    def test_cell_prefilter_matches_full_scan(self):
+        points = [(41.0 + i * 0.05, 41.5 + i * 0.17) for i in range(25)]
+        for i, (latitude, longitude) in enumerate(points):
+            Location.objects.create(slug=f"point-{i}", name=f"Point {i}", latitude=latitude, longitude=longitude)
+        all_points = Location.objects.exclude(latitude=None).values_list("pk", "latitude", "longitude")
+        for radius in (10, 50, 120):
+            expected = sorted(pk for pk, lat, lon in all_points if distance_km(41.6, 43.0, lat, lon) <= radius)
+            self.assertEqual(sorted(pk for pk, _ in Location.objects.within(41.6, 43.0, radius)), expected)
+
+    def test_antimeridian(self):
+        columns = cell_ranges(0, 179.95, 20)[1]
+        self.assertEqual(len(columns), 2)
+        Location.objects.create(slug="east", name="East of the antimeridian", latitude=0, longitude=-179.95)
+        self.assertEqual([location.slug for location in Location.objects.filter(
+            pk__in=[pk for pk, _ in Location.objects.within(0, 179.95, 20)])], ["east"])
+
+    def test_invalid_origin(self):
+        self.assertEqual(self.near("atlantis"), [])
+        self.assertEqual(self.near("95,44"), [])
+        self.assertEqual(self.near("tbilisi", radius=-1), [])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self.near("tbilisi", radius=200, location="kutaisi"), ["kutaisi"])
+
+    @override_settings(CAR_LIST_PAGINATION="cursor")
+    def test_radius_pages_by_offset(self):
+        response = self.client.get(reverse("cars:car_list"), {"near": "tbilisi"})
+        self.assertFalse(getattr(response.context["paginator"], "is_cursor", False))
+        self.assertContains(response, "km away")
+
+
+class AvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = CustomUser.objects.create_user("555000016", "pass", email="calendar@example.com")
+        renter = CustomUser.objects.create_user("555000017", "pass", email="planner@example.com")
+        cls.booked, cls.free = (
+            Car.objects.create(car_make=make("mazda"), location=city("tbilisi"), car_model=model,
+                               registration_number=f"AV-{model}", price_per_day=30, added_by=owner)
+            for model in ("CX-5", "3")
+        )
+        # Nights of June 10, 11 and 12, back on the 13th
+        book_car(cls.booked.pk, renter, date(2025, 6, 10), date(2025, 6, 13))
+
+    def available(self, after=None, before=None):
+        clear_catalog_cache()
+        params = {key: value for key, value in (("available_after", after), ("available_before", before)) if value}
+        response = self.client.get(reverse("cars:car_list"), params)
+        return {car.pk for car in response.context["page_obj"]}
+
+    def test_overlap_is_excluded(self):
+        both = {self.booked.pk, self.free.pk}
+        self.assertEqual(self.available("2025-06-12", "2025-06-14"), {self.free.pk})
+        self.assertEqual(self.available("2025-06-08", "2025-06-20"), {self.free.pk})
+        self.assertEqual(self.available("2025-06-11", "2025-06-12"), {self.free.pk})
+        self.assertEqual(self.available(), both)
+
+    def test_adjacent_rentals_are_allowed(self):
+        both = {self.booked.pk, self.free.pk}
+        # Returned the day the booking starts, or picked up the day it ends
+        self.assertEqual(self.available("2025-06-08", "2025-06-10"), both)
+        self.assertEqual(self.available("2025-06-13", "2025-06-15"), both)
+
+    def test_same_day_is_one_day(self):
+        self.assertEqual(self.available("2025-06-10", "2025-06-10"), {self.free.pk})
+        self.assertEqual(self.available("2025-06-12", "2025-06-12"), {self.free.pk})
+        self.assertEqual(self.available("2025-06-13", "2025-06-13"), {self.booked.pk, self.free.pk})
+        # Only one of the dates
+        self.assertEqual(self.available(after="2025-06-12"), {self.free.pk})
+        self.assertEqual(self.available(before="2025-06-10"), {self.free.pk})
+        self.assertEqual(self.available(before="2025-06-09"), {self.booked.pk, self.free.pk})
+
+
+class PricingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000005", "pass", email="pricing@example.com")
+        cls.renter = CustomUser.objects.create_user("555000006", "pass", email="payer@example.com")
+        cls.suv = CarType.objects.create(name="SUV")
+        cls.sedan = CarType.objects.create(name="Sedan")
+        cls.cars = [
+            Car.objects.create(car_type=car_type, car_make=make("toyota"), location=city("batumi"),
+                               car_model=f"Model {i}", registration_number=f"PR-{i}", price_per_day=price,
+                               added_by=cls.owner)
+            for i, (car_type, price) in enumerate([(cls.suv, 40), (cls.sedan, 33), (None, 25)])
+        ]
+        # Friday to Monday: Friday, Saturday and Sunday are billed
+        cls.start, cls.end = date(2025, 6, 6), date(2025, 6, 9)
+
+    def test_without_rules_price_is_days_times_rate(self):
+        self.assertEqual(quote_price(self.cars[0], self.start, self.end), Decimal("120.00"))
+        self.assertEqual(quote_price(self.cars[0], self.start, self.start), Decimal("40.00"))
+
+    def test_rules_stack(self):
+        PricingRule.objects.create(name="Saturday", kind="weekday", weekday=5, multiplier="1.5")
+        PricingRule.objects.create(name="Sunday", kind="weekday", weekday=6, multiplier="1.5")
+        PricingRule.objects.create(name="June", kind="season", starts_on=date(2025, 6, 7),
+                                   ends_on=date(2025, 6, 30), multiplier="1.1")
+        PricingRule.objects.create(name="SUV weekly", kind="duration", min_days=3, multiplier="0.9",
+                                   car_type=self.suv)
+        # Friday 1, Saturday 1.5 * 1.1, Sunday 1.5 * 1.1 = 4.3 days
+        self.assertEqual(quote_price(self.cars[1], self.start, self.end), Decimal("141.90"))
+        # Same days, 10% off for three days or more on SUVs
+        self.assertEqual(quote_price(self.cars[0], self.start, self.end), Decimal("154.80"))
+
+    def test_batch_quotes_match_single_quotes(self):
+        PricingRule.objects.create(name="Weekend", kind="weekday", weekday=5, multiplier="1.25")
+        PricingRule.objects.create(name="Sedan deal", kind="duration", min_days=2, multiplier="0.85",
+                                   car_type=self.sedan)
+        expected = {car.pk: quote_price(car, self.start, self.end) for car in self.cars}
+        self.assertEqual(quote_cars(self.cars, self.start, self.end), expected)
+        with self.assertNumQueries(2):
+            annotated = dict(annotate_quotes(Car.objects.all(), self.start, self.end)
+                             .values_list("pk", "quoted_total"))
+        self.assertEqual(annotated, expected)
+
+    def test_rental_uses_quote(self):
+        PricingRule.objects.create(name="Sunday", kind="weekday", weekday=6, multiplier="2")
+        rental = CarRental.objects.create(car=self.cars[2], user=self.renter, start_date=self.start,
+                                          end_date=self.end)
+        self.assertEqual(rental.total_price, Decimal("100.00"))
+
+    def test_list_shows_totals_for_dates(self):
+        clear_catalog_cache()
+        response = self.client.get(reverse("cars:car_list"), {
+            "available_after": self.start.isoformat(), "available_before": self.end.isoformat(),
+        })
+        self.assertContains(response, "Total for your dates: $120.00")
+
+    def test_list_and_api_quote_with_season_rule(self):
+        PricingRule.objects.create(name="June", kind="season", starts_on=date(2025, 6, 7),
+                                   ends_on=date(2025, 6, 30), multiplier="1.5")
+        params = {"available_after": self.start.isoformat(), "available_before": self.end.isoformat()}
+        clear_catalog_cache()
+        # Friday 1, Saturday 1.5, Sunday 1.5 = 4 days at $40
+        self.assertContains(self.client.get(reverse("cars:car_list"), params), "Total for your dates: $160.00")
+        response = self.client.get(reverse("cars:api_car_list"), params)
+        self.assertEqual(response.status_code, 200)
+        totals = {car["id"]: car["quoted_total"] for car in response.json()["results"]}
+        self.assertEqual(totals[self.cars[0].pk], "160.00")
+
+
+class BulkImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000014", "pass", email="fleet-import@example.com")
+        cls.other = CustomUser.objects.create_user("555000015", "pass", email="rival@example.com")
+        cls.rival_car = Car.objects.create(car_make=make("kia"), location=city("batumi"), car_model="Rio",
+                                           registration_number="TAKEN-1", price_per_day=25, added_by=cls.other)
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def load(self, text, fmt, batch_size=1000):
+        errors = []
+        imported, skipped = import_cars(
+            read_rows(io.StringIO(text), fmt), self.owner, batch_size=batch_size,
+            on_error=lambda line, message: errors.append((line, message)),
+        )
+        return imported, skipped, errors
+
+    def test_csv(self):
+        imported, skipped, errors = self.load(
+            "registration_number,car_make,car_model,model_year,car_type,location,price_per_day,transmission\n"
+            "IMP-1,Toyota,Prius,2018,Sedan,Batumi,30.50,Automatic\n"
+            "IMP-2,kia,Rio,,,,25,manual\n",
+            "csv",
+        )
+        self.assertEqual((imported, skipped, errors), (2, 0, []))
+        prius = Car.objects.get(registration_number="IMP-1")
+        self.assertEqual((prius.car_make.slug, prius.location.slug, prius.car_type.name), ("toyota", "batumi", "Sedan"))
+        self.assertEqual((prius.price_per_day, prius.transmission, prius.added_by), (Decimal("30.50"), "automatic",
+                                                                                      self.owner))
+        rio = Car.objects.get(registration_number="IMP-2")
+        self.assertEqual((rio.location.slug, rio.car_type, rio.model_year), ("tbilisi", None, Car.CURRENT_YEAR))
+        self.assertEqual(OwnerStats.objects.get(owner=self.owner).car_count, 2)
+
+    def test_jsonl(self):
+        rows = [
+            {"registration_number": "IMP-3", "car_make": "audi", "car_model": "A4", "price_per_day": 60,
+             "is_available": False},
+            {"registration_number": 4, "car_make": "audi", "car_model": 80, "price_per_day": "45.00"},
+        ]
+        imported, skipped, errors = self.load("".join(json.dumps(row) + "\n" for row in rows), "jsonl")
+        self.assertEqual((imported, skipped, errors), (2, 0, []))
+        self.assertFalse(Car.objects.get(registration_number="IMP-3").is_available)
+        self.assertEqual(Car.objects.get(registration_number="4").car_model, "80")
+
+    def test_bad_rows_are_skipped(self):
+        good = {"registration_number": "IMP-5", "car_make": "kia", "car_model": "Ceed", "price_per_day": 20}
+        bad = [
+            {**good, "price_per_day": "NaN"},
+            {**good, "price_per_day": "Infinity"},
+            {**good, "price_per_day": "-5"},
+            {**good, "price_per_day": "10.005"},
+            {**good, "price_per_day": "123456789"},
+            {**good, "price_per_day": None},
+            {**good, "model_year": [2020]},
+            {**good, "car_make": "trabant"},
+            {**good, "registration_number": ""},
+            [1, 2],
+        ]
+        text = "".join(json.dumps(row) + "\n" for row in bad) + "{not json\n" + json.dumps(good) + "\n"
+        imported, skipped, errors = self.load(text, "jsonl", batch_size=2)
+        self.assertEqual((imported, skipped), (1, 11))
+        self.assertEqual([line for line, _ in errors], list(range(1, 12)))
+        self.assertIn("not a number", errors[0][1])
+        self.assertIn("too large", errors[4][1])
+        self.assertIn("expected an object", errors[9][1])
+        self.assertTrue(Car.objects.filter(registration_number="IMP-5").exists())
+
+    def test_upsert(self):
+        self.load("registration_number,car_make,car_model,price_per_day\nIMP-6,kia,Rio,25\n", "csv")
+        car = Car.objects.get(registration_number="IMP-6")
+        imported, skipped, errors = self.load(
+            "registration_number,car_make,car_model,price_per_day\nIMP-6,kia,Rio,27\nIMP-6,kia,Rio 2,28\n", "csv",
+        )
+        self.assertEqual((imported, skipped), (1, 0))
+        car.refresh_from_db()
+        self.assertEqual((car.car_model, car.price_per_day), ("Rio 2", Decimal("28.00")))
+        self.assertEqual(Car.objects.filter(registration_number="IMP-6").count(), 1)
+
+    def test_upsert_leaves_other_owners_cars_alone(self):
+        imported, skipped, errors = self.load(
+            "registration_number,car_make,car_model,price_per_day\nTAKEN-1,kia,Stolen,1\nIMP-7,kia,Rio,25\n", "csv",
+        )
+        self.assertEqual((imported, skipped), (1, 1))
+        self.assertEqual(errors[0][0], 2)
+        self.assertIn("another user", errors[0][1])
+        self.rival_car.refresh_from_db()
+        self.assertEqual((self.rival_car.car_model, self.rival_car.added_by), ("Rio", self.other))
+
+    def test_export_round_trip(self):
+        self.load(
+            "registration_number,car_make,car_model,model_year,car_type,location,price_per_day,description\n"
+            'IMP-8,Toyota,Prius,2018,Sedan,batumi,30.50,"Hybrid, comma"\n',
+            "csv",
+        )
+        for fmt in ("csv", "jsonl"):
+            stream = io.StringIO()
+            self.assertEqual(write_rows(export_rows(Car.objects.all()), stream, fmt), 2)
+            exported = list(export_rows(Car.objects.all()))
+            Car.objects.filter(added_by=self.owner).delete()
+            stream.seek(0)
+            imported, skipped, errors = self.load(stream.getvalue(), fmt)
+            # The other user's car is in the file but stays theirs
+            self.assertEqual((imported, skipped), (1, 1))
+            # Re-imported cars get new ids, and the export is in id order
+            by_registration = itemgetter("registration_number")
+            self.assertEqual(sorted(export_rows(Car.objects.all()), key=by_registration),
+                             sorted(exported, key=by_registration))
+
+
+class BookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000021", "pass", email="lender@example.com")
+        cls.renter = CustomUser.objects.create_user("555000022", "pass", email="borrower@example.com")
+        cls.car = Car.objects.create(car_make=make("subaru"), location=city("tbilisi"), car_model="Forester",
+                                     registration_number="BK-1", price_per_day=45, added_by=cls.owner)
+
+    def rent(self, start, end):
+        return self.client.post(reverse("cars:car_rent", args=[self.car.pk]),
+                                {"start_date": start.isoformat(), "end_date": end.isoformat()}, follow=True)
+
+    def test_books_and_blocks_overlaps(self):
+        rental = book_car(self.car.pk, self.renter, date(2030, 6, 1), date(2030, 6, 4))
+        self.assertEqual((rental.total_price, rental.location, rental.returned), (Decimal("135.00"), city("tbilisi"),
+                                                                                 False))
+        # Booked ahead, so the car stays on the market until pick-up
+        self.assertTrue(Car.objects.get(pk=self.car.pk).is_available)
+        self.assertEqual(list(BookedRange.objects.values_list("start_date", "end_date")),
+                         [(date(2030, 6, 1), date(2030, 6, 4))])
+
+        with self.assertRaisesMessage(BookingError, "already booked"):
+            book_car(self.car.pk, self.renter, date(2030, 6, 3), date(2030, 6, 5))
+        with self.assertRaisesMessage(BookingError, "already booked"):
+            book_car(self.car.pk, self.renter, date(2030, 5, 1), date(2030, 7, 1))
+        # Back to back is fine
+        book_car(self.car.pk, self.renter, date(2030, 6, 4), date(2030, 6, 6))
+        self.assertEqual(CarRental.objects.count(), 2)
+
+    def test_books_separate_dates_while_out(self):
+        today = timezone.localdate()
+        current = book_car(self.car.pk, self.renter, today, today + timedelta(days=3))
+        self.assertFalse(Car.objects.get(pk=self.car.pk).is_available)
+        later = book_car(self.car.pk, self.renter, today + timedelta(days=10), today + timedelta(days=12))
+        book_car(self.car.pk, self.renter, today + timedelta(days=20), today + timedelta(days=21))
+        self.assertEqual(BookedRange.objects.filter(car=self.car).count(), 3)
+        with self.assertRaisesMessage(BookingError, "already booked"):
+            book_car(self.car.pk, self.renter, today + timedelta(days=11), today + timedelta(days=13))
+
+        # Returned early: free again, whatever is booked for later
+        current.mark_returned()
+        self.assertTrue(Car.objects.get(pk=self.car.pk).is_available)
+        self.assertFalse(later.returned)
+
+    def test_rejects_bad_periods_and_own_car(self):
+        with self.assertRaisesMessage(BookingError, "return date must be after"):
+            book_car(self.car.pk, self.renter, date(2030, 6, 4), date(2030, 6, 4))
+        with self.assertRaisesMessage(BookingError, "own car"):
+            book_car(self.car.pk, self.owner, date(2030, 6, 1), date(2030, 6, 4))
+        self.assertFalse(CarRental.objects.exists())
+
+    def test_sqlite_lock_fallback(self):
+        # Without SELECT ... FOR UPDATE the write lock is taken with a no-op UPDATE first
+        with CaptureQueriesContext(connection) as queries:
+            book_car(self.car.pk, self.renter, date(2030, 6, 1), date(2030, 6, 4))
+        statements = [query["sql"] for query in queries if not query["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertTrue(statements[0].startswith("UPDATE"), statements[0])
+        self.assertNotIn("FOR UPDATE", " ".join(statements))
+
+        with self.assertRaises(Car.DoesNotExist):
+            book_car(0, self.renter, date(2030, 6, 1), date(2030, 6, 4))
+
+    def test_view(self):
+        self.client.force_login(self.renter)
+        today = timezone.localdate()
+        response = self.rent(today - timedelta(days=1), today + timedelta(days=2))
+        self.assertContains(response, "can&#x27;t be in the past")
+        response = self.rent(today + timedelta(days=3), today + timedelta(days=1))
+        self.assertContains(response, "return date must be after")
+        self.assertFalse(CarRental.objects.exists())
+
+        response = self.rent(today, today + timedelta(days=2))
+        self.assertRedirects(response, reverse("cars:my_rentals"))
+        self.assertEqual(CarRental.objects.get().user, self.renter)
+        response = self.rent(today + timedelta(days=1), today + timedelta(days=3))
+        self.assertContains(response, "already booked")
+        self.assertEqual(CarRental.objects.count(), 1)
+
+        self.client.force_login(self.owner)
+        self.assertContains(self.rent(today + timedelta(days=5), today + timedelta(days=6)), "own car")
+
+
+class ReferenceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000013", "pass", email="refs@example.com")
+        cls.audi = Car.objects.create(car_make=make("audi"), location=city("batumi"), car_model="A4",
+                                      registration_number="REF-1", price_per_day=60, added_by=cls.owner)
+        cls.kia = Car.objects.create(car_make=make("kia"), location=city("tbilisi"), car_model="Rio",
+                                     registration_number="REF-2", price_per_day=25, added_by=cls.owner)
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def test_migration_normalizes_choices(self):
+        # 'Nissan'/'nissan' and friends became one lowercase slug with a proper name
+        self.assertEqual(make("nissan").name, "Nissan")
+        self.assertEqual(make("mercedes").name, "Mercedes-Benz")
+        self.assertEqual(Location.objects.count(), 5)
+        self.assertTrue(all(slug == slug.lower() for slug in Make.objects.values_list("slug", flat=True)))
+
+    def test_filters_by_slug_from_cache(self):
+        # COUNT, page of cars, car type choices: the make and city choices are in memory
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("cars:car_list"), {"car_make": "audi", "location": "batumi"})
+        self.assertEqual([car.pk for car in response.context["cars"]], [self.audi.pk])
+        response = self.client.get(reverse("cars:car_list"), {"car_make": "no-such-make"})
+        self.assertEqual(list(response.context["cars"]), [])
+
+    def test_cache_reloads_after_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Make.objects.create(slug="dacia", name="Dacia")
+        self.assertIn(("dacia", "Dacia"), references.make_choices())
+        with self.captureOnCommitCallbacks(execute=True):
+            Make.objects.filter(slug="dacia").get().delete()
+        self.assertNotIn("dacia", references.makes().by_slug)
+
+    def test_car_form_choices_from_cache(self):
+        from cars.forms import CarForm
+
+        with self.assertNumQueries(0):
+            html = str(CarForm()["car_make"])
+        self.assertIn(">Mercedes-Benz<", html)
+        form = CarForm(instance=self.kia)
+        self.assertEqual(form["location"].value(), city("tbilisi").pk)
+        data = {
+            "car_type": CarType.objects.create(name="Saloon").pk, "car_make": make("audi").pk,
+            "location": city("batumi").pk, "car_model": "A6", "model_year": 2020, "registration_number": "REF-5",
+            "car_capacity": "5", "transmission": "automatic", "price_per_day": "90",
+        }
+        form = CarForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["car_make"].slug, "audi")
+        self.assertFalse(CarForm({**data, "location": 999999}).is_valid())
+
+    def test_import_matches_slug_or_name(self):
+        from cars.bulk import import_cars
+
+        errors = []
+        rows = [
+            (1, {"registration_number": "REF-3", "car_make": "Mercedes-Benz", "car_model": "C", "location": "BATUMI",
+                 "price_per_day": "70"}),
+            (2, {"registration_number": "REF-4", "car_make": "Trabant", "car_model": "601", "price_per_day": "5"}),
+        ]
+        self.assertEqual(import_cars(rows, self.owner, on_error=lambda line, message: errors.append(line)), (1, 1))
+        car = Car.objects.get(registration_number="REF-3")
+        self.assertEqual((car.car_make.slug, car.location.slug), ("mercedes", "batumi"))
+        self.assertEqual(errors, [2])
+
+    def test_api_uses_slugs(self):
+        response = self.client.get(reverse("cars:api_car_detail", kwargs={"pk": self.kia.pk}))
+        payload = response.json()
+        self.assertEqual((payload["car_make"], payload["car_make_name"]), ("kia", "Kia"))
+        self.assertEqual((payload["location"], payload["location_name"]), ("tbilisi", "Tbilisi"))
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000025", "pass", email="api@example.com")
+        cls.renter = CustomUser.objects.create_user("555000026", "pass", email="client@example.com")
+        cls.cars = [
+            Car.objects.create(car_make=make(slug), location=city(location), car_model=f"API {i}",
+                               transmission=transmission, registration_number=f"API-{i}", price_per_day=20 + i,
+                               added_by=cls.owner)
+            for i, (slug, location, transmission) in enumerate([
+                ("kia", "tbilisi", "manual"), ("kia", "batumi", "automatic"), ("bmw", "batumi", "automatic"),
+                ("audi", "tbilisi", "automatic"), ("kia", "kutaisi", "manual"),
+            ])
+        ]
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def api(self, **params):
+        response = self.client.get(reverse("cars:api_car_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_filters(self):
+        self.assertEqual(self.api()["count"], 5)
+        self.assertEqual({car["id"] for car in self.api(car_make="kia", location="batumi")["results"]},
+                         {self.cars[1].pk})
+        self.assertEqual(self.api(transmission="manual")["count"], 2)
+        self.assertEqual(self.api(q="bmw")["results"][0]["id"], self.cars[2].pk)
+        response = self.client.get(reverse("cars:api_car_list"), {"car_make": "trabant"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("car_make", response.json()["errors"])
+
+    def test_dates_quote_and_exclude_booked_cars(self):
+        book_car(self.cars[0].pk, self.renter, date(2030, 6, 1), date(2030, 6, 5))
+        clear_catalog_cache()
+        payload = self.api(available_after="2030-06-02", available_before="2030-06-04")
+        totals = {car["id"]: car["quoted_total"] for car in payload["results"]}
+        self.assertNotIn(self.cars[0].pk, totals)
+        self.assertEqual(totals[self.cars[1].pk], "42.00")
+        self.assertNotIn("quoted_total", self.api()["results"][0])
+
+    def test_pagination(self):
+        first = self.api(page_size=2)
+        self.assertEqual((first["count"], first["page"], first["num_pages"], len(first["results"])), (5, 1, 3, 2))
+        last = self.api(page_size=2, page=3)
+        self.assertEqual(len(last["results"]), 1)
+        pages = [car["id"] for page in (1, 2, 3) for car in self.api(page_size=2, page=page)["results"]]
+        self.assertEqual(sorted(pages), sorted(car.pk for car in self.cars))
+        # A bad page size falls back to the default, an oversized one is capped
+        self.assertEqual(len(self.api(page_size="lots")["results"]), 5)
+        self.assertEqual(self.api(page_size=1000)["num_pages"], 1)
+        response = self.client.get(reverse("cars:api_car_list"), {"page_size": 2, "page": 9})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("page", response.json()["errors"])
+
+    def test_conditional_requests(self):
+        url = reverse("cars:api_car_list")
+        response = self.client.get(url, {"location": "batumi"})
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        # Answered from the catalog version alone
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {"location": "batumi"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            response = self.client.get(url, {"location": "batumi"}, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304)
+        # Another query is another representation
+        response = self.client.get(url, {"location": "tbilisi"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # A catalog write changes the ETag
+        bump_catalog_version()
+        response = self.client.get(url, {"location": "batumi"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_and_availability(self):
+        detail = self.client.get(reverse("cars:api_car_detail", args=[self.cars[2].pk]))
+        self.assertEqual((detail.json()["registration_number"], detail.json()["added_by_phone_number"]),
+                         ("API-2", self.owner.phone_number))
+        self.assertIn("ETag", detail)
+        self.assertEqual(self.client.get(reverse("cars:api_car_detail", args=[0])).status_code, 404)
+
+        book_car(self.cars[2].pk, self.renter, date(2030, 6, 1), date(2030, 6, 5))
+        # Out on another rental today; that doesn't decide other dates
+        Car.objects.filter(pk=self.cars[2].pk).update(is_available=False)
+        clear_catalog_cache()
+        url = reverse("cars:api_car_availability", args=[self.cars[2].pk])
+        payload = self.client.get(url, {"start": "2030-06-04", "end": "2030-06-06"}).json()
+        self.assertEqual(payload["booked"], [{"start_date": "2030-06-01", "end_date": "2030-06-05"}])
+        self.assertFalse(payload["available_for_dates"])
+        self.assertTrue(self.client.get(url, {"start": "2030-06-05", "end": "2030-06-06"}).json()["available_for_dates"])
+        # The same answer as the list's date filter
+        listed = self.api(available_after="2030-06-05", available_before="2030-06-06")["results"]
+        self.assertIn(self.cars[2].pk, [car["id"] for car in listed])
+        self.assertEqual(self.client.get(url, {"start": "2030-06-05", "end": "2030-06-05"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"start": "June", "end": "2030-06-05"}).status_code, 400)
+
+
+class StatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000007", "pass", email="fleet@example.com")
+        cls.renter = CustomUser.objects.create_user("555000008", "pass", email="driver@example.com")
+        cls.cars = [
+            Car.objects.create(car_make=make("kia"), car_model=f"Rio {i}", registration_number=f"ST-{i}",
+                               price_per_day=30, location=location, added_by=cls.owner)
+            for i, location in enumerate([city("tbilisi"), city("tbilisi"), city("batumi")])
+        ]
+
+    def snapshot(self):
+        # A rebuild drops rows that went back to zero, which mean the same as no row
+        return [
+            [row for row in model.objects.values() if any(row[field] for field in ("total_rentals", "car_count"))]
+            for model in (OwnerStats, LocationStats)
+        ] + [list(DailyStats.objects.values())]
+
+    def test_booking_and_return(self):
+        rental = book_car(self.cars[0].pk, self.renter, date(2025, 6, 1), date(2025, 6, 4))
+        book_car(self.cars[2].pk, self.renter, date(2025, 6, 1), date(2025, 6, 2))
+
+        owner = OwnerStats.objects.get(owner=self.owner)
+        self.assertEqual((owner.car_count, owner.active_rentals, owner.total_rentals), (3, 2, 2))
+        self.assertEqual((owner.rented_days, owner.revenue, owner.utilization), (4, Decimal("120.00"), 67))
+        tbilisi = LocationStats.objects.get(location=city("tbilisi"))
+        self.assertEqual((tbilisi.car_count, tbilisi.active_rentals, tbilisi.revenue), (2, 1, Decimal("90.00")))
+        self.assertEqual(DailyStats.objects.get().total_rentals, 2)
+
+        rental.mark_returned()
+        rental.mark_returned()
+        self.assertEqual(OwnerStats.objects.get(owner=self.owner).active_rentals, 1)
+        self.assertEqual(LocationStats.objects.get(location=city("tbilisi")).active_rentals, 0)
+
+    def test_rebuild_matches_incremental(self):
+        rental = book_car(self.cars[0].pk, self.renter, date(2025, 6, 1), date(2025, 6, 4))
+        book_car(self.cars[1].pk, self.renter, date(2025, 6, 1), date(2025, 6, 8))
+        rental.mark_returned()
+        self.cars[2].location = city("kutaisi")
+        self.cars[2].save()
+        incremental = self.snapshot()
+        rebuild_stats()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_moved_car_counts_rentals_where_they_started(self):
+        returned = book_car(self.cars[0].pk, self.renter, date(2025, 6, 1), date(2025, 6, 4))
+        book_car(self.cars[1].pk, self.renter, date(2025, 6, 1), date(2025, 6, 3))
+        swept = book_car(self.cars[2].pk, self.renter, date(2025, 6, 1), date(2025, 6, 2))
+        for car in self.cars:
+            car.location = city("kutaisi")
+            car.save()
+
+        CarRental.objects.get(pk=returned.pk).mark_returned()
+        sweep_overdue_rentals(cutoff=date(2025, 6, 2))
+        self.assertEqual(
+            dict(LocationStats.objects.values_list("location__slug", "active_rentals")),
+            {"tbilisi": 1, "batumi": 0, "kutaisi": 0},
+        )
+        self.assertEqual(CarRental.objects.get(pk=swept.pk).location, city("batumi"))
+
+        archive_rentals(cutoff=date(2025, 7, 1))
+        self.assertEqual(CarRentalArchive.objects.get(pk=returned.pk).location, city("tbilisi"))
+        incremental = self.snapshot()
+        rebuild_stats()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_price_change_keeps_booked_price(self):
+        rental = book_car(self.cars[0].pk, self.renter, date(2025, 6, 1), date(2025, 6, 2))
+        Car.objects.filter(pk=self.cars[0].pk).update(price_per_day=99)
+        rental = CarRental.objects.get(pk=rental.pk)
+        rental.mark_returned()
+        rental.refresh_from_db()
+        self.assertEqual(rental.total_price, Decimal("30.00"))
+        incremental = self.snapshot()
+        self.assertEqual(OwnerStats.objects.get(owner=self.owner).revenue, Decimal("30.00"))
+        rebuild_stats()
+        self.assertEqual(self.snapshot(), incremental)
+
+        # Moving the rental to other dates quotes it again, at today's price
+        rental.end_date = date(2025, 6, 3)
+        rental.save()
+        self.assertEqual(rental.total_price, Decimal("198.00"))
+
+    def test_deletes(self):
+        book_car(self.cars[0].pk, self.renter, date(2025, 6, 1), date(2025, 6, 4))
+        self.cars[0].delete()
+        owner = OwnerStats.objects.get(owner=self.owner)
+        self.assertEqual((owner.car_count, owner.active_rentals, owner.total_rentals), (2, 0, 0))
+        self.owner.delete()
+        self.assertFalse(OwnerStats.objects.exists())
+
+
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000018", "pass", email="archivist@example.com")
+        cls.renter = CustomUser.objects.create_user("555000019", "pass", email="regular@example.com")
+        cls.other = CustomUser.objects.create_user("555000020", "pass", email="stranger@example.com")
+        cls.car = Car.objects.create(car_make=make("volvo"), location=city("tbilisi"), car_model="V60",
+                                     registration_number="AR-1", price_per_day=50, added_by=cls.owner)
+        # Five back-to-back rentals returned in 2024, one returned this June, one still open
+        cls.old = []
+        for i in range(5):
+            rental = book_car(cls.car.pk, cls.renter, date(2024, 1, 1 + 3 * i), date(2024, 1, 3 + 3 * i))
+            rental.mark_returned()
+            cls.old.append(rental)
+        cls.recent = book_car(cls.car.pk, cls.renter, date(2025, 6, 1), date(2025, 6, 3))
+        cls.recent.mark_returned()
+        cls.open = book_car(cls.car.pk, cls.other, date(2024, 2, 1), date(2024, 2, 3))
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def stats(self):
+        return [list(model.objects.values()) for model in (OwnerStats, LocationStats, DailyStats)]
+
+    def test_cutoff(self):
+        self.assertEqual(archive_cutoff(12, today=date(2025, 6, 15)), date(2024, 6, 15))
+        self.assertEqual(archive_cutoff(1, today=date(2025, 3, 31)), date(2025, 2, 28))
+        self.assertEqual(archive_cutoff(3, today=date(2025, 1, 10)), date(2024, 10, 10))
+
+    def test_moves_old_returned_rentals_in_batches(self):
+        before = self.stats()
+        old_rows = {row["id"]: row for row in CarRental.objects.filter(pk__in=[r.pk for r in self.old]).values()}
+        # A rental returned with a bare UPDATE keeps its booked range
+        CarRental.objects.filter(pk=self.old[0].pk).update(returned=True)
+        BookedRange.objects.create(car=self.car, rental_id=self.old[0].pk,
+                                   start_date=self.old[0].start_date, end_date=self.old[0].end_date)
+
+        # Per batch: select, insert, delete booked ranges, delete rentals, savepoint pair; and a last empty select
+        with self.assertNumQueries(3 * 6 + 3):
+            self.assertEqual(archive_rentals(cutoff=date(2025, 1, 1), batch_size=2), 5)
+
+        self.assertEqual(set(CarRental.objects.values_list("pk", flat=True)), {self.recent.pk, self.open.pk})
+        archived = {row["id"]: row for row in CarRentalArchive.objects.values()}
+        self.assertEqual(set(archived), set(old_rows))
+        for rental_id, row in old_rows.items():
+            for field in ("car_id", "user_id", "location_id", "start_date", "end_date", "total_price", "rented_on"):
+                self.assertEqual(archived[rental_id][field], row[field])
+        self.assertEqual(list(BookedRange.objects.values_list("rental", flat=True)), [self.open.pk])
+        # The plain DELETE leaves the stats alone, and a rebuild reads the archive
+        self.assertEqual(self.stats(), before)
+        rebuild_stats()
+        self.assertEqual(self.stats(), before)
+
+        self.assertEqual(archive_rentals(cutoff=date(2025, 1, 1)), 0)
+
+    def test_deleting_a_car_uncounts_its_archived_rentals(self):
+        archive_rentals(cutoff=date(2025, 1, 1))
+        self.car.delete()
+
+        self.assertFalse(CarRentalArchive.objects.exists())
+        owner = OwnerStats.objects.get(owner=self.owner)
+        self.assertEqual((owner.car_count, owner.total_rentals, owner.rented_days, owner.revenue, owner.active_rentals),
+                         (0, 0, 0, 0, 0))
+        self.assertFalse(LocationStats.objects.exclude(total_rentals=0).exists())
+        self.assertFalse(DailyStats.objects.exclude(total_rentals=0).exists())
+        # What a rebuild finds: nothing left to count
+        rebuild_stats()
+        self.assertEqual(self.stats(), [[], [], []])
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("archive_rentals", "--cutoff", "2025-01-01", stdout=out)
+        self.assertIn("Archived 5 rentals that ended before 2025-01-01", out.getvalue())
+
+    def test_archive_page(self):
+        archive_rentals(cutoff=date(2025, 1, 1))
+        self.client.force_login(self.renter)
+
+        current = self.client.get(reverse("cars:my_rentals"))
+        self.assertEqual([rental.pk for rental in current.context["rentals"]], [self.recent.pk])
+        self.assertContains(current, reverse("cars:my_rentals_archive"))
+
+        response = self.client.get(reverse("cars:my_rentals_archive"))
+        self.assertTrue(response.context["archived"])
+        self.assertEqual([rental.pk for rental in response.context["rentals"]], [r.pk for r in reversed(self.old)])
+        self.assertContains(response, "Returned", count=5)
+        self.assertNotContains(response, "Return Car")
+
+        self.client.force_login(self.other)
+        self.assertContains(self.client.get(reverse("cars:my_rentals_archive")), "No archived rentals.")
+
+
+class SweeperTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000009", "pass", email="lot@example.com")
+        cls.renter = CustomUser.objects.create_user("555000010", "pass", email="late@example.com")
+        cls.cars = [
+            Car.objects.create(car_make=make("ford"), car_model=f"Focus {i}", registration_number=f"SW-{i}",
+                               price_per_day=20, location=city("gori"), added_by=cls.owner)
+            for i in range(6)
+        ]
+        # Five rentals ended by June 10, one is still running
+        for i, car in enumerate(cls.cars):
+            book_car(car.pk, cls.renter, date(2025, 6, 1), date(2025, 6, 6 + i))
+
+    def test_returns_overdue_rentals_in_batches(self):
+        # Same statements per batch however many rentals it holds: start the run,
+        # 8 statements plus a savepoint pair per batch, then mark picked-up cars, reload and finish it
+        with self.assertNumQueries(1 + 3 * 10 + 3):
+            run = sweep_overdue_rentals(cutoff=date(2025, 6, 10), batch_size=2)
+
+        self.assertEqual((run.batches, run.rentals_returned, run.cars_freed), (3, 5, 5))
+        self.assertIsNotNone(run.duration)
+        open_rental = CarRental.objects.get(returned=False)
+        self.assertEqual(open_rental.end_date, date(2025, 6, 11))
+        self.assertEqual(list(Car.objects.filter(is_available=False)), [open_rental.car])
+        self.assertEqual(list(BookedRange.objects.values_list("rental", flat=True)), [open_rental.pk])
+        self.assertEqual(OwnerStats.objects.get(owner=self.owner).active_rentals, 1)
+        self.assertEqual(LocationStats.objects.get(location=city("gori")).active_rentals, 1)
+
+    def test_nothing_due(self):
+        run = sweep_overdue_rentals(cutoff=date(2025, 6, 1))
+        self.assertEqual((run.batches, run.rentals_returned), (1, 0))
+        self.assertEqual(CarRental.objects.filter(returned=False).count(), 6)
+
+    def test_takes_cars_of_started_bookings_off_the_market(self):
+        ahead = book_car(self.cars[0].pk, self.renter, date(2030, 6, 1), date(2030, 6, 5))
+        sweep_overdue_rentals(cutoff=date(2025, 6, 30))
+        self.assertEqual(list(Car.objects.filter(is_available=False)), [])
+        self.assertEqual(list(CarRental.objects.filter(returned=False)), [ahead])
+
+        sweep_overdue_rentals(cutoff=date(2030, 6, 1))
+        self.assertEqual(list(Car.objects.filter(is_available=False)), [self.cars[0]])
+
+
+@override_settings(QUERY_BUDGET_ACTION="raise")
+class MonitoringTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000011", "pass", email="metrics@example.com")
+        cls.renter = CustomUser.objects.create_user("555000012", "pass", email="watched@example.com")
+        cls.car = Car.objects.create(car_make=make("bmw"), location=city("tbilisi"), car_model="X5",
+                                     registration_number="MON-1", price_per_day=80, added_by=cls.owner)
+
+    def setUp(self):
+        clear_catalog_cache()
+        self.client.force_login(self.renter)
+
+    def test_pages_stay_within_budget(self):
+        self.client.get(reverse("cars:car_list"))
+        self.client.get(reverse("cars:car_detail", args=[self.car.pk]))
+        self.client.get(reverse("cars:api_car_list"))
+        self.client.post(reverse("cars:car_rent", args=[self.car.pk]),
+                         {"start_date": "2030-01-01", "end_date": "2030-01-04"})
+        self.client.get(reverse("cars:my_rentals"))
+        rental = CarRental.objects.get()
+        self.client.post(reverse("cars:return_car", args=[rental.pk]))
+
+    @override_settings(QUERY_BUDGETS={"cars:car_detail": 0})
+    def test_over_budget_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "cars:car_detail ran 3 queries"):
+            self.client.get(reverse("cars:car_detail", args=[self.car.pk]))
+
+    def test_concurrent_requests_count_their_own_queries(self):
+        from django.db import connection
+        from car_rental.monitoring import RequestMetrics, _current, count_query, install_query_counter
+
+        install_query_counter()
+        install_query_counter()
+        self.assertEqual(connection.execute_wrappers.count(count_query), 1)
+
+        # Two async requests taking turns on the same sync-thread connection
+        mine, theirs = RequestMetrics(), RequestMetrics()
+        for metrics in (mine, theirs, mine):
+            token = _current.set(metrics)
+            try:
+                CarType.objects.count()
+            finally:
+                _current.reset(token)
+        self.assertEqual((mine.queries, theirs.queries), (2, 1))
+
+        # Another wrapper ending after the counter went in leaves the counter in place
+        with connection.execute_wrapper(lambda execute, *args: execute(*args)):
+            connection.execute_wrappers.remove(count_query)
+            install_query_counter()
+        self.assertEqual(connection.execute_wrappers, [count_query])
+
+    def test_filtered_list_stays_within_budget(self):
+        PricingRule.objects.create(name="June", kind="season", starts_on=date(2030, 6, 1),
+                                   ends_on=date(2030, 6, 30), multiplier="1.2")
+        dates = {"available_after": "2030-06-06", "available_before": "2030-06-09"}
+        for name in ("cars:car_list", "cars:car_list_async", "cars:my_cars", "cars:api_car_list"):
+            clear_catalog_cache()
+            self.assertEqual(self.client.get(reverse(name), dates).status_code, 200)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("cars:car_list"))
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn("# TYPE car_rental_request_duration_seconds histogram", body)
+        self.assertIn('car_rental_responses_total{view="cars:car_list",status="200"}', body)
+        self.assertRegex(body, r'car_rental_template_render_seconds_sum\{view="cars:car_list"\} 0\.0*[1-9]')
+        self.assertRegex(body, r'car_rental_db_queries_bucket\{view="cars:car_list",le="5"\} [1-9]')
+
+    def test_metrics_limited_to_allowed_ips(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.9")
+        self.assertEqual(response.status_code, 403)
+
+
+
+class CarCardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = CustomUser.objects.create_user("555000014", "pass", email="cards@example.com")
+        car_type = CarType.objects.create(name="Hatchback")
+        for i in range(3):
+            Car.objects.create(car_type=car_type, car_make=make("honda"), location=city("tbilisi"),
+                               car_model=f"Jazz {i}", registration_number=f"CARD-{i}", price_per_day=25,
+                               added_by=owner)
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def cards_rendered(self, response):
+        return [template.name for template in response.templates].count("car_card.html")
+
+    def test_pages_reuse_cached_cards(self):
+        self.assertEqual(self.cards_rendered(self.client.get(reverse("cars:car_list"))), 3)
+        # A write elsewhere drops the cached page, but not the cards
+        bump_catalog_version()
+        response = self.client.get(reverse("cars:car_list"))
+        self.assertEqual(self.cards_rendered(response), 0)
+        self.assertContains(response, "Jazz 2")
+
+    def test_changed_car_is_rendered_again(self):
+        self.client.get(reverse("cars:car_list"))
+        car = Car.objects.get(registration_number="CARD-1")
+        car.price_per_day = 99
+        car.save()
+        bump_catalog_version()
+        response = self.client.get(reverse("cars:car_list"))
+        self.assertEqual(self.cards_rendered(response), 1)
+        self.assertContains(response, "Price per day: $99")
+
+    def test_renamed_type_is_rendered_again(self):
+        self.client.get(reverse("cars:car_list"))
+        CarType.objects.filter(name="Hatchback").update(name="Compact")
+        bump_catalog_version()
+        response = self.client.get(reverse("cars:car_list"))
+        self.assertEqual(self.cards_rendered(response), 3)
+        self.assertContains(response, "Type: Compact", count=3)
+
+    def test_quotes_are_not_shared(self):
+        self.client.get(reverse("cars:car_list"))
+        response = self.client.get(reverse("cars:car_list"),
+                                   {"available_after": "2030-01-01", "available_before": "2030-01-03"})
+        self.assertEqual(self.cards_rendered(response), 3)
+        self.assertContains(response, "Total for your dates")
+
+class StaticFilesTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.root, STORAGES={
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+            "staticfiles": {"BACKEND": "car_rental.staticfiles.CompressedManifestStaticFilesStorage"},
+        }))
+        call_command("collectstatic", interactive=False, verbosity=0)
+        cls.hashed = staticfiles_storage.stored_name("style.css")
+        with open(f"{cls.root}/style.css", "rb") as f:
+            cls.source = f.read()
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def test_pages_link_hashed_names(self):
+        self.assertRegex(self.hashed, r"^style\.[0-9a-f]{12}\.css$")
+        self.assertContains(self.client.get(reverse("cars:car_list")), f"/static/{self.hashed}")
+
+    def test_hashed_files_are_immutable_and_compressed(self):
+        response = self.client.get(f"/static/{self.hashed}", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.source)
+
+    def test_unhashed_names_revalidate(self):
+        response = self.client.get("/static/style.css")
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(b"".join(response.streaming_content), self.source)
+        response = self.client.get("/static/style.css", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_files_fall_through(self):
+        self.assertEqual(self.client.get("/static/missing.css").status_code, 404)
+
+
+class MediaTests(TestCase):
+    photo = b"\xff\xd8 not really a jpeg, but bytes are bytes \xff\xd9"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.root))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000013", "pass", email="photos@example.com")
+
+    def add_car(self, registration_number, upload_name):
+        return Car.objects.create(
+            car_make=make("toyota"), location=city("tbilisi"), car_model="Yaris", price_per_day=30,
+            registration_number=registration_number, added_by=self.owner,
+            image=SimpleUploadedFile(upload_name, self.photo),
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.add_car("MED-1", "front.JPG")
+        second = self.add_car("MED-2", "IMG_0001.jpg")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^car_images/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(len(os.listdir(os.path.dirname(first.image.path))), 1)
+
+    def test_photos_are_immutable(self):
+        url = self.add_car("MED-3", "side.jpg").image.url
+        response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(b"".join(response.streaming_content), self.photo)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_range_requests(self):
+        url = self.add_car("MED-4", "rear.jpg").image.url
+        size = len(self.photo)
+        response = self.client.get(url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 2-5/{size}")
+        self.assertEqual(b"".join(response.streaming_content), self.photo[2:6])
+        response = self.client.get(url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(response.streaming_content), self.photo[-4:])
+        response = self.client.get(url, HTTP_RANGE=f"bytes={size}-")
+        self.assertEqual(response.status_code, 416)
+        # A stale If-Range gets the whole, current file
+        response = self.client.get(url, HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_stays_inside_media_root(self):
+        self.assertEqual(self.client.get("/media/../db.sqlite3").status_code, 404)
+        self.assertEqual(self.client.get("/media/car_images/missing.jpg").status_code, 404)
+
+    def test_gc_removes_unreferenced_files(self):
+        referenced = self.add_car("MED-5", "kept.jpg").image.path
+        car = self.add_car("MED-6", "old.jpg")
+        car.image = SimpleUploadedFile("replaced.jpg", b"another photo")
+        car.save()
+        orphan = os.path.join(self.root, "car_images", "unreferenced.jpg")
+        shutil.copy(referenced, orphan)
+        fresh = os.path.join(self.root, "car_images", "uploading.jpg")
+        shutil.copy(referenced, fresh)
+        for path in (referenced, orphan):
+            os.utime(path, (0, 0))
+
+        removed, size = collect_garbage(min_age=60)
+        self.assertEqual((removed, size), (["car_images/unreferenced.jpg"], len(self.photo)))
+        self.assertTrue(os.path.exists(referenced))
+        # Too new to tell from an upload whose car hasn't committed yet
+        self.assertTrue(os.path.exists(fresh))
+
+
+class RenditionTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.root))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user("555000027", "pass", email="renditions@example.com")
+
+    def setUp(self):
+        clear_catalog_cache()
+
+    def photo(self, width, height, color="red"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), color).save(buffer, "JPEG")
+        return buffer.getvalue()
+
+    def add_car(self, registration_number, photo=None):
+        return Car.objects.create(
+            car_make=make("toyota"), location=city("tbilisi"), car_model="Corolla", price_per_day=30,
+            registration_number=registration_number, added_by=self.owner,
+            image=SimpleUploadedFile("photo.jpg", photo) if photo else None,
+        )
+
+    def rendition_files(self):
+        directory = os.path.join(self.root, RENDITION_DIR)
+        return set(os.listdir(directory)) if os.path.isdir(directory) else set()
+
+    def test_widths_up_to_the_original(self):
+        car = self.add_car("REN-1", self.photo(800, 400))
+        renditions = generate_car_renditions(car.pk)
+        car.refresh_from_db()
+        self.assertEqual(car.image_renditions, renditions)
+        self.assertEqual(renditions["image"]["source"], car.image.name)
+        # 1024 is wider than the photo
+        widths = renditions["image"]["widths"]
+        self.assertEqual(list(widths), ["320", "640"])
+        for width, name in widths.items():
+            self.assertRegex(name, rf"^{RENDITION_DIR}/[0-9a-f]{{20}}-{width}w\.webp$")
+            with Image.open(os.path.join(self.root, name)) as rendition:
+                self.assertEqual((rendition.format, rendition.size), ("WEBP", (int(width), int(width) // 2)))
+
+        # A photo narrower than every width still gets the smallest one
+        small = self.add_car("REN-2", self.photo(200, 100, "blue"))
+        self.assertEqual(list(generate_car_renditions(small.pk)["image"]["widths"]), ["320"])
+
+    def test_same_photo_shares_renditions(self):
+        photo = self.photo(700, 350)
+        before = self.rendition_files()
+        first = generate_car_renditions(self.add_car("REN-3", photo).pk)
+        files = self.rendition_files()
+        second = generate_car_renditions(self.add_car("REN-4", photo).pk)
+        self.assertEqual(first, second)
+        self.assertEqual(self.rendition_files(), files)
+        self.assertEqual(len(files - before), 2)
+
+        # Different bytes, different names
+        other = generate_car_renditions(self.add_car("REN-5", self.photo(700, 350, "green")).pk)
+        self.assertNotEqual(other["image"]["widths"]["320"], first["image"]["widths"]["320"])
+        self.assertEqual(len(self.rendition_files() - files), 2)
+
+    def test_responsive_image(self):
+        template = Template('{% load car_images %}{% responsive_image car "image" sizes="300px" alt="Corolla" %}')
+        car = self.add_car("REN-6", self.photo(800, 400))
+        # Before the task has run: the original upload
+        html = template.render(Context({"car": car}))
+        self.assertEqual(html, f'<img src="{car.image.url}" alt="Corolla" loading="lazy">')
+
+        generate_car_renditions(car.pk)
+        car.refresh_from_db()
+        widths = car.image_renditions["image"]["widths"]
+        url = car.image.storage.url
+        html = template.render(Context({"car": car}))
+        self.assertEqual(html, (
+            f'<img src="{url(widths["320"])}" srcset="{url(widths["320"])} 320w, {url(widths["640"])} 640w" '
+            f'sizes="300px" alt="Corolla" loading="lazy">'
+        ))
+
+        # A replaced photo falls back to itself until its renditions are rebuilt
+        car.image = SimpleUploadedFile("new.jpg", self.photo(800, 400, "white"))
+        car.save()
+        html = template.render(Context({"car": car}))
+        self.assertEqual(html, f'<img src="{car.image.url}" alt="Corolla" loading="lazy">')
+        self.assertEqual(template.render(Context({"car": self.add_car("REN-7")})), "")
+
+    def test_generate_renditions_command(self):
+        done = self.add_car("REN-8", self.photo(400, 200))
+        generate_car_renditions(done.pk)
+        pending = self.add_car("REN-9", self.photo(400, 200, "black"))
+        self.add_car("REN-10")
+
+        out = io.StringIO()
+        call_command("generate_renditions", "--missing", stdout=out)
+        self.assertIn("Built renditions for 1 cars.", out.getvalue())
+        pending.refresh_from_db()
+        self.assertEqual(list(pending.image_renditions["image"]["widths"]), ["320"])
+
+        out = io.StringIO()
+        call_command("generate_renditions", stdout=out)
+        self.assertIn("Built renditions for 2 cars.", out.getvalue())
@@ -1,6 +1,9 @@
 from django.urls import path
+from cars.async_views import AsyncCarListView, AsyncCarDetailView, AsyncMyRentalsView
+from cars.api import CarListApiView, CarDetailApiView, CarAvailabilityApiView
 from cars.views import (CarListView, CarDetailView, CarCreateView, CarUpdateView,
-                        CarDeleteView, CarRentView, MyRentalsView, ReturnCarView, MyCarsView)
+                        CarDeleteView, CarRentView, MyRentalsView, MyRentalsArchiveView, ReturnCarView,
+                        MyCarsView)
 
 app_name = "cars"
 
@@ -13,5 +16,14 @@ urlpatterns = [
     path("car/<int:pk>/delete/", CarDeleteView.as_view(), name="car_delete"),
     path("car/<int:pk>/rent/", CarRentView.as_view(), name="car_rent"),
     path("my-rentals/", MyRentalsView.as_view(), name="my_rentals"),
+    path("my-rentals/archive/", MyRentalsArchiveView.as_view(), name="my_rentals_archive"),
     path("rental/<int:pk>/return/", ReturnCarView.as_view(), name="return_car"),
+    # Async mirrors of the read paths, for ASGI deployments
+    path("async/", AsyncCarListView.as_view(), name="car_list_async"),
+    path("async/car/<int:pk>/", AsyncCarDetailView.as_view(), name="car_detail_async"),
+    path("async/my-rentals/", AsyncMyRentalsView.as_view(), name="my_rentals_async"),
+    # JSON API
+    path("api/cars/", CarListApiView.as_view(), name="api_car_list"),
+    path("api/cars/<int:pk>/", CarDetailApiView.as_view(), name="api_car_detail"),
+    path("api/cars/<int:pk>/availability/", CarAvailabilityApiView.as_view(), name="api_car_availability"),
 ]
\ No newline at end of file
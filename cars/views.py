@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy, reverse
+from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.views import View
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, DeleteView
@@ -9,8 +13,12 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 
 from datetime import datetime
 
+from .cache import catalog_cache, listing_cache_key
 from .forms import CarForm
-from .models import Car, CarType, CarRental
+from .images import IMAGE_FIELDS, schedule_car_renditions
+from .pagination import CursorPaginationMixin, CursorPaginator
+from .models import Car, CarType, CarRental, CarRentalArchive, OwnerStats
+from .services import book_car, BookingError
 
 from django_filters.views import FilterView
 from .filters import CarFilter
@@ -21,14 +29,72 @@ from django.core.paginator import Paginator
 
  # CAR VIEWS
 
-class CarListView(FilterView):
+class CarListingMixin:
+    """
+    Home page catalog logic shared by the sync and async list views.
+
+    The results grid and pagination are rendered from ``car_results.html``
+    and cached under the current catalog version, keyed on the filter and
+    page parameters of the querystring only, so a hit skips the filter,
+    COUNT and page queries. The fragment's page links carry those same
+    parameters and nothing else. Only that fragment is cached; the
+    user-specific parts of ``base.html`` render on every request.
+    """
 
     model = Car
     template_name = "car_list.html"
+    results_template_name = "car_results.html"
     context_object_name = "cars"
     filterset_class = CarFilter
     paginate_by = 6
-    select_related = True
+
+    def get_queryset(self):
+        return Car.objects.with_listing_related()
+
+    def get_pagination_mode(self):
+        # Search and radius results are ordered by rank or distance, which a date cursor can't follow
+        if self.request.GET.get("q", "").strip() or self.request.GET.get("near", "").strip():
+            return "offset"
+        return super().get_pagination_mode()
+
+    def listing_params(self):
+        """The querystring keys that select a results fragment."""
+        return self.filterset_class.query_params() | {self.page_kwarg, CursorPaginator.cursor_query_param}
+
+    def get_cursor_link_params(self):
+        # Links baked into a cached fragment must not carry a visitor's other params
+        return self.listing_params()
+
+    def get_cached_results(self):
+        self.results_cache_key = listing_cache_key("car_list", self.request.GET, self.listing_params())
+        results_html = catalog_cache().get(self.results_cache_key)
+        return mark_safe(results_html) if results_html is not None else None
+
+    def render_results(self, context):
+        results_html = render_to_string(self.results_template_name, context)
+        catalog_cache().set(self.results_cache_key, results_html, settings.CATALOG_PAGE_CACHE_TIMEOUT)
+        return results_html
+
+
+class CarListView(CarListingMixin, CursorPaginationMixin, FilterView):
+
+    def get(self, request, *args, **kwargs):
+        results_html = self.get_cached_results()
+        if results_html is None:
+            return super().get(request, *args, **kwargs)
+
+        self.filterset = self.get_filterset(self.get_filterset_class())
+        self.object_list = self.model.objects.none()
+        return self.render_to_response({
+            "view": self,
+            "filter": self.filterset,
+            "results_html": results_html,
+        })
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["results_html"] = self.render_results(context)
+        return context
 
 
     # ამის ჩართვით მომხმარებლებს მხოლოდ იმ მანქანებს უჩვენებს, რომლებიც გაქირავებულები არ არიან
@@ -37,20 +103,21 @@ class CarListView(FilterView):
     #     queryset = super().get_queryset()
     #     return Car.objects.filter(is_available=True).select_related("car_type", "added_by")
 
-class MyCarsView(FilterView):
+class MyCarsView(CursorPaginationMixin, FilterView):
 
     model = Car
     template_name = "my_cars.html"
     context_object_name = "cars"
     filterset_class = CarFilter
-    select_related = True
+    paginate_by = 6
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        return Car.objects.owned_by(self.request.user).with_listing_related()
 
-        return queryset.filter(
-            added_by=self.request.user
-        ).select_related("car_type", "added_by")
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["stats"] = OwnerStats.objects.filter(owner=self.request.user).first()
+        return context
 
 
 class CarDetailView(DetailView):
@@ -59,6 +126,9 @@ class CarDetailView(DetailView):
     template_name = "car_detail.html"
     context_object_name = "car"
 
+    def get_queryset(self):
+        return Car.objects.with_detail_related()
+
 
 class CarCreateView(LoginRequiredMixin, CreateView):
 
@@ -71,7 +141,9 @@ class CarCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
 
         form.instance.added_by = self.request.user
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        schedule_car_renditions(self.object)
+        return response
 
 
 class CarUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
@@ -86,6 +158,12 @@ class CarUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         car = self.get_object()
         return self.request.user == car.added_by
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if any(field in form.changed_data for field in IMAGE_FIELDS):
+            schedule_car_renditions(self.object)
+        return response
+
     def get_success_url(self):
         return reverse('cars:car_detail', kwargs={'pk': self.object.pk})
 
@@ -120,9 +198,6 @@ class CarRentView(LoginRequiredMixin, View):
             messages.error(request, "You can't Rent your own car")
             return redirect("cars:car_detail", pk=car.pk)
 
-        if not car.is_available:
-            return redirect("cars:car_detail", pk=car.pk)
-
         try:
             start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
             end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
@@ -130,34 +205,39 @@ class CarRentView(LoginRequiredMixin, View):
 
             return redirect("cars:car_detail", pk=car.pk)
 
-        if end_date <= start_date:
-
+        if start_date < timezone.localdate():
+            messages.error(request, "The pick-up date can't be in the past.")
             return redirect("cars:car_detail", pk=car.pk)
 
-        if not car.is_available:
+        # Overlaps are checked under a lock on the car row
+        try:
+            book_car(car.pk, request.user, start_date, end_date)
+        except BookingError as exc:
+            messages.error(request, str(exc))
             return redirect("cars:car_detail", pk=car.pk)
 
-        # Create rental record
-        CarRental.objects.create(
-            car=car,
-            user=request.user,
-            start_date=start_date,
-            end_date=end_date,
-        )
-        car.is_available = False
-        car.save()
-
         return redirect("cars:my_rentals")
 
 
 class MyRentalsView(LoginRequiredMixin, ListView):
-    """Show all rentals made by the logged-in user."""
+    """Show the logged-in user's current and recent rentals, newest first."""
     model = CarRental
     template_name = "my_rentals.html"
     context_object_name = "rentals"
+    paginate_by = 20
+    archived = False
 
     def get_queryset(self):
-        return CarRental.objects.filter(user=self.request.user).select_related("car")
+        return self.model.objects.for_user(self.request.user).with_listing_related()
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(archived=self.archived, **kwargs)
+
+
+class MyRentalsArchiveView(MyRentalsView):
+    """The logged-in user's archived rentals (see cars.archive)."""
+    model = CarRentalArchive
+    archived = True
 
 
 class ReturnCarView(LoginRequiredMixin, View):
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from tasks.models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+    actions = ('retry_now',)
+
+    @admin.action(description="Queue again now")
+    def retry_now(self, request, queryset):
+        queryset.update(status=Task.QUEUED, run_at=timezone.now(), attempts=0, locked_until=None)
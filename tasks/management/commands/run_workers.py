@@ -0,0 +1,56 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.worker import run_worker
+
+
+def _worker_process(stop_event, poll_interval, batch_size, once):
+    # The parent handles Ctrl-C and tells every worker through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(stop_event, poll_interval, batch_size, once)
+
+
+class Command(BaseCommand):
+    help = "Run background task workers in a pool of processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=settings.TASKS_WORKER_PROCESSES)
+        parser.add_argument("--poll-interval", type=float, default=settings.TASKS_POLL_INTERVAL)
+        parser.add_argument("--batch-size", type=int, default=10, help="Tasks claimed per poll.")
+        parser.add_argument("--once", action="store_true", help="Exit once no task is due.")
+
+    def handle(self, *args, **options):
+        processes = max(options["processes"], 1)
+        worker_args = (options["poll_interval"], options["batch_size"], options["once"])
+
+        if processes == 1:
+            succeeded = run_worker(None, *worker_args)
+            self.stdout.write(self.style.SUCCESS(f"Worker finished, {succeeded} tasks done."))
+            return
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        stop_event = context.Event()
+        workers = [
+            context.Process(target=_worker_process, args=(stop_event, *worker_args), name=f"task-worker-{i}")
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        self.stdout.write(f"Started {processes} workers.")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers...")
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
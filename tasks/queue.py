@@ -0,0 +1,175 @@
+"""
+A small database-backed task queue.
+
+Decorate a module-level function with ``@task`` and call ``.delay()`` to
+queue it instead of running it inline::
+
+    @task(max_attempts=5)
+    def send_receipt(rental_id):
+        ...
+
+    send_receipt.delay(rental.pk)
+
+The queued row is written in the caller's transaction, so a rolled-back
+request never leaves a task behind and a worker never sees one before the
+data it needs has committed. ``manage.py run_workers`` runs the queue.
+Arguments must be JSON serializable; pass ids, not model instances.
+
+Failed calls are retried with exponential backoff until ``max_attempts``.
+A claimed task that is not finished within ``TASKS_VISIBILITY_TIMEOUT``
+seconds is assumed lost with its worker and becomes claimable again, so
+tasks must be safe to run more than once. That counts as an attempt: a
+task that times out on its last one is marked failed.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    """A function that can be queued with ``delay()`` and still be called directly."""
+
+    def __init__(self, func, max_attempts, visibility_timeout):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<task {self.name}>"
+
+    def delay(self, *args, **kwargs):
+        """Queue a call; returns the Task row, or ``None`` in eager mode."""
+        return self.schedule(args, kwargs)
+
+    def schedule(self, args=(), kwargs=None, countdown=0):
+        """Queue a call to run no earlier than ``countdown`` seconds from now."""
+        if settings.TASKS_EAGER:
+            self.func(*args, **(kwargs or {}))
+            return None
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs or {},
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+
+def task(func=None, *, max_attempts=3, visibility_timeout=None):
+    """Turn a module-level function into a queueable task."""
+    def wrap(func):
+        return TaskFunction(func, max_attempts, visibility_timeout)
+
+    return wrap(func) if func is not None else wrap
+
+
+def claimable(now=None):
+    now = now or timezone.now()
+    return Task.objects.filter(
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now, attempts__lt=F("max_attempts"))
+    )
+
+
+def fail_expired(now=None):
+    """
+    Mark expired tasks that are out of attempts FAILED. Returns how many.
+
+    A task that hangs or takes its worker down with it never gets to record
+    a failure itself, and would otherwise be claimed again forever.
+    """
+    failed = Task.objects.filter(
+        status=Task.RUNNING, locked_until__lt=now or timezone.now(), attempts__gte=F("max_attempts"),
+    ).update(
+        status=Task.FAILED,
+        locked_until=None,
+        last_error="Visibility timeout exceeded on the last attempt",
+    )
+    if failed:
+        logger.error("%s task(s) exceeded their visibility timeout on their last attempt", failed)
+    return failed
+
+
+def claim(worker_id, limit=10):
+    """
+    Claim up to ``limit`` due tasks for ``worker_id``.
+
+    Each claim is a conditional UPDATE that only succeeds while the task is
+    still claimable, so workers racing for the same rows never both win and
+    no row locks are needed (SQLite has none).
+    """
+    now = timezone.now()
+    fail_expired(now)
+    claimed = []
+    candidates = claimable(now).order_by("run_at", "id").values_list("pk", flat=True)[:limit]
+    for task_id in list(candidates):
+        won = claimable(now).filter(pk=task_id).update(
+            status=Task.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT),
+            attempts=F("attempts") + 1,
+        )
+        if won:
+            claimed.append(Task.objects.get(pk=task_id))
+    return claimed
+
+
+def resolve(name):
+    func = import_string(name)
+    if not isinstance(func, TaskFunction):
+        raise TypeError(f"{name} is not a @task function")
+    return func
+
+
+def retry_delay(attempts):
+    """Seconds before retry number ``attempts``: doubling from TASKS_RETRY_BACKOFF, with jitter."""
+    delay = min(settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1), settings.TASKS_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def execute(task_row):
+    """Run one claimed task, then delete it or schedule its retry. Returns True on success."""
+    try:
+        func = resolve(task_row.name)
+        if func.visibility_timeout:
+            Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by).update(
+                locked_until=timezone.now() + timedelta(seconds=func.visibility_timeout),
+            )
+        func.func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        close_old_connections()
+        if task_row.attempts < task_row.max_attempts:
+            logger.warning("Task %s failed (attempt %s), retrying", task_row, task_row.attempts)
+            changes = {
+                "status": Task.QUEUED,
+                "run_at": timezone.now() + timedelta(seconds=retry_delay(task_row.attempts)),
+            }
+        else:
+            logger.error("Task %s failed for good after %s attempts", task_row, task_row.attempts)
+            changes = {"status": Task.FAILED}
+        # Only the worker that still holds the claim may record the outcome
+        Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by).update(
+            locked_until=None, last_error=error, **changes,
+        )
+        return False
+
+    close_old_connections()
+    Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by).delete()
+    return True
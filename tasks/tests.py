@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import claim, task
+from tasks.worker import run_worker
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_worker_runs(self):
+        record.delay("a")
+        record.delay(value="b")
+        self.assertEqual(calls, [])
+        self.assertEqual(run_worker(once=True), 2)
+        self.assertEqual(calls, ["a", "b"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_direct_call_runs_inline(self):
+        record("now")
+        self.assertEqual(calls, ["now"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_not_due_yet(self):
+        record.schedule(["later"], countdown=60)
+        self.assertEqual(run_worker(once=True), 0)
+        self.assertEqual(calls, [])
+
+    def test_retries_with_backoff_then_fails(self):
+        explode.delay()
+        run_worker(once=True)
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts), (Task.QUEUED, 1))
+        self.assertGreater(row.run_at, timezone.now())
+        self.assertIn("RuntimeError: boom", row.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        run_worker(once=True)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 2))
+
+    def test_claims_are_exclusive_until_visibility_timeout(self):
+        record.delay("x")
+        self.assertEqual(len(claim("worker-1")), 1)
+        self.assertEqual(claim("worker-2"), [])
+
+        # worker-1 died: once its claim expires the task is claimable again
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(run_worker(once=True), 1)
+        self.assertEqual(calls, ["x"])
+
+    def test_task_that_keeps_timing_out_fails(self):
+        explode.delay()
+        for _ in range(2):
+            self.assertEqual(len(claim("worker-1")), 1)
+            # The worker hung or was killed mid-task
+            Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(claim("worker-2"), [])
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts, row.locked_until), (Task.FAILED, 2, None))
+        self.assertIn("Visibility timeout exceeded", row.last_error)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        self.assertIsNone(record.delay("eager"))
+        self.assertEqual(calls, ["eager"])
@@ -0,0 +1,43 @@
+import logging
+import os
+import socket
+import threading
+
+from django.db import close_old_connections, connections
+
+from .queue import claim, execute
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(stop_event=None, poll_interval=1.0, batch_size=10, once=False):
+    """
+    Claim and run tasks until ``stop_event`` is set.
+
+    With ``once`` the worker returns as soon as the queue has nothing due.
+    Returns the number of tasks that succeeded.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = worker_name()
+    succeeded = 0
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            claimed = claim(worker_id, batch_size)
+            if not claimed:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            for task_row in claimed:
+                succeeded += execute(task_row)
+                if stop_event.is_set():
+                    # The rest of the batch is reclaimed once its claim expires
+                    break
+    finally:
+        connections.close_all()
+    return succeeded
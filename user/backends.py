@@ -1,12 +1,81 @@
-# from django.contrib.auth.backends import ModelBackend
-# from .models import CustomUser
-#
-# class PhoneNumberBackend(ModelBackend):
-#     def authenticate(self, request, phone_number=None, password=None, **kwargs):
-#         try:
-#             user = CustomUser.objects.get(phone_number=phone_number)
-#         except CustomUser.DoesNotExist:
-#             return None
-#         if user.check_password(password):
-#             return user
-#         return None
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from . import cache
+from .phone import normalize_phone_number
+from .throttle import LoginThrottle
+
+UserModel = get_user_model()
+
+
+class PhoneNumberBackend(ModelBackend):
+    """
+    Log in with a phone number in any common format.
+
+    The number is normalized to E.164 and looked up through the unique index;
+    input that doesn't parse is looked up as typed, for legacy accounts the
+    migration couldn't normalize. Throttled attempts are refused with
+    PermissionDenied before the lookup, and an unknown number is refused
+    without hashing, so credential stuffing costs a cache round trip and one
+    indexed query per attempt. ModelBackend hashes a dummy password for
+    unknown users to hide which numbers exist; signup reveals that anyway,
+    and the throttle bounds how fast anyone can probe.
+
+    When refusing a throttled attempt it sets ``request.login_throttled`` so
+    the login form can say why.
+
+    ``get_user()``, which resolves ``request.user`` from the session, reads
+    through the short-lived user cache in user.cache.
+    """
+
+    def authenticate(self, request, username=None, password=None, phone_number=None, **kwargs):
+        phone_number = phone_number or username or kwargs.get(UserModel.USERNAME_FIELD)
+        if phone_number is None or password is None:
+            return None
+        try:
+            phone_number = normalize_phone_number(phone_number)
+        except ValueError:
+            phone_number = str(phone_number).strip()
+
+        throttle = LoginThrottle(request, phone_number)
+        if throttle.blocked():
+            if request is not None:
+                request.login_throttled = True
+            raise PermissionDenied
+
+        try:
+            user = UserModel._default_manager.get(phone_number=phone_number)
+        except UserModel.DoesNotExist:
+            user = None
+        # check_password rehashes when PASSWORD_HASH_ITERATIONS changed
+        if user is not None and user.check_password(password) and self.user_can_authenticate(user):
+            throttle.succeeded()
+            return user
+        throttle.failed()
+        return None
+
+    def get_user(self, user_id):
+        if not settings.USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+        user = cache.get_cached_user(user_id)
+        if user is None:
+            try:
+                user = UserModel._default_manager.get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            cache.cache_user(user)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        if not settings.USER_CACHE_TIMEOUT:
+            return await super().aget_user(user_id)
+        user = await cache.aget_cached_user(user_id)
+        if user is None:
+            try:
+                user = await UserModel._default_manager.aget(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            await cache.acache_user(user)
+        return user if self.user_can_authenticate(user) else None
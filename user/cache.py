@@ -0,0 +1,45 @@
+"""
+Short-lived cache of the users that sessions point at.
+
+AuthenticationMiddleware resolves ``request.user`` through
+PhoneNumberBackend.get_user() on every authenticated request. The backend
+keeps each user in the USER_CACHE_ALIAS cache for USER_CACHE_TIMEOUT
+seconds, so a signed-in browsing session costs one user query per timeout
+instead of one per page. Django still checks the session's password hash
+against the cached user, and every save, delete and logout drops the
+entry (see user.signals), so a password change logs out other sessions as
+soon as the cache agrees. With a per-process cache, other processes keep
+their copy until it times out.
+
+``USER_CACHE_TIMEOUT = 0`` turns the cache off.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+def user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    return user_cache().get(user_cache_key(user_id))
+
+
+async def aget_cached_user(user_id):
+    return await user_cache().aget(user_cache_key(user_id))
+
+
+def cache_user(user):
+    user_cache().set(user_cache_key(user.pk), user, settings.USER_CACHE_TIMEOUT)
+
+
+async def acache_user(user):
+    await user_cache().aset(user_cache_key(user.pk), user, settings.USER_CACHE_TIMEOUT)
+
+
+def forget_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
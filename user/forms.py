@@ -36,8 +36,18 @@ from django import forms
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth import get_user_model
 
+from user.phone import normalize_phone_number
+
 CustomUser = get_user_model()
 
+
+def clean_phone_number(value):
+    try:
+        return normalize_phone_number(value)
+    except ValueError:
+        raise forms.ValidationError("Enter a valid phone number, e.g. 555 12 34 56 or +995 555 12 34 56.")
+
+
 class CustomUserCreationForm(UserCreationForm):
     password1 = forms.CharField(label="Password", widget=forms.PasswordInput)
     password2 = forms.CharField(label="Confirm Password", widget=forms.PasswordInput)
@@ -46,6 +56,10 @@ class CustomUserCreationForm(UserCreationForm):
         model = CustomUser
         fields = ("phone_number", "first_name", "last_name", "email")
 
+    def clean_phone_number(self):
+        # Normalized before the uniqueness check, so one number can't sign up twice in two formats
+        return clean_phone_number(self.cleaned_data["phone_number"])
+
     def clean_password2(self):
         p1 = self.cleaned_data.get("password1")
         p2 = self.cleaned_data.get("password2")
@@ -63,3 +77,20 @@ class CustomUserCreationForm(UserCreationForm):
 
 class CustomLoginForm(AuthenticationForm):
     username = forms.CharField(label="Phone Number")  # maps to USERNAME_FIELD
+
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        "throttled": "Too many failed logins. Please wait a few minutes and try again.",
+    }
+
+    @property
+    def throttled(self):
+        return getattr(self.request, "login_throttled", False)
+
+    def clean(self):
+        try:
+            return super().clean()
+        except forms.ValidationError:
+            if self.throttled:
+                raise forms.ValidationError(self.error_messages["throttled"], code="throttled")
+            raise
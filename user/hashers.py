@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    Django's PBKDF2-SHA256 hasher with its cost taken from PASSWORD_HASH_ITERATIONS.
+
+    It keeps the ``pbkdf2_sha256`` algorithm name, so it verifies every existing
+    hash. A hash made with a different iteration count is rewritten with the
+    configured one at its owner's next successful login (``must_update``).
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
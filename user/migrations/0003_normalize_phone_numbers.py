@@ -0,0 +1,34 @@
+from django.db import migrations
+
+from user.phone import normalize_phone_number
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    """
+    Rewrite stored numbers in E.164, the form PhoneNumberBackend looks up.
+
+    A number that can't be parsed, or whose E.164 form another account
+    already has, is left as it is.
+    """
+    CustomUser = apps.get_model("user", "CustomUser")
+    taken = set(CustomUser.objects.values_list("phone_number", flat=True))
+    for pk, phone_number in CustomUser.objects.values_list("pk", "phone_number").iterator():
+        try:
+            normalized = normalize_phone_number(phone_number)
+        except ValueError:
+            continue
+        if normalized == phone_number or normalized in taken:
+            continue
+        CustomUser.objects.filter(pk=pk).update(phone_number=normalized)
+        taken.add(normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_alter_customuser_options_customuser_date_joined_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
@@ -2,12 +2,14 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager, PermissionsMixin, UserManager
 from django.db import models
 
+from .phone import normalize_phone_number
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, phone_number, password, **extra_fields):
         if not phone_number:
             raise ValueError("The phone number is required")
-        phone_number = str(phone_number)
+        phone_number = normalize_phone_number(phone_number)
         user = self.model(phone_number=phone_number, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
@@ -34,3 +36,11 @@ class CustomUser(AbstractUser):
     REQUIRED_FIELDS = []
 
     objects = CustomUserManager()
+
+    @classmethod
+    def normalize_username(cls, username):
+        # Stored in E.164, so logins in any format find the row; invalid input is left to the form to reject
+        try:
+            return normalize_phone_number(username)
+        except ValueError:
+            return super().normalize_username(username)
@@ -0,0 +1,37 @@
+"""
+Phone numbers are stored and looked up in E.164 form (``+995555123456``).
+
+People type them in every shape: ``555 12 34 56``, ``0555-123-456``,
+``00995 555 123456``, ``+995 (555) 123456``. Numbers without a country code
+are taken to be in PHONE_DEFAULT_COUNTRY_CODE.
+"""
+import re
+
+from django.conf import settings
+
+_SEPARATORS = re.compile(r"[\s\-.()/]")
+# Shorter than this without a country code is a typo or a service number, not a subscriber
+MIN_NATIONAL_LENGTH = 6
+
+
+def normalize_phone_number(value, country_code=None):
+    """Return ``value`` in E.164 form, or raise ValueError if it can't be a phone number."""
+    country_code = country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+    number = _SEPARATORS.sub("", str(value))
+    if number.startswith("+"):
+        digits = number[1:]
+    elif number.startswith("00"):
+        digits = number[2:]
+    elif number.startswith(country_code) and len(number) >= len(country_code) + 8:
+        # Already international, just without the plus
+        digits = number
+    else:
+        # National number, possibly with a trunk prefix
+        national = number.removeprefix("0")
+        if len(national) < MIN_NATIONAL_LENGTH:
+            raise ValueError(f"{value!r} is too short for a phone number")
+        digits = country_code + national
+
+    if not digits.isdigit() or not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        raise ValueError(f"{value!r} is not a valid phone number")
+    return "+" + digits
@@ -0,0 +1,23 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import forget_user
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Now, so this process's next request misses, and again on commit, in
+    # case a request re-cached the old row before the write became visible
+    forget_user(instance.pk)
+    transaction.on_commit(partial(forget_user, instance.pk))
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
@@ -1,3 +1,165 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import identify_hasher
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from user.cache import aget_cached_user, get_cached_user, user_cache
+from user.hashers import PBKDF2PasswordHasher
+from user.models import CustomUser
+from user.phone import normalize_phone_number
+from user.throttle import SlidingWindowCounter, throttle_cache
+
+PASSWORD = "Str0ng-enough-pass"
+
+
+class PhoneNumberTests(TestCase):
+
+    def test_formats_normalize_to_e164(self):
+        for typed in ("555 12 34 56", "0555-123-456", "00995 555 123456", "+995 (555) 123456", "995555123456"):
+            with self.subTest(typed=typed):
+                self.assertEqual(normalize_phone_number(typed), "+995555123456")
+        self.assertEqual(normalize_phone_number("+1 212 555 0100"), "+12125550100")
+
+    def test_rejects_garbage(self):
+        for typed in ("", "12345", "+0123456789", "555-CALL-NOW", "+1234567890123456"):
+            with self.subTest(typed=typed), self.assertRaises(ValueError):
+                normalize_phone_number(typed)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, LOGIN_THROTTLE_PHONE_LIMIT=3, LOGIN_THROTTLE_IP_LIMIT=5)
+class LoginTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("555 12 34 56", PASSWORD, email="driver@example.com")
+
+    def setUp(self):
+        throttle_cache().clear()
+
+    def login(self, phone_number, password=PASSWORD, **extra):
+        return self.client.post(reverse("user:login"), {"username": phone_number, "password": password}, **extra)
+
+    def test_stored_and_found_in_any_format(self):
+        self.assertEqual(self.user.phone_number, "+995555123456")
+        response = self.login("0555-123-456")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(int(self.client.session["_auth_user_id"]), self.user.pk)
+
+    def test_signup_rejects_same_number_in_another_format(self):
+        response = self.client.post(reverse("user:signup"), {
+            "phone_number": "+995 555 123 456", "email": "twin@example.com",
+            "password1": PASSWORD, "password2": PASSWORD,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("phone_number", response.context["form"].errors)
+
+    def test_unknown_number_is_not_hashed(self):
+        with mock.patch.object(PBKDF2PasswordHasher, "verify") as verify, \
+                mock.patch.object(PBKDF2PasswordHasher, "encode") as encode:
+            response = self.login("599 00 00 00")
+        self.assertEqual(response.status_code, 200)
+        verify.assert_not_called()
+        encode.assert_not_called()
+
+    def test_throttles_failures_per_number(self):
+        for _ in range(3):
+            self.assertEqual(self.login("555123456", "wrong").status_code, 200)
+        # Even the right password is refused now, before any hashing
+        with mock.patch.object(PBKDF2PasswordHasher, "verify") as verify:
+            response = self.login("555123456")
+        verify.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertContains(response, "Too many failed logins", status_code=429)
+
+    def test_throttles_failures_per_ip(self):
+        for i in range(5):
+            self.login(f"59900000{i}", "wrong", REMOTE_ADDR="198.51.100.7")
+        self.assertEqual(self.login("555123456", REMOTE_ADDR="198.51.100.7").status_code, 429)
+        self.assertEqual(self.login("555123456", REMOTE_ADDR="198.51.100.8").status_code, 302)
+
+    def test_success_clears_number_failures(self):
+        for _ in range(2):
+            self.login("555123456", "wrong")
+        self.assertEqual(self.login("555123456").status_code, 302)
+        self.client.logout()
+        for _ in range(2):
+            self.login("555123456", "wrong")
+        self.assertEqual(self.login("555123456").status_code, 302)
+
+    def test_rehashes_on_cost_change(self):
+        self.assertEqual(identify_hasher(self.user.password).decode(self.user.password)["iterations"], 1000)
+        with override_settings(PASSWORD_HASH_ITERATIONS=1500):
+            self.assertEqual(self.login("555123456").status_code, 302)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).decode(self.user.password)["iterations"], 1500)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, USER_CACHE_TIMEOUT=30)
+class AuthenticatedRequestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("555 98 76 54", PASSWORD, email="regular@example.com")
+
+    def setUp(self):
+        user_cache().clear()
+        self.client.force_login(self.user)
+
+    def test_user_served_from_cache(self):
+        self.client.get(reverse("cars:my_rentals"))
+        # session, rentals; no user query
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("cars:my_rentals"))
+        self.assertEqual(response.context["user"], self.user)
+
+    async def test_async_views_use_the_cache(self):
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get(reverse("cars:my_rentals_async"))
+        self.assertEqual(await aget_cached_user(self.user.pk), self.user)
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.get(reverse("cars:my_rentals"))
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.set_password("An0ther-pass-word")
+        user.save()
+        response = self.client.get(reverse("cars:my_rentals"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_drops_cached_user(self):
+        self.client.get(reverse("cars:my_rentals"))
+        self.assertIsNotNone(get_cached_user(self.user.pk))
+        self.client.post(reverse("user:logout"))
+        self.assertIsNone(get_cached_user(self.user.pk))
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookie_sessions_skip_the_database(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("cars:my_rentals"))
+        # Only the rentals
+        with self.assertNumQueries(1):
+            self.client.get(reverse("cars:my_rentals"))
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_cache_can_be_turned_off(self):
+        self.client.get(reverse("cars:my_rentals"))
+        with self.assertNumQueries(3):
+            self.client.get(reverse("cars:my_rentals"))
+        self.assertIsNone(get_cached_user(self.user.pk))
+
+
+class SlidingWindowCounterTests(TestCase):
+
+    def setUp(self):
+        throttle_cache().clear()
+
+    def test_previous_window_fades_out(self):
+        counter = SlidingWindowCounter("test", 100)
+        for _ in range(4):
+            counter.hit(now=1050)
+        self.assertEqual(counter.count(now=1099), 4)
+        # A quarter into the next window, three quarters of the old hits still count
+        self.assertEqual(counter.count(now=1125), 3)
+        counter.hit(now=1125)
+        self.assertEqual(counter.count(now=1125), 4)
+        self.assertEqual(counter.count(now=1300), 0)
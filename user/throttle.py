@@ -0,0 +1,78 @@
+"""
+Login throttling with sliding-window counters in the cache.
+
+A counter keeps one cache entry per fixed window and estimates the
+sliding count as the current window plus the part of the previous window
+that still overlaps: with a 300 s window, 100 s into the current one, that
+is ``current + previous * 2/3``. Two small integers per key, incremented
+atomically, and no burst is let through at the window boundary.
+
+Failed logins are counted per client IP and per phone number. Once either
+reaches its limit, PhoneNumberBackend rejects the attempt before looking
+anything up or hashing anything.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def throttle_cache():
+    return caches[settings.LOGIN_THROTTLE_CACHE_ALIAS]
+
+
+class SlidingWindowCounter:
+
+    def __init__(self, key, window):
+        self.key = key
+        self.window = window
+
+    def _keys(self, now):
+        index = int(now // self.window)
+        return f"{self.key}:{index}", f"{self.key}:{index - 1}"
+
+    def count(self, now=None):
+        now = time.time() if now is None else now
+        current, previous = self._keys(now)
+        values = throttle_cache().get_many([current, previous])
+        overlap = 1 - (now % self.window) / self.window
+        return values.get(current, 0) + values.get(previous, 0) * overlap
+
+    def hit(self, now=None):
+        current, _ = self._keys(time.time() if now is None else now)
+        cache = throttle_cache()
+        # Kept two windows, so the next window can still weigh it
+        cache.add(current, 0, timeout=2 * self.window)
+        try:
+            cache.incr(current)
+        except ValueError:
+            # Expired between add and incr
+            cache.set(current, 1, timeout=2 * self.window)
+
+    def reset(self, now=None):
+        throttle_cache().delete_many(self._keys(time.time() if now is None else now))
+
+
+class LoginThrottle:
+    """The per-IP and per-number counters for one login attempt."""
+
+    def __init__(self, request, phone_number):
+        window = settings.LOGIN_THROTTLE_WINDOW
+        ip = request.META.get("REMOTE_ADDR", "") if request is not None else ""
+        self.counters = [(SlidingWindowCounter(f"login:ip:{ip}", window), settings.LOGIN_THROTTLE_IP_LIMIT)]
+        self.phone_counter = None
+        if phone_number:
+            self.phone_counter = SlidingWindowCounter(f"login:phone:{phone_number}", window)
+            self.counters.append((self.phone_counter, settings.LOGIN_THROTTLE_PHONE_LIMIT))
+
+    def blocked(self):
+        return any(counter.count() >= limit for counter, limit in self.counters)
+
+    def failed(self):
+        for counter, _ in self.counters:
+            counter.hit()
+
+    def succeeded(self):
+        # The owner got in, so earlier typos no longer count against the number
+        if self.phone_counter is not None:
+            self.phone_counter.reset()